@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+import orjson
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def hash_password(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${b64encode(salt)}${b64encode(digest)}"
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    try:
+        scheme, n, r, p, salt, expected = password_hash.split("$")
+    except ValueError:
+        return False
+    if scheme != "scrypt":
+        return False
+    digest = hashlib.scrypt(password.encode(), salt=b64decode(salt), n=int(n), r=int(r), p=int(p))
+    return hmac.compare_digest(digest, b64decode(expected))
+
+
+class TokenSigner:
+    """Token bertanda HMAC-SHA256: ``payload.signature`` dengan payload JSON base64url.
+
+    Verifikasi tidak butuh akses database. Token yang baru saja diverifikasi
+    disimpan di LRU kecil agar request berikutnya cukup satu lookup dict.
+    """
+
+    def __init__(self, secret: bytes, ttl_seconds: int = 12 * 3600, cache_size: int = 1024):
+        self.secret = secret
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self._verified: "OrderedDict[str, dict]" = OrderedDict()
+
+    def _sign(self, payload: bytes) -> str:
+        return b64encode(hmac.new(self.secret, payload, hashlib.sha256).digest())
+
+    def issue(self, subject: str) -> dict:
+        now = int(time.time())
+        claims = {"sub": subject, "iat": now, "exp": now + self.ttl_seconds, "jti": secrets.token_hex(8)}
+        payload = b64encode(orjson.dumps(claims))
+        return {"token": f"{payload}.{self._sign(payload.encode())}", "claims": claims}
+
+    def verify(self, token: str) -> dict:
+        claims = self._verified.get(token)
+        if claims is None:
+            try:
+                payload, signature = token.split(".")
+            except ValueError:
+                raise InvalidToken("format token salah")
+            if not hmac.compare_digest(signature, self._sign(payload.encode())):
+                raise InvalidToken("tanda tangan tidak cocok")
+            try:
+                claims = orjson.loads(b64decode(payload))
+            except (ValueError, orjson.JSONDecodeError):
+                raise InvalidToken("payload tidak valid")
+            self._verified[token] = claims
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        else:
+            self._verified.move_to_end(token)
+        if claims["exp"] <= time.time():
+            self._verified.pop(token, None)
+            raise InvalidToken("token kedaluwarsa")
+        return claims
+
+
+class RevocationList:
+    """LRU berisi jti token yang dicabut (logout) sampai token itu kedaluwarsa."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._revoked: "OrderedDict[str, float]" = OrderedDict()
+
+    def revoke(self, jti: str, expires_at: float):
+        self._revoked[jti] = expires_at
+        self._revoked.move_to_end(jti)
+        while len(self._revoked) > self.max_entries:
+            self._revoked.popitem(last=False)
+
+    def is_revoked(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self._revoked[jti]
+            return False
+        return True
+
+
+class LoginRateLimiter:
+    """Batas percobaan login per kunci (IP) dalam jendela waktu geser."""
+
+    def __init__(self, max_attempts: int = 5, window_seconds: float = 60.0, max_keys: int = 10000):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._attempts: Dict[str, Deque[float]] = {}
+
+    def retry_after(self, key: str) -> Optional[float]:
+        attempts = self._attempts.get(key)
+        if not attempts:
+            return None
+        now = time.monotonic()
+        while attempts and attempts[0] <= now - self.window_seconds:
+            attempts.popleft()
+        if len(attempts) < self.max_attempts:
+            return None
+        return attempts[0] + self.window_seconds - now
+
+    def record_failure(self, key: str):
+        if key not in self._attempts and len(self._attempts) >= self.max_keys:
+            self._attempts.pop(next(iter(self._attempts)))
+        self._attempts.setdefault(key, deque()).append(time.monotonic())
+
+    def reset(self, key: str):
+        self._attempts.pop(key, None)
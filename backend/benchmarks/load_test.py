@@ -0,0 +1,203 @@
+"""Load test endpoint backend terhadap Mongo lokal (atau mongomock-motor).
+
+Server dijalankan in-process lewat ASGI transport milik httpx, data sintetis
+di-seed ke database terpisah, lalu setiap endpoint dibebani secara konkuren.
+Hasil (p50/p95/p99 dan req/s) ditulis ke file JSON.
+
+Jalankan dari folder backend:
+
+    python benchmarks/load_test.py --rows 1000 100000 --concurrency 32
+    python benchmarks/load_test.py --mock --rows 1000
+    python benchmarks/load_test.py --mock --storage sqlite --rows 1000 100000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+ENDPOINTS = [
+    "/api/transactions",
+    "/api/transactions?limit=500",
+    "/api/transactions?jenis=pemasukan",
+    "/api/summary",
+    "/api/summary?jenis=pengeluaran",
+    "/api/reports/periods?granularity=month",
+    "/api/reports/balance-series?granularity=month",
+]
+
+SEED_BATCH_SIZE = 10000
+
+WRITE_PAYLOAD = {"tanggal": "2024-01-01T00:00:00", "keterangan": "Iuran kas", "jenis": "pemasukan", "jumlah": 50000}
+
+
+def synthetic_transactions(rows: int, ledger_id: str):
+    start = datetime(2015, 1, 1)
+    for i in range(rows):
+        yield {
+            "id": str(uuid.uuid4()),
+            "tanggal": start + timedelta(minutes=37 * i),
+            "keterangan": random.choice(("Iuran kas", "Sewa lapangan GOR", "Pembelian shuttlecock", "Konsumsi")),
+            "jenis": random.choice(("pemasukan", "pengeluaran")),
+            "jumlah": random.randint(1, 500) * 1000,
+            "created_at": datetime.utcnow(),
+            "deleted": False,
+            "ledger_id": ledger_id,
+        }
+
+
+async def seed(server, rows: int):
+    if server.get_storage().name == "sqlite":
+        # Mulai dari file kosong (transaksi dan metadata); transaksi dimasukkan lewat repository
+        await server.close_storage()
+        for suffix in ("", "-wal", "-shm"):
+            Path(server.SQLITE_PATH + suffix).unlink(missing_ok=True)
+        await server.get_storage().setup()
+        await server.get_metadata().setup()
+        insert_many = server.get_storage().insert_many
+    else:
+        db = server.get_db()
+        await db.transactions.delete_many({})
+        await db.ledger_totals.delete_many({})
+        await db.ledger_rollups.delete_many({})
+        await db.ledger_events.delete_many({})
+        await db.ledger_snapshots.delete_many({})
+        insert_many = lambda batch: db.transactions.insert_many(batch, ordered=False)
+    batch = []
+    for transaction in synthetic_transactions(rows, server.DEFAULT_LEDGER):
+        batch.append(transaction)
+        if len(batch) >= SEED_BATCH_SIZE:
+            await insert_many(batch)
+            batch = []
+    if batch:
+        await insert_many(batch)
+    if server.get_storage().name == "mongo":
+        await server.ensure_indexes()
+    await server.reconcile_totals(server.DEFAULT_LEDGER)
+    await server.rebuild_rollups(server.DEFAULT_LEDGER)
+
+
+def percentile(latencies: list, pct: int) -> float:
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+    return statistics.quantiles(latencies, n=100, method="inclusive")[pct - 1]
+
+
+async def drive(client: httpx.AsyncClient, path: str, total: int, concurrency: int, method: str = "GET", **kwargs) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": errors,
+        "req_per_sec": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+async def run(args) -> dict:
+    import server
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.database = AsyncMongoMockClient()[os.environ["DB_NAME"]]
+
+    await server.get_storage().setup()
+    await server.get_metadata().setup()
+    await server.ensure_admin_user()
+    token = server.token_signer.issue("admin")["token"]
+    results = {"started_at": datetime.utcnow().isoformat(), "mock": args.mock, "storage": args.storage,
+               "cache": not args.no_cache, "coalesce_ms": args.coalesce_ms, "runs": []}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for rows in args.rows:
+            print(f"seeding {rows} transaksi...", flush=True)
+            await seed(server, rows)
+            run_result = {"rows": rows, "endpoints": {}}
+            for path in ENDPOINTS:
+                stats = await drive(client, path, args.requests, args.concurrency)
+                run_result["endpoints"][path] = stats
+                print(f"  {path}: {stats}", flush=True)
+            if args.writes:
+                stats = await drive(
+                    client, "/api/transactions", args.writes, args.concurrency, method="POST",
+                    headers={"Authorization": f"Bearer {token}"}, json=WRITE_PAYLOAD,
+                )
+                run_result["endpoints"]["POST /api/transactions"] = stats
+                print(f"  POST /api/transactions: {stats}", flush=True)
+            results["runs"].append(run_result)
+    await server.close_storage()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test backend jurnal kas")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--requests", type=int, default=500, help="jumlah request per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="jurnalkas_bench")
+    parser.add_argument("--mock", action="store_true", help="pakai mongomock-motor, tanpa mongod")
+    parser.add_argument("--no-cache", action="store_true", help="matikan response cache agar setiap request ke Mongo")
+    parser.add_argument("--writes", type=int, default=0, help="jumlah POST /api/transactions yang ikut diukur")
+    parser.add_argument("--coalesce-ms", type=float, default=0, help="jendela write coalescing (WRITE_COALESCE_MS)")
+    parser.add_argument("--storage", choices=("mongo", "sqlite"), default="mongo", help="backend transaksi (STORAGE_BACKEND)")
+    parser.add_argument("--sqlite-path", default="jurnalkas_bench.db")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    # Harus di-set sebelum server diimpor; load_dotenv tidak menimpa env yang sudah ada
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["RECONCILE_INTERVAL_SECONDS"] = str(10 ** 9)
+    os.environ["WRITE_COALESCE_MS"] = str(args.coalesce_ms)
+    os.environ["STORAGE_BACKEND"] = args.storage
+    os.environ["SQLITE_PATH"] = args.sqlite_path
+    # Semua request datang dari satu klien; rate limit per IP akan mengukur respons 429
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    if args.no_cache:
+        os.environ["CACHE_TTL_SECONDS"] = "0"
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+    Path(args.output).write_text(json.dumps(results, indent=2))
+    print(f"hasil ditulis ke {args.output}")
+    failed = [
+        f"{run_result['rows']} baris {path}: {stats['errors']}/{stats['requests']}"
+        for run_result in results["runs"]
+        for path, stats in run_result["endpoints"].items()
+        if stats["errors"]
+    ]
+    if failed:
+        # Latensi respons error tidak bermakna; jangan sampai terbaca sebagai hasil
+        sys.exit("request gagal, hasil tidak valid:\n  " + "\n  ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark serialisasi daftar transaksi: jalur Pydantic lama vs jalur cepat orjson.
+
+Jalankan dari folder backend:
+
+    python benchmarks/serialization_bench.py --rows 100000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import orjson  # noqa: E402
+
+from server import TransactionResponse, serialize_transaction  # noqa: E402
+
+
+def make_documents(rows: int) -> list:
+    start = datetime(2020, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "tanggal": start + timedelta(hours=i),
+            "keterangan": f"Transaksi {i}",
+            "jenis": random.choice(("pemasukan", "pengeluaran")),
+            "jumlah": random.randint(1, 500) * 1000,
+        }
+        for i in range(rows)
+    ]
+
+
+def legacy_path(documents: list) -> bytes:
+    # Meniru get_transactions lama: model per baris lalu validasi ulang response_model oleh FastAPI
+    result = [
+        TransactionResponse(
+            id=t["id"],
+            tanggal=t["tanggal"].strftime("%d %B %Y"),
+            keterangan=t["keterangan"],
+            jenis=t["jenis"],
+            jumlah=t["jumlah"],
+            pemasukan=t["jumlah"] if t["jenis"] == "pemasukan" else None,
+            pengeluaran=t["jumlah"] if t["jenis"] == "pengeluaran" else None,
+        )
+        for t in documents
+    ]
+    adapter = TypeAdapter(List[TransactionResponse])
+    validated = adapter.validate_python([r.model_dump() for r in result])
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+
+def fast_path(documents: list) -> bytes:
+    return orjson.dumps({"items": [serialize_transaction(t) for t in documents], "next_cursor": None})
+
+
+def measure(func, documents: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(documents)
+        best = min(best, time.perf_counter() - started)
+    return len(documents) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = make_documents(args.rows)
+    legacy = measure(legacy_path, documents, args.repeat)
+    fast = measure(fast_path, documents, args.repeat)
+    print(f"rows: {args.rows}")
+    print(f"legacy (Pydantic + json): {legacy:,.0f} rows/s")
+    print(f"fast (dict + orjson):     {fast:,.0f} rows/s")
+    print(f"speedup: {fast / legacy:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+
+
+class CacheEntry(NamedTuple):
+    body: bytes
+    etag: str
+    version: int
+    expires_at: float
+    # Body terkompresi per Content-Encoding, diisi saat pertama diminta
+    encoded: Dict[str, bytes]
+
+
+class ResponseCache:
+    """Cache respons in-process dengan TTL, eviksi LRU dan invalidasi berbasis versi.
+
+    Setiap penulisan ke ledger memanggil ``invalidate()`` yang menaikkan versi;
+    entri dari versi lama dianggap kedaluwarsa tanpa perlu menyapu isi cache.
+    Selain body, cache juga mengingat satu validator (misal versi ledger untuk
+    ETag) dengan TTL dan aturan invalidasi yang sama.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._validator: Optional[Any] = None
+        self._validator_expires_at = 0.0
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.version != self.version or entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, body: bytes, etag: str, version: int) -> CacheEntry:
+        entry = CacheEntry(body, etag, version, time.monotonic() + self.ttl_seconds, {})
+        # Hasil yang dihitung sebelum invalidasi tidak boleh masuk ke cache
+        if version != self.version:
+            return entry
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def get_validator(self) -> Optional[Any]:
+        if self._validator is None or self._validator_expires_at <= time.monotonic():
+            return None
+        return self._validator
+
+    def set_validator(self, validator: Any, version: int):
+        if version != self.version:
+            return
+        self._validator = validator
+        self._validator_expires_at = time.monotonic() + self.ttl_seconds
+
+    def invalidate(self):
+        self.version += 1
+        self._entries.clear()
+        self._validator = None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TenantCaches:
+    """Satu ``ResponseCache`` per tenant (ledger).
+
+    Tulisan ke satu ledger hanya membatalkan cache ledger itu, dan setiap
+    ledger punya kuota entri sendiri sehingga ledger besar yang ramai tidak
+    mengusir entri milik ledger kecil. Jumlah tenant yang disimpan juga
+    dibatasi dengan LRU.
+    """
+
+    def __init__(self, max_entries_per_tenant: int = 256, ttl_seconds: float = 30.0, max_tenants: int = 64):
+        self.max_entries_per_tenant = max_entries_per_tenant
+        self.ttl_seconds = ttl_seconds
+        self.max_tenants = max_tenants
+        self._caches: "OrderedDict[str, ResponseCache]" = OrderedDict()
+
+    def for_tenant(self, tenant: str, max_entries: Optional[int] = None) -> ResponseCache:
+        cache = self._caches.get(tenant)
+        if cache is None:
+            cache = ResponseCache(max_entries or self.max_entries_per_tenant, self.ttl_seconds)
+            self._caches[tenant] = cache
+            while len(self._caches) > self.max_tenants:
+                self._caches.popitem(last=False)
+        elif max_entries and cache.max_entries != max_entries:
+            cache.max_entries = max_entries
+        self._caches.move_to_end(tenant)
+        return cache
+
+    def invalidate(self, tenant: Optional[str] = None):
+        # Tanpa tenant: batalkan semua, misal saat sumber perubahan tidak diketahui
+        if tenant is None:
+            caches = list(self._caches.values())
+        else:
+            caches = [self._caches[tenant]] if tenant in self._caches else []
+        for cache in caches:
+            cache.invalidate()
+
+    def __len__(self):
+        return sum(len(cache) for cache in self._caches.values())
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Callable, List, Set
+
+
+class WriteCoalescer:
+    """Menggabungkan penulisan konkuren yang tiba dalam jendela singkat menjadi satu batch.
+
+    ``flush`` menerima daftar item dan mengembalikan daftar hasil dengan urutan
+    yang sama; hasil berupa ``Exception`` diteruskan ke pemanggil item tersebut.
+    """
+
+    def __init__(self, flush: Callable[[list], Awaitable[list]], window_seconds: float, max_batch: int = 500):
+        self.flush = flush
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending: list = []
+        self._timer = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush_now)
+        return await future
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[tuple]):
+        try:
+            results = await self.flush([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
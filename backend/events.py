@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerBroker:
+    """Pub/sub in-process untuk event ledger yang dikirim lewat SSE, per ledger.
+
+    Setiap subscriber punya antrean terbatas. Subscriber yang terlalu lambat
+    tidak menahan publisher: antreannya dikosongkan dan diganti satu event
+    ``resync`` agar klien mengambil ulang data secara penuh.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        # False jika event sudah dipasok change stream MongoDB
+        self.local_publish = True
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, ledger_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(ledger_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, ledger_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(ledger_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[ledger_id]
+
+    def subscriber_count(self, ledger_id: Optional[str] = None) -> int:
+        if ledger_id is not None:
+            return len(self._subscribers.get(ledger_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, ledger_id: Optional[str], event: dict):
+        # ledger_id None: kirim ke semua ledger (misal resync dari change stream)
+        if ledger_id is None:
+            queues = [queue for subscribers in self._subscribers.values() for queue in subscribers]
+        else:
+            queues = list(self._subscribers.get(ledger_id, ()))
+        for queue in queues:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+                logger.warning("Subscriber SSE tertinggal, dikirim resync")
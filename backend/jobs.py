@@ -0,0 +1,221 @@
+"""Penjadwal job latar belakang berbasis asyncio, dijalankan di lifespan aplikasi.
+
+Setiap job punya jadwal (interval atau harian; waktu UTC) dan
+dijalankan oleh sejumlah worker terbatas. Job yang gagal diulang dengan
+backoff eksponensial. Status dicatat lewat ``metadata.MetadataStore``: ``jobs``
+menyimpan jadwal berikutnya dan hasil terakhir, ``job_runs`` menyimpan riwayat
+setiap eksekusi. Klaim jadwal bersifat atomik sehingga beberapa proses aplikasi
+tidak menjalankan job terjadwal yang sama dua kali.
+"""
+import asyncio
+import logging
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Batas tidur loop penjadwal: job yang dipicu proses lain tetap terlihat cepat
+MAX_TICK_SECONDS = 60.0
+
+
+class Interval:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def next_after(self, now: datetime) -> datetime:
+        return now + timedelta(seconds=self.seconds)
+
+    def describe(self) -> str:
+        return f"setiap {self.seconds:g} detik"
+
+
+class Daily:
+    def __init__(self, hour: int, minute: int = 0):
+        self.hour = hour
+        self.minute = minute
+
+    def next_after(self, now: datetime) -> datetime:
+        run_at = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        return run_at if run_at > now else run_at + timedelta(days=1)
+
+    def describe(self) -> str:
+        return f"harian {self.hour:02d}:{self.minute:02d} UTC"
+
+
+class Job:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[dict]],
+        schedule,
+        max_attempts: int = 3,
+        retry_delay_seconds: float = 30.0,
+        timeout_seconds: Optional[float] = None,
+    ):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.max_attempts = max_attempts
+        self.retry_delay_seconds = retry_delay_seconds
+        self.timeout_seconds = timeout_seconds
+
+
+class JobScheduler:
+    """Menjalankan job terdaftar sesuai jadwal dengan ``workers`` worker paralel.
+
+    Antrean hanya berisi job yang jatuh tempo dan belum antre/berjalan di
+    proses ini, sehingga jumlahnya tidak bisa melebihi jumlah job terdaftar.
+    """
+
+    def __init__(self, get_store: Callable, workers: int = 2, history_limit: int = 1000):
+        self.get_store = get_store
+        self.workers = workers
+        self.history_limit = history_limit
+        self.owner = f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._active: Set[str] = set()
+        self._running: Dict[str, dict] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, func: Callable[[], Awaitable[dict]], schedule, **options) -> Job:
+        job = Job(name, func, schedule, **options)
+        self.jobs[name] = job
+        return job
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        now = datetime.utcnow()
+        for job in self.jobs.values():
+            # Jadwal yang sudah tersimpan dipertahankan: job yang terlewat saat
+            # aplikasi mati langsung jatuh tempo begitu aplikasi hidup lagi
+            await self.get_store().init_job(job.name, job.schedule.describe(), job.schedule.next_after(now))
+        self._tasks = [asyncio.create_task(self._schedule_loop())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("Penjadwal job aktif: %d job, %d worker", len(self.jobs), self.workers)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._active.clear()
+        self._running.clear()
+
+    def trigger(self, name: str) -> bool:
+        """Antrekan job sekarang juga (di luar jadwal); False jika sudah antre/berjalan."""
+        if name not in self.jobs:
+            raise KeyError(name)
+        if self._queue is None or name in self._active:
+            return False
+        self._enqueue(name, "manual")
+        return True
+
+    async def run_once(self, name: str, trigger: str = "manual") -> dict:
+        """Jalankan job langsung di task pemanggil (misal dari manage.py) lengkap dengan retry dan catatan status."""
+        return await self._execute(self.jobs[name], trigger)
+
+    def _enqueue(self, name: str, trigger: str):
+        self._active.add(name)
+        self._queue.put_nowait((name, trigger))
+
+    async def _claim(self, job: Job, now: datetime) -> bool:
+        # Hanya satu proses yang berhasil menggeser next_run_at untuk jadwal yang sama
+        return await self.get_store().claim_job(job.name, now, job.schedule.next_after(now), self.owner)
+
+    async def _schedule_loop(self):
+        while True:
+            now = datetime.utcnow()
+            next_due = now + timedelta(seconds=MAX_TICK_SECONDS)
+            try:
+                for doc in await self.get_store().job_schedules(list(self.jobs)):
+                    job = self.jobs[doc["name"]]
+                    if doc["next_run_at"] <= now:
+                        if job.name not in self._active and await self._claim(job, now):
+                            self._enqueue(job.name, "schedule")
+                    else:
+                        next_due = min(next_due, doc["next_run_at"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Penjadwal job gagal membaca jadwal")
+            await asyncio.sleep(max((next_due - datetime.utcnow()).total_seconds(), 0.1))
+
+    async def _worker(self):
+        while True:
+            name, trigger = await self._queue.get()
+            try:
+                await self._execute(self.jobs[name], trigger)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job %s gagal dicatat", name)
+            finally:
+                self._active.discard(name)
+                self._queue.task_done()
+
+    async def _execute(self, job: Job, trigger: str) -> dict:
+        run = {
+            "_id": uuid.uuid4().hex,
+            "job": job.name,
+            "trigger": trigger,
+            "owner": self.owner,
+            "status": "running",
+            "attempts": 0,
+            "started_at": datetime.utcnow(),
+        }
+        await self.get_store().insert_job_run(run)
+        self._running[job.name] = run
+        started = time.perf_counter()
+        try:
+            for attempt in range(1, job.max_attempts + 1):
+                run["attempts"] = attempt
+                try:
+                    result = await asyncio.wait_for(job.func(), job.timeout_seconds)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    run["error"] = f"{type(e).__name__}: {e}"
+                    if attempt == job.max_attempts:
+                        logger.exception("Job %s gagal setelah %d percobaan", job.name, attempt)
+                        run["status"] = "failed"
+                        break
+                    delay = job.retry_delay_seconds * 2 ** (attempt - 1)
+                    logger.warning("Job %s gagal (percobaan %d), diulang dalam %.0f detik: %s", job.name, attempt, delay, e)
+                    run["status"] = "retrying"
+                    await self.get_store().update_job_run(
+                        run["_id"], {"status": "retrying", "attempts": attempt, "error": run["error"]}
+                    )
+                    await asyncio.sleep(delay)
+                else:
+                    run.update({"status": "succeeded", "result": result})
+                    run.pop("error", None)
+                    break
+        except asyncio.CancelledError:
+            run["status"] = "cancelled"
+            raise
+        finally:
+            self._running.pop(job.name, None)
+            duration = time.perf_counter() - started
+            run.update({"finished_at": datetime.utcnow(), "duration_ms": round(duration * 1000, 1)})
+            metrics.JOB_DURATION.observe(duration, job.name, run["status"])
+            # Riwayat dibatasi per job agar tidak tumbuh tanpa batas
+            await self.get_store().finish_job_run(run, self.history_limit)
+        return run
+
+    async def status(self, runs_limit: int = 20) -> dict:
+        jobs = []
+        for doc in await self.get_store().job_schedules(list(self.jobs)):
+            name = doc.pop("name")
+            running = self._running.get(name)
+            state = "running" if running else "queued" if name in self._active else "idle"
+            jobs.append({"name": name, "state": state, "attempt": running["attempts"] if running else None, **doc})
+        runs = [{"id": doc.pop("_id"), **doc} for doc in await self.get_store().recent_job_runs(runs_limit)]
+        return {"owner": self.owner, "workers": self.workers, "jobs": jobs, "runs": runs}
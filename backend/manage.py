@@ -0,0 +1,87 @@
+"""Perintah pemeliharaan backend.
+
+Jalankan dari folder backend, misalnya:
+
+    python manage.py rebuild-rollups
+    python manage.py rebuild-rollups --ledger smash-club
+    python manage.py reconcile
+    python manage.py migrate-money
+    python manage.py migrate
+    python manage.py snapshot
+    python manage.py run-job --job monthly_reports
+    python manage.py set-admin bendahara
+"""
+import argparse
+import asyncio
+import getpass
+import json
+
+import auth
+import server
+
+
+async def set_admin(username: str, password: str) -> dict:
+    created = await server.get_metadata().set_admin_password(username, auth.hash_password(password))
+    return {"username": username, "created": created}
+
+
+async def for_ledgers(args, action) -> dict:
+    # Tanpa --ledger perintah dijalankan untuk semua ledger
+    ledger_ids = [args.ledger] if args.ledger else await server.list_ledger_ids()
+    return {ledger_id: await action(ledger_id) for ledger_id in ledger_ids}
+
+
+async def run(command: str, args):
+    # Tabel SQLite dibuat di sini; untuk Mongo keduanya tidak melakukan apa-apa
+    await server.get_storage().setup()
+    await server.get_metadata().setup()
+    try:
+        return await run_command(command, args)
+    finally:
+        await server.close_storage()
+        await server.close_client()
+
+
+async def run_command(command: str, args):
+    if command == "set-admin":
+        password = getpass.getpass(f"Password baru untuk {args.username}: ")
+        return await set_admin(args.username, password)
+    if command == "rebuild-rollups":
+        return await for_ledgers(args, server.rebuild_rollups)
+    if command == "reconcile":
+        return await for_ledgers(args, server.reconcile_totals)
+    if command == "migrate-money":
+        return await server.migrate_money_to_int64()
+    if command == "migrate":
+        return await server.run_migrations()
+    if command == "snapshot":
+        return await for_ledgers(args, server.take_snapshot)
+    if command == "ensure-indexes":
+        return await server.ensure_indexes()
+    if command == "run-job":
+        # Untuk cron di luar aplikasi; status tetap tercatat di job_runs
+        return await server.job_scheduler.run_once(args.job)
+    raise ValueError(command)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perintah pemeliharaan jurnal kas")
+    parser.add_argument(
+        "command",
+        choices=[
+            "rebuild-rollups", "reconcile", "ensure-indexes", "migrate-money", "migrate", "snapshot", "set-admin",
+            "run-job",
+        ],
+    )
+    parser.add_argument("username", nargs="?", default="admin", help="untuk set-admin")
+    parser.add_argument("--ledger", help="batasi ke satu ledger (rebuild-rollups, reconcile, snapshot)")
+    parser.add_argument("--job", choices=sorted(server.job_scheduler.jobs), help="untuk run-job")
+    args = parser.parse_args()
+    if args.command == "run-job" and not args.job:
+        parser.error("run-job membutuhkan --job")
+    result = asyncio.run(run(args.command, args))
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
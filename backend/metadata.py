@@ -0,0 +1,981 @@
+"""Data pendukung ledger di balik satu antarmuka, terpisah dari transaksi.
+
+Akun admin, daftar ledger, versi ledger (ETag dan invalidasi statement), log
+event dan snapshot, kunci idempotensi, laporan bulanan, statement, catatan
+migrasi, dan status job latar belakang. ``MongoMetadataStore`` menyimpannya di
+koleksi Mongo (index dibuat ``ensure_indexes`` di server);
+``SQLiteMetadataStore`` di file SQLite yang sama dengan transaksi sehingga
+``STORAGE_BACKEND=sqlite`` berjalan tanpa server Mongo sama sekali.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+
+import orjson
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from storage import TOTAL_KEYS, connect_sqlite, encode_time, summarize_plan, summarize_sqlite_plan
+
+EVENT_SEQ_ID = "ledger_events"
+LEDGER_FIELDS = ("name", "max_transactions", "cache_max_entries", "created_at")
+
+
+def event_seq_id(ledger_id: str) -> str:
+    return f"{EVENT_SEQ_ID}:{ledger_id}"
+
+
+class MetadataStore:
+    name = ""
+
+    async def setup(self):
+        pass
+
+    async def close(self):
+        pass
+
+    # Admin
+    async def has_admin_users(self) -> bool:
+        raise NotImplementedError
+
+    async def create_admin_user(self, username: str, password_hash: str) -> bool:
+        """False jika username sudah ada."""
+        raise NotImplementedError
+
+    async def get_admin_user(self, username: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def set_admin_password(self, username: str, password_hash: str) -> bool:
+        """Buat atau ganti password; True jika admin baru dibuat."""
+        raise NotImplementedError
+
+    # Ledger: dokumen berbentuk {"_id": id, "name": ..., ...}
+    async def get_ledger(self, ledger_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def list_ledgers(self) -> List[dict]:
+        raise NotImplementedError
+
+    async def create_ledger(self, doc: dict) -> bool:
+        """False jika id ledger sudah dipakai."""
+        raise NotImplementedError
+
+    # Versi ledger: {"version", "epoch", "modified_at", "months": {YYYY-MM: versi}}
+    async def bump_ledger_version(self, ledger_id: str, months: Optional[Iterable[str]]):
+        raise NotImplementedError
+
+    async def get_ledger_version(self, ledger_id: str) -> dict:
+        raise NotImplementedError
+
+    # Log event append-only dan snapshot total
+    async def append_events(self, ledger_id: str, events: list):
+        """Beri seq berurutan per ledger, isi ``ledger_id``/``seq``/``at``, lalu simpan."""
+        raise NotImplementedError
+
+    async def current_event_seq(self, ledger_id: str) -> int:
+        raise NotImplementedError
+
+    async def event_page(self, ledger_id: str, limit: int, before: Optional[int], transaction_id: Optional[str]) -> List[dict]:
+        raise NotImplementedError
+
+    async def sum_event_deltas(
+        self, ledger_id: str, after_seq: int, as_of: Optional[datetime] = None, up_to_seq: Optional[int] = None
+    ) -> Optional[dict]:
+        """Jumlah delta event dengan seq > ``after_seq``; None jika tidak ada event.
+
+        ``events`` berisi banyaknya event yang dijumlahkan, untuk mendeteksi celah seq.
+        """
+        raise NotImplementedError
+
+    async def event_seqs(self, ledger_id: str, after_seq: int) -> list:
+        """Pasangan (seq, at) event dengan seq > ``after_seq``, urut naik."""
+        raise NotImplementedError
+
+    async def latest_snapshot(self, ledger_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def snapshot_as_of(self, ledger_id: str, as_of: datetime) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def insert_snapshot(self, snapshot: dict):
+        raise NotImplementedError
+
+    async def explain_events(self, ledger_id: str) -> dict:
+        return {}
+
+    # Idempotensi POST /transactions
+    async def insert_idempotency_key(self, key: str, fingerprint: str) -> bool:
+        """False jika kunci sudah ada."""
+        raise NotImplementedError
+
+    async def get_idempotency_key(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def delete_idempotency_key(self, key: str):
+        raise NotImplementedError
+
+    async def record_idempotency_transaction(self, key: str, transaction: dict):
+        """Catat transaksi yang akan dibuat, sebelum disimpan."""
+        raise NotImplementedError
+
+    async def reclaim_idempotency_key(self, key: str, stale_before: datetime) -> Optional[dict]:
+        """Ambil alih klaim tanpa respons yang dibuat sebelum ``stale_before``.
+
+        Mengembalikan dokumen kunci bila berhasil, None bila klaim masih aktif.
+        """
+        raise NotImplementedError
+
+    async def set_idempotency_response(self, key: str, response: dict):
+        raise NotImplementedError
+
+    # Laporan bulanan dan statement
+    async def save_monthly_report(self, ledger_id: str, report: dict):
+        raise NotImplementedError
+
+    async def list_monthly_reports(self, ledger_id: str, month_from: Optional[str], month_to: Optional[str]) -> List[dict]:
+        raise NotImplementedError
+
+    async def get_statement_pointer(self, pointer_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def save_statement_pointer(self, pointer_id: str, fingerprint: str, digest: str):
+        raise NotImplementedError
+
+    async def put_statement_artifact(self, artifact_id: str, body: bytes):
+        """Simpan artefak jika belum ada; isi dengan id yang sama selalu identik."""
+        raise NotImplementedError
+
+    async def get_statement_artifact(self, artifact_id: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    # Migrasi
+    async def migration_applied(self, name: str) -> bool:
+        raise NotImplementedError
+
+    async def record_migration(self, name: str, result: dict):
+        raise NotImplementedError
+
+    # Job latar belakang (dipakai jobs.JobScheduler)
+    async def init_job(self, name: str, schedule: str, next_run_at: datetime):
+        """Daftarkan job; jadwal berikutnya yang sudah tersimpan dipertahankan."""
+        raise NotImplementedError
+
+    async def claim_job(self, name: str, now: datetime, next_run_at: datetime, owner: str) -> bool:
+        """Geser jadwal yang sudah jatuh tempo secara atomik; hanya satu pemanggil yang menang."""
+        raise NotImplementedError
+
+    async def job_schedules(self, names: List[str]) -> List[dict]:
+        raise NotImplementedError
+
+    async def insert_job_run(self, run: dict):
+        raise NotImplementedError
+
+    async def update_job_run(self, run_id: str, fields: dict):
+        raise NotImplementedError
+
+    async def finish_job_run(self, run: dict, history_limit: int):
+        """Simpan hasil akhir, catat di job, dan pangkas riwayat job itu ke ``history_limit``."""
+        raise NotImplementedError
+
+    async def recent_job_runs(self, limit: int) -> List[dict]:
+        raise NotImplementedError
+
+
+def finished_job_fields(run: dict) -> dict:
+    return {
+        "last_run_id": run["_id"],
+        "last_status": run["status"],
+        "last_started_at": run["started_at"],
+        "last_finished_at": run["finished_at"],
+        "last_duration_ms": run["duration_ms"],
+        "last_error": run.get("error"),
+    }
+
+
+# --- MongoDB ---
+class MongoMetadataStore(MetadataStore):
+    name = "mongo"
+
+    def __init__(self, get_db: Callable):
+        self.get_db = get_db
+
+    async def has_admin_users(self):
+        return bool(await self.get_db().admin_users.count_documents({}, limit=1))
+
+    async def create_admin_user(self, username, password_hash):
+        try:
+            await self.get_db().admin_users.insert_one(
+                {"username": username, "password_hash": password_hash, "created_at": datetime.utcnow()}
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def get_admin_user(self, username):
+        return await self.get_db().admin_users.find_one({"username": username})
+
+    async def set_admin_password(self, username, password_hash):
+        result = await self.get_db().admin_users.update_one(
+            {"username": username},
+            {"$set": {"password_hash": password_hash}, "$setOnInsert": {"created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        return result.upserted_id is not None
+
+    async def get_ledger(self, ledger_id):
+        return await self.get_db().ledgers.find_one({"_id": ledger_id})
+
+    async def list_ledgers(self):
+        return await self.get_db().ledgers.find({}).to_list(None)
+
+    async def create_ledger(self, doc):
+        try:
+            await self.get_db().ledgers.insert_one(doc)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def bump_ledger_version(self, ledger_id, months):
+        # months=None berarti bulan yang terdampak tidak diketahui: naikkan epoch
+        inc = {"version": 1}
+        if months is None:
+            inc["epoch"] = 1
+        else:
+            inc.update({f"months.{month}": 1 for month in set(months)})
+        await self.get_db().ledger_versions.update_one(
+            {"_id": ledger_id}, {"$inc": inc, "$set": {"modified_at": datetime.utcnow()}}, upsert=True
+        )
+
+    async def get_ledger_version(self, ledger_id):
+        return await self.get_db().ledger_versions.find_one({"_id": ledger_id}) or {}
+
+    async def append_events(self, ledger_id, events):
+        counter = await self.get_db().counters.find_one_and_update(
+            {"_id": event_seq_id(ledger_id)}, {"$inc": {"seq": len(events)}}, upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        first_seq = counter["seq"] - len(events) + 1
+        now = datetime.utcnow()
+        for offset, event in enumerate(events):
+            event["ledger_id"] = ledger_id
+            event["seq"] = first_seq + offset
+            event["at"] = now
+        await self.get_db().ledger_events.insert_many(events)
+
+    async def current_event_seq(self, ledger_id):
+        counter = await self.get_db().counters.find_one({"_id": event_seq_id(ledger_id)})
+        return counter["seq"] if counter else 0
+
+    async def event_page(self, ledger_id, limit, before, transaction_id):
+        query = {"ledger_id": ledger_id}
+        if before is not None:
+            query["seq"] = {"$lt": before}
+        if transaction_id:
+            query["transaction_id"] = transaction_id
+        projection = {"_id": 0, "delta": 0, "ledger_id": 0}
+        return await self.get_db().ledger_events.find(query, projection).sort("seq", DESCENDING).limit(limit).to_list(limit)
+
+    async def sum_event_deltas(self, ledger_id, after_seq, as_of=None, up_to_seq=None):
+        match = {"ledger_id": ledger_id, "seq": {"$gt": after_seq}}
+        if up_to_seq is not None:
+            match["seq"]["$lte"] = up_to_seq
+        if as_of is not None:
+            match["at"] = {"$lte": as_of}
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": None,
+                "total_pemasukan": {"$sum": "$delta.total_pemasukan"},
+                "total_pengeluaran": {"$sum": "$delta.total_pengeluaran"},
+                "count": {"$sum": "$delta.count"},
+                "events": {"$sum": 1},
+                "seq": {"$max": "$seq"},
+                "at": {"$max": "$at"},
+            }},
+        ]
+        async for row in self.get_db().ledger_events.aggregate(pipeline):
+            # mongomock tetap mengembalikan satu grup kosong bila tidak ada event
+            return row if row["seq"] is not None else None
+        return None
+
+    async def event_seqs(self, ledger_id, after_seq):
+        cursor = self.get_db().ledger_events.find(
+            {"ledger_id": ledger_id, "seq": {"$gt": after_seq}}, {"_id": 0, "seq": 1, "at": 1}
+        ).sort("seq", ASCENDING)
+        return [(event["seq"], event["at"]) async for event in cursor]
+
+    async def latest_snapshot(self, ledger_id):
+        return await self.get_db().ledger_snapshots.find_one({"ledger_id": ledger_id}, sort=[("seq", DESCENDING)])
+
+    async def snapshot_as_of(self, ledger_id, as_of):
+        return await self.get_db().ledger_snapshots.find_one(
+            {"ledger_id": ledger_id, "at": {"$lte": as_of}}, sort=[("at", DESCENDING), ("seq", DESCENDING)]
+        )
+
+    async def insert_snapshot(self, snapshot):
+        await self.get_db().ledger_snapshots.insert_one(snapshot)
+
+    async def explain_events(self, ledger_id):
+        events = self.get_db().ledger_events.find({"ledger_id": ledger_id}).sort("seq", DESCENDING).limit(51)
+        return {"GET /api/events": summarize_plan(await events.explain())}
+
+    async def insert_idempotency_key(self, key, fingerprint):
+        try:
+            await self.get_db().idempotency_keys.insert_one(
+                {"_id": key, "fingerprint": fingerprint, "response": None, "created_at": datetime.utcnow()}
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def get_idempotency_key(self, key):
+        return await self.get_db().idempotency_keys.find_one({"_id": key})
+
+    async def delete_idempotency_key(self, key):
+        await self.get_db().idempotency_keys.delete_one({"_id": key})
+
+    async def record_idempotency_transaction(self, key, transaction):
+        await self.get_db().idempotency_keys.update_one({"_id": key}, {"$set": {"transaction": transaction}})
+
+    async def reclaim_idempotency_key(self, key, stale_before):
+        # created_at ikut diperbarui: klaim baru mendapat lease (dan TTL) penuh
+        return await self.get_db().idempotency_keys.find_one_and_update(
+            {"_id": key, "response": None, "created_at": {"$lt": stale_before}},
+            {"$set": {"created_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def set_idempotency_response(self, key, response):
+        await self.get_db().idempotency_keys.update_one({"_id": key}, {"$set": {"response": response}})
+
+    async def save_monthly_report(self, ledger_id, report):
+        await self.get_db().monthly_reports.replace_one(
+            {"_id": f"{ledger_id}:{report['month']}"}, {"ledger_id": ledger_id, **report}, upsert=True
+        )
+
+    async def list_monthly_reports(self, ledger_id, month_from, month_to):
+        query = {"ledger_id": ledger_id}
+        if month_from or month_to:
+            query["month"] = {}
+            if month_from:
+                query["month"]["$gte"] = month_from
+            if month_to:
+                query["month"]["$lte"] = month_to
+        reports = self.get_db().monthly_reports.find(query, {"_id": 0, "ledger_id": 0}).sort("month", DESCENDING)
+        return await reports.to_list(None)
+
+    async def get_statement_pointer(self, pointer_id):
+        return await self.get_db().statements.find_one({"_id": pointer_id})
+
+    async def save_statement_pointer(self, pointer_id, fingerprint, digest):
+        await self.get_db().statements.replace_one(
+            {"_id": pointer_id},
+            {"fingerprint": fingerprint, "digest": digest, "generated_at": datetime.utcnow()},
+            upsert=True,
+        )
+
+    async def put_statement_artifact(self, artifact_id, body):
+        await self.get_db().statement_artifacts.update_one(
+            {"_id": artifact_id},
+            {"$setOnInsert": {"body": body, "created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    async def get_statement_artifact(self, artifact_id):
+        artifact = await self.get_db().statement_artifacts.find_one({"_id": artifact_id})
+        return bytes(artifact["body"]) if artifact is not None else None
+
+    async def migration_applied(self, name):
+        return await self.get_db().schema_migrations.find_one({"_id": name}) is not None
+
+    async def record_migration(self, name, result):
+        await self.get_db().schema_migrations.insert_one({"_id": name, "applied_at": datetime.utcnow(), "result": result})
+
+    async def init_job(self, name, schedule, next_run_at):
+        jobs = self.get_db().jobs
+        await jobs.update_one(
+            {"_id": name}, {"$set": {"schedule": schedule}, "$setOnInsert": {"next_run_at": next_run_at}}, upsert=True
+        )
+        # Dokumen bisa sudah dibuat finish_job_run (run-job dari manage.py) tanpa jadwal
+        await jobs.update_one({"_id": name, "next_run_at": {"$exists": False}}, {"$set": {"next_run_at": next_run_at}})
+
+    async def claim_job(self, name, now, next_run_at, owner):
+        result = await self.get_db().jobs.update_one(
+            {"_id": name, "next_run_at": {"$lte": now}},
+            {"$set": {"next_run_at": next_run_at, "claimed_by": owner, "claimed_at": now}},
+        )
+        return result.modified_count == 1
+
+    async def job_schedules(self, names):
+        return [
+            {"name": doc.pop("_id"), **doc}
+            async for doc in self.get_db().jobs.find({"_id": {"$in": names}}).sort("_id", 1)
+        ]
+
+    async def insert_job_run(self, run):
+        await self.get_db().job_runs.insert_one(run)
+
+    async def update_job_run(self, run_id, fields):
+        await self.get_db().job_runs.update_one({"_id": run_id}, {"$set": fields})
+
+    async def finish_job_run(self, run, history_limit):
+        await self.get_db().job_runs.replace_one({"_id": run["_id"]}, run)
+        await self.get_db().jobs.update_one({"_id": run["job"]}, {"$set": finished_job_fields(run)}, upsert=True)
+        stale = self.get_db().job_runs.find({"job": run["job"]}, {"_id": 1}).sort("started_at", -1).skip(history_limit)
+        stale_ids = [doc["_id"] async for doc in stale]
+        if stale_ids:
+            await self.get_db().job_runs.delete_many({"_id": {"$in": stale_ids}})
+
+    async def recent_job_runs(self, limit):
+        if not limit:
+            return []
+        return [doc async for doc in self.get_db().job_runs.find({}).sort("started_at", -1).limit(limit)]
+
+
+# --- SQLite ---
+SQLITE_METADATA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS admin_users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS ledgers (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    max_transactions INTEGER,
+    cache_max_entries INTEGER,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS ledger_versions (
+    ledger_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    epoch INTEGER NOT NULL DEFAULT 0,
+    modified_at TEXT
+);
+CREATE TABLE IF NOT EXISTS ledger_month_versions (
+    ledger_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (ledger_id, month)
+);
+CREATE TABLE IF NOT EXISTS event_counters (
+    ledger_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ledger_events (
+    ledger_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    at TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    actor TEXT,
+    body TEXT NOT NULL,
+    delta_pemasukan INTEGER NOT NULL,
+    delta_pengeluaran INTEGER NOT NULL,
+    delta_count INTEGER NOT NULL,
+    PRIMARY KEY (ledger_id, seq)
+);
+CREATE INDEX IF NOT EXISTS ledger_events_transaction_seq ON ledger_events (ledger_id, transaction_id, seq);
+CREATE TABLE IF NOT EXISTS ledger_snapshots (
+    ledger_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    at TEXT NOT NULL,
+    total_pemasukan INTEGER NOT NULL,
+    total_pengeluaran INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    genesis INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ledger_snapshots_seq ON ledger_snapshots (ledger_id, seq DESC);
+CREATE INDEX IF NOT EXISTS ledger_snapshots_at_seq ON ledger_snapshots (ledger_id, at DESC, seq DESC);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    response TEXT,
+    pending TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idempotency_keys_created_at ON idempotency_keys (created_at);
+CREATE TABLE IF NOT EXISTS monthly_reports (
+    ledger_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    report TEXT NOT NULL,
+    PRIMARY KEY (ledger_id, month)
+);
+CREATE TABLE IF NOT EXISTS statements (
+    id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    generated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statement_artifacts (
+    id TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS statement_artifacts_created_at ON statement_artifacts (created_at);
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL,
+    result TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    schedule TEXT,
+    next_run_at TEXT,
+    claimed_by TEXT,
+    claimed_at TEXT,
+    last_run_id TEXT,
+    last_status TEXT,
+    last_started_at TEXT,
+    last_finished_at TEXT,
+    last_duration_ms REAL,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS job_runs (
+    id TEXT PRIMARY KEY,
+    job TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    run TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_runs_job_started ON job_runs (job, started_at DESC);
+CREATE INDEX IF NOT EXISTS job_runs_started ON job_runs (started_at DESC);
+"""
+JOB_TIME_COLUMNS = ("next_run_at", "claimed_at", "last_started_at", "last_finished_at")
+
+
+def dump_json(value) -> str:
+    # Dokumen bersarang (isi event, laporan, hasil job) disimpan sebagai JSON;
+    # datetime di dalamnya kembali sebagai string ISO
+    return orjson.dumps(value).decode()
+
+
+def decode_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+class SQLiteMetadataStore(MetadataStore):
+    """Tabel metadata di file SQLite transaksi; koneksi penulis sendiri yang dijaga lock.
+
+    SQLite tidak punya TTL index: kunci idempotensi dan artefak statement yang
+    kedaluwarsa diabaikan saat dibaca dan dibersihkan saat menulis.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, idempotency_ttl_seconds: float, artifact_ttl_seconds: float):
+        self.path = path
+        self.idempotency_ttl = timedelta(seconds=idempotency_ttl_seconds)
+        self.artifact_ttl = timedelta(seconds=artifact_ttl_seconds)
+        self._writer = None
+        self._reader = None
+        self._write_lock = asyncio.Lock()
+
+    async def setup(self):
+        if self._writer is not None:
+            return
+        self._writer = await connect_sqlite(self.path, readonly=False)
+        await self._writer.executescript(SQLITE_METADATA_SCHEMA)
+        self._reader = await connect_sqlite(self.path, readonly=True)
+
+    async def close(self):
+        for connection in (self._reader, self._writer):
+            if connection is not None:
+                await connection.close()
+        self._writer = self._reader = None
+
+    async def _fetchall(self, sql: str, params=()) -> list:
+        async with self._reader.execute(sql, params) as cursor:
+            return await cursor.fetchall()
+
+    async def _fetchone(self, sql: str, params=()):
+        async with self._reader.execute(sql, params) as cursor:
+            return await cursor.fetchone()
+
+    @asynccontextmanager
+    async def _transaction(self):
+        async with self._write_lock:
+            await self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.execute("ROLLBACK")
+                raise
+            await self._writer.execute("COMMIT")
+
+    async def _execute(self, sql: str, params=()) -> int:
+        async with self._transaction() as writer:
+            cursor = await writer.execute(sql, params)
+            return cursor.rowcount
+
+    async def has_admin_users(self):
+        return await self._fetchone("SELECT 1 FROM admin_users LIMIT 1") is not None
+
+    async def create_admin_user(self, username, password_hash):
+        inserted = await self._execute(
+            "INSERT OR IGNORE INTO admin_users (username, password_hash, created_at) VALUES (?, ?, ?)",
+            (username, password_hash, encode_time(datetime.utcnow())),
+        )
+        return inserted == 1
+
+    async def get_admin_user(self, username):
+        row = await self._fetchone("SELECT username, password_hash FROM admin_users WHERE username = ?", (username,))
+        return {"username": row[0], "password_hash": row[1]} if row else None
+
+    async def set_admin_password(self, username, password_hash):
+        async with self._transaction() as writer:
+            cursor = await writer.execute(
+                "UPDATE admin_users SET password_hash = ? WHERE username = ?", (password_hash, username)
+            )
+            if cursor.rowcount:
+                return False
+            await writer.execute(
+                "INSERT INTO admin_users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                (username, password_hash, encode_time(datetime.utcnow())),
+            )
+        return True
+
+    def _ledger_doc(self, row) -> dict:
+        doc = {"_id": row[0]}
+        for field, value in zip(LEDGER_FIELDS, row[1:]):
+            if value is not None:
+                doc[field] = decode_time(value) if field == "created_at" else value
+        return doc
+
+    async def get_ledger(self, ledger_id):
+        row = await self._fetchone(f"SELECT id, {', '.join(LEDGER_FIELDS)} FROM ledgers WHERE id = ?", (ledger_id,))
+        return self._ledger_doc(row) if row else None
+
+    async def list_ledgers(self):
+        rows = await self._fetchall(f"SELECT id, {', '.join(LEDGER_FIELDS)} FROM ledgers ORDER BY id")
+        return [self._ledger_doc(row) for row in rows]
+
+    async def create_ledger(self, doc):
+        inserted = await self._execute(
+            f"INSERT OR IGNORE INTO ledgers (id, {', '.join(LEDGER_FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+            (doc["_id"], doc["name"], doc.get("max_transactions"), doc.get("cache_max_entries"), encode_time(doc.get("created_at"))),
+        )
+        return inserted == 1
+
+    async def bump_ledger_version(self, ledger_id, months):
+        epoch = 1 if months is None else 0
+        async with self._transaction() as writer:
+            await writer.execute(
+                "INSERT INTO ledger_versions (ledger_id, version, epoch, modified_at) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT (ledger_id) DO UPDATE SET version = version + 1, epoch = epoch + excluded.epoch, "
+                "modified_at = excluded.modified_at",
+                (ledger_id, epoch, encode_time(datetime.utcnow())),
+            )
+            await writer.executemany(
+                "INSERT INTO ledger_month_versions (ledger_id, month, version) VALUES (?, ?, 1) "
+                "ON CONFLICT (ledger_id, month) DO UPDATE SET version = version + 1",
+                [(ledger_id, month) for month in set(months or ())],
+            )
+
+    async def get_ledger_version(self, ledger_id):
+        row = await self._fetchone(
+            "SELECT version, epoch, modified_at FROM ledger_versions WHERE ledger_id = ?", (ledger_id,)
+        )
+        if row is None:
+            return {}
+        months = await self._fetchall(
+            "SELECT month, version FROM ledger_month_versions WHERE ledger_id = ?", (ledger_id,)
+        )
+        return {"version": row[0], "epoch": row[1], "modified_at": decode_time(row[2]), "months": dict(months)}
+
+    async def append_events(self, ledger_id, events):
+        now = datetime.utcnow()
+        async with self._transaction() as writer:
+            # Seq dipesan dan event disimpan dalam satu transaksi: tidak ada celah seq
+            async with writer.execute(
+                "INSERT INTO event_counters (ledger_id, seq) VALUES (?, ?) "
+                "ON CONFLICT (ledger_id) DO UPDATE SET seq = seq + excluded.seq RETURNING seq",
+                (ledger_id, len(events)),
+            ) as cursor:
+                last_seq = (await cursor.fetchone())[0]
+            rows = []
+            for offset, event in enumerate(events):
+                event["ledger_id"] = ledger_id
+                event["seq"] = last_seq - len(events) + 1 + offset
+                event["at"] = now
+                body = {key: event[key] for key in ("transaction", "before") if key in event}
+                delta = event["delta"]
+                rows.append((
+                    ledger_id, event["seq"], event["type"], encode_time(now), event["transaction_id"], event["actor"],
+                    dump_json(body), delta["total_pemasukan"], delta["total_pengeluaran"], delta["count"],
+                ))
+            await writer.executemany(
+                "INSERT INTO ledger_events (ledger_id, seq, type, at, transaction_id, actor, body, "
+                "delta_pemasukan, delta_pengeluaran, delta_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    async def current_event_seq(self, ledger_id):
+        row = await self._fetchone("SELECT seq FROM event_counters WHERE ledger_id = ?", (ledger_id,))
+        return row[0] if row else 0
+
+    async def event_page(self, ledger_id, limit, before, transaction_id):
+        clauses, params = ["ledger_id = ?"], [ledger_id]
+        if before is not None:
+            clauses.append("seq < ?")
+            params.append(before)
+        if transaction_id:
+            clauses.append("transaction_id = ?")
+            params.append(transaction_id)
+        rows = await self._fetchall(
+            f"SELECT seq, type, at, transaction_id, actor, body FROM ledger_events WHERE {' AND '.join(clauses)} "
+            "ORDER BY seq DESC LIMIT ?",
+            params + [limit],
+        )
+        return [
+            {"seq": seq, "type": type, "at": decode_time(at), "transaction_id": transaction_id, "actor": actor, **orjson.loads(body)}
+            for seq, type, at, transaction_id, actor, body in rows
+        ]
+
+    async def sum_event_deltas(self, ledger_id, after_seq, as_of=None, up_to_seq=None):
+        sql = (
+            "SELECT COUNT(*), SUM(delta_pemasukan), SUM(delta_pengeluaran), SUM(delta_count), MAX(seq), MAX(at) "
+            "FROM ledger_events WHERE ledger_id = ? AND seq > ?"
+        )
+        params = [ledger_id, after_seq]
+        if as_of is not None:
+            sql += " AND at <= ?"
+            params.append(encode_time(as_of))
+        if up_to_seq is not None:
+            sql += " AND seq <= ?"
+            params.append(up_to_seq)
+        events, pemasukan, pengeluaran, count, seq, at = await self._fetchone(sql, params)
+        if not events:
+            return None
+        return {
+            "total_pemasukan": pemasukan, "total_pengeluaran": pengeluaran, "count": count,
+            "events": events, "seq": seq, "at": decode_time(at),
+        }
+
+    async def event_seqs(self, ledger_id, after_seq):
+        rows = await self._fetchall(
+            "SELECT seq, at FROM ledger_events WHERE ledger_id = ? AND seq > ? ORDER BY seq", (ledger_id, after_seq)
+        )
+        return [(seq, decode_time(at)) for seq, at in rows]
+
+    def _snapshot_doc(self, row) -> dict:
+        ledger_id, seq, at, pemasukan, pengeluaran, count, genesis = row
+        return {
+            "ledger_id": ledger_id, "seq": seq, "at": decode_time(at),
+            "total_pemasukan": pemasukan, "total_pengeluaran": pengeluaran, "count": count, "genesis": bool(genesis),
+        }
+
+    async def latest_snapshot(self, ledger_id):
+        row = await self._fetchone(
+            f"SELECT ledger_id, seq, at, {', '.join(TOTAL_KEYS)}, genesis FROM ledger_snapshots "
+            "WHERE ledger_id = ? ORDER BY seq DESC LIMIT 1",
+            (ledger_id,),
+        )
+        return self._snapshot_doc(row) if row else None
+
+    async def snapshot_as_of(self, ledger_id, as_of):
+        row = await self._fetchone(
+            f"SELECT ledger_id, seq, at, {', '.join(TOTAL_KEYS)}, genesis FROM ledger_snapshots "
+            "WHERE ledger_id = ? AND at <= ? ORDER BY at DESC, seq DESC LIMIT 1",
+            (ledger_id, encode_time(as_of)),
+        )
+        return self._snapshot_doc(row) if row else None
+
+    async def insert_snapshot(self, snapshot):
+        await self._execute(
+            f"INSERT INTO ledger_snapshots (ledger_id, seq, at, {', '.join(TOTAL_KEYS)}, genesis) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                snapshot["ledger_id"], snapshot["seq"], encode_time(snapshot["at"]),
+                *(snapshot[key] for key in TOTAL_KEYS), int(snapshot.get("genesis", False)),
+            ),
+        )
+
+    async def explain_events(self, ledger_id):
+        rows = await self._fetchall(
+            "EXPLAIN QUERY PLAN SELECT seq, type, at, transaction_id, actor, body FROM ledger_events "
+            "WHERE ledger_id = ? ORDER BY seq DESC LIMIT 51",
+            (ledger_id,),
+        )
+        return {"GET /api/events": summarize_sqlite_plan([row[-1] for row in rows], "ledger_events")}
+
+    def _idempotency_cutoff(self) -> str:
+        return encode_time(datetime.utcnow() - self.idempotency_ttl)
+
+    async def insert_idempotency_key(self, key, fingerprint):
+        async with self._transaction() as writer:
+            await writer.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (self._idempotency_cutoff(),))
+            cursor = await writer.execute(
+                "INSERT OR IGNORE INTO idempotency_keys (key, fingerprint, response, created_at) VALUES (?, ?, NULL, ?)",
+                (key, fingerprint, encode_time(datetime.utcnow())),
+            )
+            return cursor.rowcount == 1
+
+    def _idempotency_doc(self, key: str, row) -> dict:
+        fingerprint, response, pending, created_at = row
+        doc = {
+            "_id": key, "fingerprint": fingerprint, "created_at": decode_time(created_at),
+            "response": orjson.loads(response) if response is not None else None,
+        }
+        if pending is not None:
+            doc["transaction"] = orjson.loads(pending)
+        return doc
+
+    async def get_idempotency_key(self, key):
+        row = await self._fetchone(
+            "SELECT fingerprint, response, pending, created_at FROM idempotency_keys WHERE key = ? AND created_at >= ?",
+            (key, self._idempotency_cutoff()),
+        )
+        return self._idempotency_doc(key, row) if row is not None else None
+
+    async def delete_idempotency_key(self, key):
+        await self._execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+
+    async def record_idempotency_transaction(self, key, transaction):
+        await self._execute("UPDATE idempotency_keys SET pending = ? WHERE key = ?", (dump_json(transaction), key))
+
+    async def reclaim_idempotency_key(self, key, stale_before):
+        async with self._transaction() as writer:
+            async with writer.execute(
+                "UPDATE idempotency_keys SET created_at = ? "
+                "WHERE key = ? AND response IS NULL AND created_at < ? AND created_at >= ? "
+                "RETURNING fingerprint, response, pending, created_at",
+                (encode_time(datetime.utcnow()), key, encode_time(stale_before), self._idempotency_cutoff()),
+            ) as cursor:
+                row = await cursor.fetchone()
+        return self._idempotency_doc(key, row) if row is not None else None
+
+    async def set_idempotency_response(self, key, response):
+        await self._execute("UPDATE idempotency_keys SET response = ? WHERE key = ?", (dump_json(response), key))
+
+    async def save_monthly_report(self, ledger_id, report):
+        await self._execute(
+            "INSERT OR REPLACE INTO monthly_reports (ledger_id, month, report) VALUES (?, ?, ?)",
+            (ledger_id, report["month"], dump_json(report)),
+        )
+
+    async def list_monthly_reports(self, ledger_id, month_from, month_to):
+        clauses, params = ["ledger_id = ?"], [ledger_id]
+        if month_from:
+            clauses.append("month >= ?")
+            params.append(month_from)
+        if month_to:
+            clauses.append("month <= ?")
+            params.append(month_to)
+        rows = await self._fetchall(
+            f"SELECT report FROM monthly_reports WHERE {' AND '.join(clauses)} ORDER BY month DESC", params
+        )
+        return [orjson.loads(row[0]) for row in rows]
+
+    async def get_statement_pointer(self, pointer_id):
+        row = await self._fetchone("SELECT fingerprint, digest FROM statements WHERE id = ?", (pointer_id,))
+        return {"fingerprint": row[0], "digest": row[1]} if row else None
+
+    async def save_statement_pointer(self, pointer_id, fingerprint, digest):
+        await self._execute(
+            "INSERT OR REPLACE INTO statements (id, fingerprint, digest, generated_at) VALUES (?, ?, ?, ?)",
+            (pointer_id, fingerprint, digest, encode_time(datetime.utcnow())),
+        )
+
+    def _artifact_cutoff(self) -> str:
+        return encode_time(datetime.utcnow() - self.artifact_ttl)
+
+    async def put_statement_artifact(self, artifact_id, body):
+        async with self._transaction() as writer:
+            await writer.execute("DELETE FROM statement_artifacts WHERE created_at < ?", (self._artifact_cutoff(),))
+            await writer.execute(
+                "INSERT OR IGNORE INTO statement_artifacts (id, body, created_at) VALUES (?, ?, ?)",
+                (artifact_id, body, encode_time(datetime.utcnow())),
+            )
+
+    async def get_statement_artifact(self, artifact_id):
+        row = await self._fetchone(
+            "SELECT body FROM statement_artifacts WHERE id = ? AND created_at >= ?", (artifact_id, self._artifact_cutoff())
+        )
+        return bytes(row[0]) if row else None
+
+    async def migration_applied(self, name):
+        return await self._fetchone("SELECT 1 FROM schema_migrations WHERE name = ?", (name,)) is not None
+
+    async def record_migration(self, name, result):
+        await self._execute(
+            "INSERT INTO schema_migrations (name, applied_at, result) VALUES (?, ?, ?)",
+            (name, encode_time(datetime.utcnow()), dump_json(result)),
+        )
+
+    async def init_job(self, name, schedule, next_run_at):
+        await self._execute(
+            "INSERT INTO jobs (name, schedule, next_run_at) VALUES (?, ?, ?) ON CONFLICT (name) DO UPDATE SET "
+            "schedule = excluded.schedule, next_run_at = COALESCE(next_run_at, excluded.next_run_at)",
+            (name, schedule, encode_time(next_run_at)),
+        )
+
+    async def claim_job(self, name, now, next_run_at, owner):
+        claimed = await self._execute(
+            "UPDATE jobs SET next_run_at = ?, claimed_by = ?, claimed_at = ? WHERE name = ? AND next_run_at <= ?",
+            (encode_time(next_run_at), owner, encode_time(now), name, encode_time(now)),
+        )
+        return claimed == 1
+
+    async def job_schedules(self, names):
+        if not names:
+            return []
+        async with self._reader.execute(
+            f"SELECT * FROM jobs WHERE name IN ({', '.join('?' for _ in names)}) ORDER BY name", names
+        ) as cursor:
+            columns = [column[0] for column in cursor.description]
+            rows = await cursor.fetchall()
+        docs = []
+        for row in rows:
+            doc = dict(zip(columns, row))
+            for column in JOB_TIME_COLUMNS:
+                doc[column] = decode_time(doc[column])
+            docs.append(doc)
+        return docs
+
+    async def insert_job_run(self, run):
+        await self._execute(
+            "INSERT INTO job_runs (id, job, started_at, run) VALUES (?, ?, ?, ?)",
+            (run["_id"], run["job"], encode_time(run["started_at"]), dump_json(run)),
+        )
+
+    async def update_job_run(self, run_id, fields):
+        async with self._transaction() as writer:
+            async with writer.execute("SELECT run FROM job_runs WHERE id = ?", (run_id,)) as cursor:
+                row = await cursor.fetchone()
+            if row is not None:
+                await writer.execute(
+                    "UPDATE job_runs SET run = ? WHERE id = ?", (dump_json({**orjson.loads(row[0]), **fields}), run_id)
+                )
+
+    async def finish_job_run(self, run, history_limit):
+        fields = finished_job_fields(run)
+        values = [encode_time(value) if isinstance(value, datetime) else value for value in fields.values()]
+        async with self._transaction() as writer:
+            await writer.execute(
+                "INSERT OR REPLACE INTO job_runs (id, job, started_at, run) VALUES (?, ?, ?, ?)",
+                (run["_id"], run["job"], encode_time(run["started_at"]), dump_json(run)),
+            )
+            await writer.execute(
+                f"INSERT INTO jobs (name, {', '.join(fields)}) VALUES (?, {', '.join('?' for _ in fields)}) "
+                f"ON CONFLICT (name) DO UPDATE SET {', '.join(f'{field} = excluded.{field}' for field in fields)}",
+                [run["job"], *values],
+            )
+            await writer.execute(
+                "DELETE FROM job_runs WHERE job = ? AND id NOT IN "
+                "(SELECT id FROM job_runs WHERE job = ? ORDER BY started_at DESC LIMIT ?)",
+                (run["job"], run["job"], history_limit),
+            )
+
+    async def recent_job_runs(self, limit):
+        rows = await self._fetchall("SELECT run FROM job_runs ORDER BY started_at DESC LIMIT ?", (limit,))
+        return [orjson.loads(row[0]) for row in rows]
+
+
+def create_metadata_store(
+    backend: str, get_db: Callable, sqlite_path: str, idempotency_ttl_seconds: float, artifact_ttl_seconds: float,
+) -> MetadataStore:
+    if backend == "mongo":
+        return MongoMetadataStore(get_db)
+    if backend == "sqlite":
+        return SQLiteMetadataStore(sqlite_path, idempotency_ttl_seconds, artifact_ttl_seconds)
+    raise ValueError(f"STORAGE_BACKEND tidak dikenal: {backend}")
@@ -0,0 +1,137 @@
+"""Pembatasan laju per klien (token bucket) dan pembatas konkurensi global.
+
+Bucket disimpan di store yang bisa diganti: ``MemoryBucketStore`` untuk satu
+proses, atau ``MongoBucketStore`` bila beberapa proses harus berbagi kuota yang
+sama. ``ConcurrencyLimiter`` membatasi request berat yang berjalan bersamaan dan
+langsung menolak saat antrean penuh, agar latensi ekor tetap stabil saat lonjakan.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, NamedTuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+
+def decide(tokens: float, allowed: bool, rate: float, cost: float) -> RateLimitDecision:
+    retry_after = 0.0 if allowed else (cost - tokens) / rate
+    return RateLimitDecision(allowed, max(tokens, 0.0), retry_after)
+
+
+class MemoryBucketStore:
+    """Bucket in-process; kunci paling lama tidak dipakai dibuang saat melebihi ``max_keys``."""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> RateLimitDecision:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return decide(tokens, allowed, rate, cost)
+
+
+class MongoBucketStore:
+    """Bucket bersama di koleksi Mongo; isi ulang dan pengambilan token dalam satu update atomik.
+
+    Koleksi sebaiknya diberi TTL index pada ``updated_at`` agar bucket klien
+    yang sudah pergi terhapus sendiri.
+    """
+
+    def __init__(self, get_db: Callable, collection: str = "rate_limits"):
+        self.get_db = get_db
+        self.collection = collection
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> RateLimitDecision:
+        now = datetime.utcnow()
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {"$min": [burst, {"$add": [{"$ifNull": ["$tokens", burst]}, {"$multiply": [elapsed, rate]}]}]}
+        pipeline = [
+            {"$set": {"tokens": refilled, "updated_at": now}},
+            {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+            {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}},
+        ]
+        bucket = await self.get_db()[self.collection].find_one_and_update(
+            {"_id": key}, pipeline, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return decide(bucket["tokens"], bucket["allowed"], rate, cost)
+
+
+class TokenBucketLimiter:
+    """``rate`` token per detik dengan kapasitas ``burst``; satu request memakai satu token."""
+
+    def __init__(self, store, rate: float, burst: float):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+
+    async def check(self, key: str, cost: float = 1.0) -> RateLimitDecision:
+        try:
+            return await self.store.take(key, self.rate, self.burst, cost)
+        except PyMongoError:
+            # Store bersama bermasalah: lebih baik melayani daripada menolak semua klien
+            logger.warning("Store rate limit gagal, request %s diloloskan", key, exc_info=True)
+            return RateLimitDecision(True, self.burst, 0.0)
+
+
+class ConcurrencyLimiter:
+    """Semaphore dengan antrean terbatas.
+
+    Paling banyak ``max_concurrent`` request berjalan; ``max_waiting`` lainnya
+    boleh menunggu hingga ``wait_seconds``. Selebihnya ditolak seketika.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int = 0, wait_seconds: float = 0.5):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_seconds = wait_seconds
+        self.in_use = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def acquire(self) -> bool:
+        if self._semaphore.locked():
+            if self.waiting >= self.max_waiting or self.wait_seconds <= 0:
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.wait_seconds)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_use += 1
+        return True
+
+    def release(self):
+        self.in_use -= 1
+        self._semaphore.release()
+
+
+def create_bucket_store(name: str, get_db: Callable):
+    if name == "memory":
+        return MemoryBucketStore()
+    if name == "mongo":
+        return MongoBucketStore(get_db)
+    raise ValueError(f"RATE_LIMIT_STORE tidak dikenal: {name}")
@@ -1,18 +1,87 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from bson.int64 import Int64
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+from typing import Dict, Iterable, List, Optional
 import uuid
-from datetime import datetime
+import base64
+import binascii
+import json
+import asyncio
+import csv
+import io
+import hashlib
+import secrets
+import calendar
+import time
+from contextlib import asynccontextmanager
+import orjson
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+import math
+from email.utils import format_datetime, parsedate_to_datetime
+
+import auth
+import compression
+from cache import ResponseCache, TenantCaches
+from coalescer import WriteCoalescer
+from events import LedgerBroker
+import jobs
+import metadata
+import metrics
+import ratelimit
+import storage
+from metadata import EVENT_SEQ_ID, event_seq_id
+from storage import (
+    EXPORT_FIELDS,
+    LIVE_FILTER,
+    TOTAL_KEYS,
+    TRANSACTION_SORT,
+    group_by_ledger,
+    ledger_delta,
+)
+
+PROCESS_STARTED = time.perf_counter()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if STORAGE_BACKEND == "mongo":
+        # Hangatkan koneksi sekali di awal dan catat biaya cold start
+        ping_started = time.perf_counter()
+        try:
+            await get_client().admin.command("ping")
+            logger.info("Ping MongoDB %.1f ms", (time.perf_counter() - ping_started) * 1000)
+        except Exception:
+            logger.exception("Warm-up koneksi MongoDB gagal")
+        await ensure_indexes()
+    await get_storage().setup()
+    await get_metadata().setup()
+    await run_migrations()
+    await ensure_admin_user()
+    if not AUTH_SECRET:
+        logger.warning("AUTH_SECRET belum di-set: token admin tidak berlaku lintas proses/restart")
+    if JOBS_ENABLED:
+        await job_scheduler.start()
+    watch_task = asyncio.create_task(watch_ledger_changes())
+    logger.info("Cold start selesai dalam %.1f ms sejak import", (time.perf_counter() - PROCESS_STARTED) * 1000)
+    yield
+    await job_scheduler.stop()
+    watch_task.cancel()
+    await close_storage()
+    await close_client()
 
 # 1. Buat aplikasi FastAPI terlebih dahulu
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 @app.get("/")
 def read_root():
     return {"message": "Hello World"}
@@ -25,43 +94,376 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 # --- Konfigurasi lainnya ---
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Kompresi respons: Brotli jika paket brotli terpasang, selain itu gzip.
+# Dipasang setelah .env dimuat agar pengaturannya ikut terbaca
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '5'))
+app.add_middleware(
+    compression.CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=GZIP_LEVEL,
+    brotli_quality=BROTLI_QUALITY,
+)
+
 mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+
+# Client Motor dibuat malas (saat pertama dipakai atau di lifespan), bukan saat import,
+# lalu dipakai ulang selama proses hidup (termasuk invocation hangat di serverless)
+mongo_client: Optional[AsyncIOMotorClient] = None
+database = None
+
+def mongo_client_options() -> dict:
+    options = {
+        "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '50')),
+        "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+        "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+        "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000')),
+    }
+    compressors = os.environ.get('MONGO_COMPRESSORS')
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+def get_client() -> AsyncIOMotorClient:
+    global mongo_client
+    if mongo_client is None:
+        started = time.perf_counter()
+        mongo_client = AsyncIOMotorClient(
+            mongo_url, event_listeners=[metrics.MongoCommandMetrics()], **mongo_client_options()
+        )
+        logger.info("Client MongoDB dibuat dalam %.1f ms", (time.perf_counter() - started) * 1000)
+    return mongo_client
+
+def get_db():
+    global database
+    if database is None:
+        database = get_client()[os.environ.get('DB_NAME')]
+    return database
+
+async def close_client():
+    global mongo_client, database
+    if mongo_client is not None:
+        mongo_client.close()
+    mongo_client = None
+    database = None
+
+# Penyimpanan transaksi dan metadata: "mongo" (bawaan) atau "sqlite" untuk test dan
+# deployment kecil; mode sqlite tidak membutuhkan server Mongo sama sekali
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', str(ROOT_DIR / 'jurnalkas.db'))
+transaction_storage: Optional[storage.TransactionRepository] = None
+metadata_store: Optional[metadata.MetadataStore] = None
+
+def get_storage() -> storage.TransactionRepository:
+    global transaction_storage
+    if transaction_storage is None:
+        transaction_storage = storage.create_repository(STORAGE_BACKEND, get_db, SQLITE_PATH)
+    return transaction_storage
+
+def get_metadata() -> metadata.MetadataStore:
+    global metadata_store
+    if metadata_store is None:
+        metadata_store = metadata.create_metadata_store(
+            STORAGE_BACKEND, get_db, SQLITE_PATH, IDEMPOTENCY_TTL_SECONDS, STATEMENT_ARTIFACT_TTL_SECONDS,
+        )
+    return metadata_store
+
+async def close_storage():
+    global transaction_storage, metadata_store
+    for store in (transaction_storage, metadata_store):
+        if store is not None:
+            await store.close()
+    transaction_storage = None
+    metadata_store = None
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Sama dengan strftime("%B") pada locale default, tanpa biaya strftime per baris
+MONTH_NAMES = tuple(calendar.month_name)
+
+# Setiap ledger (komunitas) adalah tenant; route lama tanpa /ledgers/{id} memakai ledger bawaan
+DEFAULT_LEDGER = "default"
+LEDGER_ID_PATTERN = "^[a-z0-9][a-z0-9_-]{0,63}$"
+# Kuota bawaan per ledger; 0 = tanpa batas. Bisa ditimpa per dokumen di koleksi ledgers
+LEDGER_MAX_TRANSACTIONS = int(os.environ.get('LEDGER_MAX_TRANSACTIONS', '0'))
+
+# Index yang dibutuhkan query pada koleksi transactions (penyimpanan Mongo). Semua index query diawali
+# ledger_id agar ledger kecil hanya memindai rentang index miliknya sendiri
+TRANSACTION_INDEXES = [
+    # delete_transaction dan pencarian per id
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    # Urutan jurnal dan keyset pagination; prefiks tanggal juga melayani sort tanggal saja
+    IndexModel([("ledger_id", ASCENDING)] + TRANSACTION_SORT, name="ledger_tanggal_id_desc_live", partialFilterExpression=LIVE_FILTER),
+    # Tampilan yang difilter per jenis
+    IndexModel([("ledger_id", ASCENDING), ("jenis", ASCENDING), ("tanggal", DESCENDING)], name="ledger_jenis_tanggal_desc_live", partialFilterExpression=LIVE_FILTER),
+    # Pencarian keterangan; tanpa stemming karena teksnya berbahasa Indonesia
+    IndexModel([("ledger_id", ASCENDING), ("keterangan", TEXT)], name="ledger_keterangan_text_live", default_language="none", partialFilterExpression=LIVE_FILTER),
+]
+
+# Index lama yang digantikan index di atas
+OBSOLETE_INDEXES = {
+    "transactions": [
+        "tanggal_id_desc", "jenis_tanggal_desc", "keterangan_text",
+        "tanggal_id_desc_live", "jenis_tanggal_desc_live", "keterangan_text_live",
+    ],
+    "ledger_rollups": ["granularity_period"],
+    "ledger_events": ["seq_unique", "transaction_seq"],
+    "ledger_snapshots": ["at_seq_desc"],
+}
+
+ROLLUP_INDEXES = [
+    IndexModel([("ledger_id", ASCENDING), ("granularity", ASCENDING), ("period", ASCENDING)], name="ledger_granularity_period"),
+]
+
+ADMIN_USER_INDEXES = [
+    IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+]
+
+# Kunci idempotensi dihapus otomatis oleh Mongo setelah TTL
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+# Klaim tanpa respons yang lebih tua dari ini dianggap milik proses yang mati dan boleh diambil alih
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', '60'))
+IDEMPOTENCY_INDEXES = [
+    IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS),
+]
+
+# Log audit append-only dan snapshot total untuk query saldo pada titik waktu tertentu
+EVENT_INDEXES = [
+    IndexModel([("ledger_id", ASCENDING), ("seq", ASCENDING)], name="ledger_seq_unique", unique=True),
+    IndexModel([("ledger_id", ASCENDING), ("transaction_id", ASCENDING), ("seq", ASCENDING)], name="ledger_transaction_seq"),
+]
+
+SNAPSHOT_INDEXES = [
+    IndexModel([("ledger_id", ASCENDING), ("at", DESCENDING), ("seq", DESCENDING)], name="ledger_at_seq_desc"),
+]
+# Celah seq yang lebih tua dari ini dianggap permanen (penulis mati setelah memesan seq)
+SNAPSHOT_GAP_GRACE_SECONDS = int(os.environ.get('SNAPSHOT_GAP_GRACE_SECONDS', '300'))
+
+# Riwayat job latar belakang dan laporan bulanan hasil pra-render
+JOB_RUN_INDEXES = [
+    IndexModel([("job", ASCENDING), ("started_at", DESCENDING)], name="job_started_desc"),
+    IndexModel([("started_at", DESCENDING)], name="started_desc"),
+]
+
+MONTHLY_REPORT_INDEXES = [
+    IndexModel([("ledger_id", ASCENDING), ("month", DESCENDING)], name="ledger_month_desc"),
+]
+
+# Artefak statement dialamatkan dengan hash isinya; yang kedaluwarsa dirender ulang saat diminta
+STATEMENT_ARTIFACT_TTL_SECONDS = int(os.environ.get('STATEMENT_ARTIFACT_TTL_SECONDS', str(90 * 24 * 3600)))
+STATEMENT_ARTIFACT_INDEXES = [
+    IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=STATEMENT_ARTIFACT_TTL_SECONDS),
+]
+
+# Bucket rate limit bersama (RATE_LIMIT_STORE=mongo) milik klien yang sudah pergi dihapus TTL
+RATE_LIMIT_BUCKET_TTL_SECONDS = int(os.environ.get('RATE_LIMIT_BUCKET_TTL_SECONDS', '3600'))
+RATE_LIMIT_INDEXES = [
+    IndexModel([("updated_at", ASCENDING)], name="updated_at_ttl", expireAfterSeconds=RATE_LIMIT_BUCKET_TTL_SECONDS),
+]
+
+COLLECTION_INDEXES = {
+    "transactions": TRANSACTION_INDEXES,
+    "ledger_rollups": ROLLUP_INDEXES,
+    "admin_users": ADMIN_USER_INDEXES,
+    "idempotency_keys": IDEMPOTENCY_INDEXES,
+    "ledger_events": EVENT_INDEXES,
+    "ledger_snapshots": SNAPSHOT_INDEXES,
+    "job_runs": JOB_RUN_INDEXES,
+    "monthly_reports": MONTHLY_REPORT_INDEXES,
+    "statement_artifacts": STATEMENT_ARTIFACT_INDEXES,
+    "rate_limits": RATE_LIMIT_INDEXES,
+}
+
+RECONCILE_INTERVAL_SECONDS = int(os.environ.get('RECONCILE_INTERVAL_SECONDS', '3600'))
+# Job latar belakang; matikan (JOBS_ENABLED=false) di proses yang tidak boleh
+# menjalankan pekerjaan panjang, misal fungsi serverless
+JOBS_ENABLED = os.environ.get('JOBS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+# Jam (UTC) untuk job malam; 19:00 UTC = 02:00 WIB
+NIGHTLY_JOB_HOUR_UTC = int(os.environ.get('NIGHTLY_JOB_HOUR_UTC', '19'))
+MONTH_PATTERN = "^[0-9]{4}-(0[1-9]|1[0-2])$"
+DEFAULT_EVENT_PAGE_SIZE = 50
+
+ROLLUP_GRANULARITY_PATTERN = "^(day|month|year)$"
+
+# Autentikasi admin: token HMAC bertanda tangan, diverifikasi tanpa akses database
+AUTH_SECRET = os.environ.get('AUTH_SECRET')
+token_signer = auth.TokenSigner(
+    secret=AUTH_SECRET.encode() if AUTH_SECRET else secrets.token_bytes(32),
+    ttl_seconds=int(os.environ.get('AUTH_TOKEN_TTL_SECONDS', str(12 * 3600))),
+)
+revoked_tokens = auth.RevocationList()
+login_limiter = auth.LoginRateLimiter(
+    max_attempts=int(os.environ.get('LOGIN_MAX_ATTEMPTS', '5')),
+    window_seconds=float(os.environ.get('LOGIN_WINDOW_SECONDS', '60')),
+)
+
+# Di belakang reverse proxy, IP klien diambil dari X-Forwarded-For; hanya aktifkan
+# jika proxy menimpa header itu, kalau tidak klien bisa memalsukannya
+TRUST_PROXY_HEADERS = os.environ.get('TRUST_PROXY_HEADERS', 'false').lower() in ('1', 'true', 'yes')
+
+# Rate limit endpoint baca publik per klien (IP, atau admin untuk token yang valid)
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', '5'))
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', '30'))
+# memory: per proses; mongo: kuota dibagi semua proses lewat koleksi rate_limits
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'memory')
+
+# Batas request baca berat yang berjalan bersamaan; kelebihannya dijawab 503
+GUARDED_MAX_CONCURRENT = int(os.environ.get('GUARDED_MAX_CONCURRENT', '32'))
+GUARDED_MAX_WAITING = int(os.environ.get('GUARDED_MAX_WAITING', '64'))
+GUARDED_WAIT_SECONDS = float(os.environ.get('GUARDED_WAIT_SECONDS', '0.5'))
+read_rate_limiter = ratelimit.TokenBucketLimiter(
+    ratelimit.create_bucket_store(RATE_LIMIT_STORE, get_db), rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST,
+)
+guarded_requests = ratelimit.ConcurrencyLimiter(GUARDED_MAX_CONCURRENT, GUARDED_MAX_WAITING, GUARDED_WAIT_SECONDS)
+
+# Penggabungan POST konkuren menjadi satu insert_many; 0 = nonaktif
+WRITE_COALESCE_MS = float(os.environ.get('WRITE_COALESCE_MS', '0'))
+WRITE_COALESCE_MAX_BATCH = int(os.environ.get('WRITE_COALESCE_MAX_BATCH', '500'))
+
+# Feed SSE: interval keep-alive agar proxy tidak memutus koneksi yang diam
+SSE_KEEPALIVE_SECONDS = 15
+ledger_broker = LedgerBroker(queue_size=int(os.environ.get('SSE_QUEUE_SIZE', '100')))
+# Change stream yang putus dicoba lagi dengan backoff eksponensial
+WATCH_RETRY_SECONDS = 1.0
+WATCH_RETRY_MAX_SECONDS = 60.0
+# Kode error MongoDB standalone: $changeStream hanya untuk replica set
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+EXPORT_BATCH_SIZE = 1000
+
+# Cache respons per ledger: invalidasi dan kuota entri tidak saling mengganggu antar ledger
+response_caches = TenantCaches(
+    max_entries_per_tenant=int(os.environ.get('CACHE_MAX_ENTRIES', '256')),
+    ttl_seconds=float(os.environ.get('CACHE_TTL_SECONDS', '30')),
+    max_tenants=int(os.environ.get('CACHE_MAX_LEDGERS', '64')),
+)
+
+# Browser/CDN boleh menyimpan respons baca publik tapi wajib revalidasi
+# (If-None-Match / If-Modified-Since) setelah max-age habis
+HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', '0'))
+HTTP_CACHE_CONTROL = f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate"
+
+# Artefak statement tidak pernah basi (kuncinya hash isi), jadi cukup dibatasi ukurannya
+statement_cache = ResponseCache(
+    max_entries=int(os.environ.get('STATEMENT_CACHE_ENTRIES', '128')),
+    ttl_seconds=float(os.environ.get('STATEMENT_CACHE_TTL_SECONDS', '3600')),
+)
+
+BULK_CHUNK_SIZE = 1000
+BULK_MAX_ROWS = 100000
 
 # 3. KEMBALIKAN prefix="/api" untuk Vercel
 api_router = APIRouter(prefix="/api")
+# Route per ledger; dipasang di /api (ledger bawaan) dan /api/ledgers/{ledger_id}
+ledger_router = APIRouter()
 
 security = HTTPBearer()
 
 # --- Models (Tetap sama) ---
+# Jumlah uang disimpan sebagai rupiah bulat (int64), bukan float. Batasnya jauh di
+# bawah int64 agar total ledger dan rollup ($inc Mongo, SUM() SQLite) tidak meluap:
+# 9.000 transaksi sebesar batas ini pun masih muat di int64
+MAX_JUMLAH = 10 ** 15
+
+def parse_rupiah(value):
+    if isinstance(value, bool):
+        raise ValueError("jumlah harus berupa angka")
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError("jumlah harus berupa angka")
+    if not amount.is_finite() or amount != amount.to_integral_value():
+        raise ValueError("jumlah harus bilangan bulat rupiah")
+    if not 0 < amount <= MAX_JUMLAH:
+        raise ValueError(f"jumlah harus antara 1 dan {MAX_JUMLAH}")
+    return int(amount)
+
+# Mongo menyimpan datetime dalam UTC tanpa offset; kunci turunan (periode rollup,
+# bulan laporan) harus memakai kalender yang sama dengan yang tersimpan
+def to_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 class Transaction(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     tanggal: datetime = Field(default_factory=datetime.utcnow)
     keterangan: str
     jenis: str
-    jumlah: float
+    jumlah: int
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class TransactionCreate(BaseModel):
     tanggal: datetime
     keterangan: str
     jenis: str
-    jumlah: float
+    jumlah: int
+
+    _parse_jumlah = field_validator("jumlah", mode="before")(parse_rupiah)
+    _normalize_tanggal = field_validator("tanggal")(to_naive_utc)
 
 class TransactionResponse(BaseModel):
     id: str
     tanggal: str
     keterangan: str
     jenis: str
-    jumlah: float
-    pemasukan: Optional[float] = None
-    pengeluaran: Optional[float] = None
+    jumlah: int
+    pemasukan: Optional[int] = None
+    pengeluaran: Optional[int] = None
+
+class LedgerEvent(BaseModel):
+    seq: int
+    type: str
+    at: datetime
+    transaction_id: str
+    actor: Optional[str] = None
+    transaction: dict
+    before: Optional[dict] = None
+
+class EventPage(BaseModel):
+    items: List[LedgerEvent]
+    next_before: Optional[int] = None
+
+class LedgerCreate(BaseModel):
+    id: str = Field(pattern=LEDGER_ID_PATTERN)
+    name: str
+    max_transactions: Optional[int] = Field(None, ge=0)
+    cache_max_entries: Optional[int] = Field(None, ge=1)
+
+class Ledger(BaseModel):
+    id: str
+    name: str
+    max_transactions: Optional[int] = None
+    cache_max_entries: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+class TransactionPage(BaseModel):
+    items: List[TransactionResponse]
+    next_cursor: Optional[str] = None
+
+class BulkRowResult(BaseModel):
+    row: int
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    failed: int
+    results: List[BulkRowResult]
 
 class AdminLogin(BaseModel):
     username: str
@@ -70,79 +472,1222 @@ class AdminLogin(BaseModel):
 class LoginResponse(BaseModel):
     message: str
     token: str
+    expires_at: Optional[datetime] = None
 
 class Summary(BaseModel):
-    total_pemasukan: float
-    total_pengeluaran: float
-    saldo: float
+    total_pemasukan: int
+    total_pengeluaran: int
+    saldo: int
+
+class PeriodRollup(BaseModel):
+    period: str
+    pemasukan: int
+    pengeluaran: int
+    saldo: int
+    count: int
+
+class MonthlyReport(BaseModel):
+    month: str
+    saldo_awal: int
+    pemasukan: int
+    pengeluaran: int
+    saldo_akhir: int
+    count: int
+    generated_at: datetime
+
+class StatementEntry(BaseModel):
+    id: str
+    tanggal: str
+    keterangan: str
+    jenis: str
+    jumlah: int
+    saldo: int
+
+class Statement(BaseModel):
+    ledger_id: str
+    ledger_name: str
+    month: str
+    saldo_awal: int
+    total_pemasukan: int
+    total_pengeluaran: int
+    saldo_akhir: int
+    count: int
+    entries: List[StatementEntry]
+
+class BalancePoint(BaseModel):
+    period: str
+    pemasukan: int
+    pengeluaran: int
+    saldo_berjalan: int
 
 # --- Routes (Tetap sama) ---
 async def verify_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    if credentials.credentials != "admin_session_token":
+    try:
+        claims = token_signer.verify(credentials.credentials)
+    except auth.InvalidToken:
         raise HTTPException(status_code=401, detail="Invalid authentication")
-    return credentials.credentials
+    if revoked_tokens.is_revoked(claims["jti"]):
+        raise HTTPException(status_code=401, detail="Invalid authentication")
+    return claims
+
+async def ensure_admin_user():
+    # Admin awal dibuat dari env hanya jika belum ada admin sama sekali
+    if await get_metadata().has_admin_users():
+        return
+    username = os.environ.get('ADMIN_USERNAME', 'admin')
+    password = os.environ.get('ADMIN_PASSWORD')
+    if not password:
+        password = "admin"
+        logger.warning("ADMIN_PASSWORD belum di-set, memakai password bawaan; segera ganti")
+    password_hash = await asyncio.to_thread(auth.hash_password, password)
+    # False: proses lain sudah membuatnya lebih dulu
+    if await get_metadata().create_admin_user(username, password_hash):
+        logger.info("Admin awal '%s' dibuat", username)
+
+# --- Rate limit & load shedding ---
+def client_ip(request: Request) -> str:
+    if TRUST_PROXY_HEADERS:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+def rate_limit_key(request: Request) -> str:
+    # Hanya token yang valid mendapat bucket sendiri; token acak tidak bisa dipakai
+    # untuk terus membuat bucket baru
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return f"admin:{token_signer.verify(token)['sub']}"
+        except auth.InvalidToken:
+            pass
+    return f"ip:{client_ip(request)}"
+
+async def rate_limit_public_read(request: Request):
+    """Token bucket per klien untuk endpoint baca publik."""
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    if RATE_LIMIT_ENABLED:
+        decision = await read_rate_limiter.check(rate_limit_key(request))
+        if not decision.allowed:
+            metrics.REJECTED_REQUESTS.inc("rate_limit", route)
+            raise HTTPException(
+                status_code=429,
+                detail="Terlalu banyak permintaan, coba lagi nanti",
+                headers={"Retry-After": str(math.ceil(decision.retry_after)), "X-RateLimit-Limit": f"{read_rate_limiter.burst:g}"},
+            )
+
+async def acquire_read_slot(request: Request):
+    if not await guarded_requests.acquire():
+        metrics.REJECTED_REQUESTS.inc("overload", getattr(request.scope.get("route"), "path", "unmatched"))
+        raise HTTPException(status_code=503, detail="Server sedang sibuk, coba lagi sebentar", headers={"Retry-After": "1"})
+    metrics.GUARDED_REQUESTS_IN_FLIGHT.inc()
+
+def release_read_slot():
+    metrics.GUARDED_REQUESTS_IN_FLIGHT.dec()
+    guarded_requests.release()
+
+async def guard_public_read(request: Request):
+    """Token bucket per klien lalu slot konkurensi global untuk endpoint baca yang berat.
+
+    Bagian setelah ``yield`` jalan sebelum body respons dikirim; endpoint streaming
+    memakai ``guarded_stream`` agar slot dipegang sampai stream selesai.
+    """
+    await rate_limit_public_read(request)
+    await acquire_read_slot(request)
+    try:
+        yield
+    finally:
+        release_read_slot()
+
+def guarded_stream(body) -> tuple:
+    """Bungkus body streaming yang slotnya sudah diambil dengan ``acquire_read_slot``.
+
+    Slot dilepas di ``finally`` generator, atau lewat background task bila klien
+    putus sebelum generator sempat berjalan; mana pun yang lebih dulu.
+    """
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            release_read_slot()
+
+    async def stream():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            release()
+
+    return stream(), BackgroundTask(release)
 
 @api_router.post("/login", response_model=LoginResponse)
-async def login(login_data: AdminLogin):
-    if login_data.username == "admin" and login_data.password == "admin":
-        return LoginResponse(message="Login berhasil", token="admin_session_token")
+async def login(login_data: AdminLogin, request: Request):
+    client_key = client_ip(request)
+    retry_after = login_limiter.retry_after(client_key)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Terlalu banyak percobaan login, coba lagi nanti",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+    user = await get_metadata().get_admin_user(login_data.username)
+    # scrypt memakan CPU: jalankan di thread agar event loop tetap melayani request lain
+    if user and await asyncio.to_thread(auth.verify_password, login_data.password, user["password_hash"]):
+        login_limiter.reset(client_key)
+        issued = token_signer.issue(user["username"])
+        return LoginResponse(
+            message="Login berhasil",
+            token=issued["token"],
+            expires_at=datetime.utcfromtimestamp(issued["claims"]["exp"])
+        )
     else:
+        login_limiter.record_failure(client_key)
         raise HTTPException(status_code=401, detail="Username atau password salah")
 
-@api_router.get("/transactions", response_model=List[TransactionResponse])
-async def get_transactions():
-    transactions = await db.transactions.find().sort("tanggal", -1).to_list(1000)
-    result = []
-    for transaction in transactions:
-        trans_response = TransactionResponse(
-            id=transaction["id"],
-            tanggal=transaction["tanggal"].strftime("%d %B %Y"),
-            keterangan=transaction["keterangan"],
-            jenis=transaction["jenis"],
-            jumlah=transaction["jumlah"],
-            pemasukan=transaction["jumlah"] if transaction["jenis"] == "pemasukan" else None,
-            pengeluaran=transaction["jumlah"] if transaction["jenis"] == "pengeluaran" else None
+@api_router.post("/logout")
+async def logout(claims: dict = Depends(verify_admin)):
+    revoked_tokens.revoke(claims["jti"], claims["exp"])
+    return {"message": "Logout berhasil"}
+
+# --- Ledgers (tenant) ---
+# Dokumen ledger jarang berubah: simpan di memori agar tiap request tidak perlu lookup
+known_ledgers: Dict[str, dict] = {}
+
+def default_ledger_doc() -> dict:
+    return {"_id": DEFAULT_LEDGER, "name": "TVRI Berkeringat Badminton"}
+
+async def get_ledger(ledger_id: str) -> Optional[dict]:
+    ledger = known_ledgers.get(ledger_id)
+    if ledger is None:
+        ledger = await get_metadata().get_ledger(ledger_id)
+        if ledger is None and ledger_id == DEFAULT_LEDGER:
+            ledger = default_ledger_doc()
+        if ledger is not None:
+            known_ledgers[ledger_id] = ledger
+    return ledger
+
+async def current_ledger(request: Request) -> str:
+    ledger_id = request.path_params.get("ledger_id", DEFAULT_LEDGER)
+    if await get_ledger(ledger_id) is None:
+        raise HTTPException(status_code=404, detail="Ledger tidak ditemukan")
+    return ledger_id
+
+async def list_ledger_ids() -> list:
+    ledger_ids = {DEFAULT_LEDGER}
+    for ledger in await get_metadata().list_ledgers():
+        ledger_ids.add(ledger["_id"])
+    return sorted(ledger_ids)
+
+def serialize_ledger(ledger: dict) -> dict:
+    return Ledger(id=ledger["_id"], **{k: v for k, v in ledger.items() if k != "_id"}).dict()
+
+async def enforce_ledger_quota(ledger_id: str, incoming: int):
+    ledger = await get_ledger(ledger_id)
+    limit = ledger.get("max_transactions") or LEDGER_MAX_TRANSACTIONS
+    if not limit:
+        return
+    totals = await get_storage().totals(ledger_id)
+    if totals["count"] + incoming > limit:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Kuota ledger terlampaui: maksimal {limit} transaksi",
         )
-        result.append(trans_response)
-    return result
 
-@api_router.get("/summary", response_model=Summary)
-async def get_summary():
-    transactions = await db.transactions.find().to_list(1000)
-    total_pemasukan = sum(t["jumlah"] for t in transactions if t["jenis"] == "pemasukan")
-    total_pengeluaran = sum(t["jumlah"] for t in transactions if t["jenis"] == "pengeluaran")
+@api_router.get("/ledgers", response_model=List[Ledger])
+async def get_ledgers():
+    ledgers = {DEFAULT_LEDGER: default_ledger_doc()}
+    for ledger in await get_metadata().list_ledgers():
+        ledgers[ledger["_id"]] = ledger
+    return [serialize_ledger(ledger) for _, ledger in sorted(ledgers.items())]
+
+@api_router.post("/ledgers", response_model=Ledger)
+async def create_ledger(ledger: LedgerCreate, token: dict = Depends(verify_admin)):
+    if ledger.id == DEFAULT_LEDGER:
+        raise HTTPException(status_code=409, detail="Ledger sudah ada")
+    doc = {"_id": ledger.id, **ledger.dict(exclude={"id"}, exclude_none=True), "created_at": datetime.utcnow()}
+    if not await get_metadata().create_ledger(doc):
+        raise HTTPException(status_code=409, detail="Ledger sudah ada")
+    known_ledgers[ledger.id] = doc
+    await ensure_genesis_snapshot(ledger.id)
+    return serialize_ledger(doc)
+
+# --- Pagination helpers ---
+def encode_cursor(tanggal: datetime, transaction_id: str) -> str:
+    payload = json.dumps({"t": tanggal.isoformat(), "id": transaction_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), str(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor tidak valid")
+
+# --- Filters ---
+def transaction_filters(
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    jenis: Optional[str] = Query(None, pattern="^(pemasukan|pengeluaran)$"),
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+) -> dict:
+    # Filter netral; repository menerjemahkannya ke query native.
+    # "to" eksklusif: from=2024-05-01&to=2024-06-01 berarti satu bulan Mei
+    filters = {"date_from": date_from, "date_to": date_to, "jenis": jenis, "q": q}
+    return {key: value for key, value in filters.items() if value}
+
+def format_tanggal(tanggal: datetime) -> str:
+    return f"{tanggal.day:02d} {MONTH_NAMES[tanggal.month]} {tanggal.year}"
+
+def serialize_transaction(transaction: dict) -> dict:
+    # Jalur cepat: dict polos sesuai bentuk TransactionResponse, tanpa validasi Pydantic per baris
+    jenis = transaction["jenis"]
+    jumlah = transaction["jumlah"]
+    return {
+        "id": transaction["id"],
+        "tanggal": format_tanggal(transaction["tanggal"]),
+        "keterangan": transaction["keterangan"],
+        "jenis": jenis,
+        "jumlah": jumlah,
+        "pemasukan": jumlah if jenis == "pemasukan" else None,
+        "pengeluaran": jumlah if jenis == "pengeluaran" else None,
+    }
+
+# --- Ledger version & conditional GET ---
+def month_key(tanggal: datetime) -> str:
+    return f"{tanggal.year:04d}-{tanggal.month:02d}"
+
+async def ledger_changed(ledger_id: str, months: Optional[Iterable[str]] = None):
+    # Versi ledger dipakai bersama semua proses untuk ETag/Last-Modified,
+    # karena itu disimpan di metadata store, bukan hanya di cache lokal. Versi per
+    # bulan menentukan statement mana yang perlu dirender ulang; months=None berarti
+    # bulan yang terdampak tidak diketahui (misal rollup dibangun ulang)
+    await get_metadata().bump_ledger_version(ledger_id, months)
+    response_caches.invalidate(ledger_id)
+
+async def ledger_state(ledger_id: str) -> dict:
+    cache = response_caches.for_tenant(ledger_id)
+    state = cache.get_validator()
+    if state is None:
+        cache_version = cache.version
+        state = await get_metadata().get_ledger_version(ledger_id)
+        cache.set_validator(state, cache_version)
+    return state
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # Perbandingan lemah: varian terkompresi membawa ETag W/ yang sama
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def not_modified_since(request: Request, modified_at: Optional[datetime]) -> bool:
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or modified_at is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # Header HTTP hanya presisi detik
+    return modified_at.replace(microsecond=0, tzinfo=timezone.utc) <= since
+
+def encoded_response(request: Request, entry, headers: dict, media_type: str) -> Response:
+    body = entry.body
+    encoding = compression.negotiate(request.headers.get("accept-encoding"))
+    if encoding and len(body) >= COMPRESSION_MIN_SIZE:
+        # Body terkompresi ikut disimpan di entri cache: hit berikutnya tidak mengompres ulang
+        if encoding not in entry.encoded:
+            entry.encoded[encoding] = compression.compress(body, encoding, GZIP_LEVEL, BROTLI_QUALITY)
+        body = entry.encoded[encoding]
+        headers.update({"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def validator_headers(ledger_id: str, version: int, modified_at: Optional[datetime]) -> dict:
+    headers = {"ETag": f'W/"{ledger_id}-{version}"', "Cache-Control": HTTP_CACHE_CONTROL}
+    if modified_at is not None:
+        headers["Last-Modified"] = format_datetime(modified_at.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+# --- Response cache ---
+async def cached_response(request: Request, ledger_id: str, build) -> Response:
+    ledger = await get_ledger(ledger_id)
+    cache = response_caches.for_tenant(ledger_id, ledger.get("cache_max_entries"))
+    state = await ledger_state(ledger_id)
+    modified_at = state.get("modified_at")
+    headers = validator_headers(ledger_id, state.get("version", 0), modified_at)
+    # Revalidasi dijawab dari versi ledger saja, tanpa membangun body.
+    # If-Modified-Since hanya dipakai jika klien tidak mengirim If-None-Match
+    if "if-none-match" in request.headers:
+        if etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    elif not_modified_since(request, modified_at):
+        return Response(status_code=304, headers=headers)
+
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    entry = cache.get(key)
+    if entry is None or entry.etag != headers["ETag"]:
+        cache_version = cache.version
+        body = orjson.dumps(await build())
+        entry = cache.set(key, body, headers["ETag"], cache_version)
+    return encoded_response(request, entry, headers, "application/json")
+
+async def build_transaction_page(ledger_id: str, filters: dict, limit: int, cursor: Optional[str]) -> dict:
+    after = decode_cursor(cursor) if cursor else None
+    # Ambil satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+    transactions = await get_storage().page(ledger_id, filters, limit + 1, after)
+    has_more = len(transactions) > limit
+    transactions = transactions[:limit]
+    next_cursor = None
+    if has_more:
+        last = transactions[-1]
+        next_cursor = encode_cursor(last["tanggal"], last["id"])
+    return {
+        "items": [serialize_transaction(t) for t in transactions],
+        "next_cursor": next_cursor,
+    }
+
+@ledger_router.get("/transactions", response_model=TransactionPage, dependencies=[Depends(guard_public_read)])
+async def get_transactions(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    filters: dict = Depends(transaction_filters),
+    ledger_id: str = Depends(current_ledger),
+):
+    if cursor:
+        decode_cursor(cursor)
+    return await cached_response(request, ledger_id, lambda: build_transaction_page(ledger_id, filters, limit, cursor))
+
+# --- Export ---
+def export_row(transaction: dict) -> dict:
+    row = {field: transaction.get(field) for field in EXPORT_FIELDS}
+    row["tanggal"] = row["tanggal"].isoformat()
+    if row["created_at"] is not None:
+        row["created_at"] = row["created_at"].isoformat()
+    return row
+
+async def iter_export_csv(cursor):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async for transaction in cursor:
+        writer.writerow(export_row(transaction))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+async def iter_export_ndjson(cursor):
+    async for transaction in cursor:
+        yield orjson.dumps(export_row(transaction), option=orjson.OPT_APPEND_NEWLINE)
+
+@ledger_router.get("/transactions/export", dependencies=[Depends(rate_limit_public_read)])
+async def export_transactions(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    filters: dict = Depends(transaction_filters),
+    ledger_id: str = Depends(current_ledger),
+):
+    # Slot diambil di sini (masih bisa 503) tapi baru dilepas setelah export selesai dikirim
+    await acquire_read_slot(request)
+    cursor = get_storage().iterate(ledger_id, filters, EXPORT_BATCH_SIZE)
+    if format == "csv":
+        body, media_type = iter_export_csv(cursor), "text/csv; charset=utf-8"
+    else:
+        body, media_type = iter_export_ndjson(cursor), "application/x-ndjson"
+    body, release = guarded_stream(body)
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="jurnal-kas-{ledger_id}.{format}"'},
+        background=release,
+    )
+
+# --- Running totals ---
+async def reconcile_totals(ledger_id: str) -> dict:
+    result = await get_storage().reconcile(ledger_id)
+    if result["drift"]:
+        logger.warning("Selisih total ledger %s terdeteksi, memperbaiki ledger_totals: %s", ledger_id, result["drift"])
+        # Hanya dokumen total yang diperbaiki; isi transaksi per bulan tidak berubah
+        await ledger_changed(ledger_id, months=())
+    return {"ledger_id": ledger_id, **result, "checked_at": datetime.utcnow()}
+
+async def migrate_money_to_int64() -> dict:
+    # Dokumen lama menyimpan jumlah sebagai double; ubah ke int64 rupiah di sisi server
+    legacy = {"jumlah": {"$not": {"$type": "long"}}}
+    fractional = await get_db().transactions.count_documents(
+        {"$and": [legacy, {"$expr": {"$ne": ["$jumlah", {"$round": ["$jumlah", 0]}]}}]}
+    )
+    if fractional:
+        logger.warning("%d transaksi memiliki pecahan rupiah dan akan dibulatkan", fractional)
+    result = await get_db().transactions.update_many(
+        legacy, [{"$set": {"jumlah": {"$toLong": {"$round": ["$jumlah", 0]}}}}]
+    )
+    # Total dan rollup lama masih double: dibangun ulang dari nol sebagai int64
+    await get_db().ledger_totals.delete_many({})
+    await get_db().ledger_rollups.delete_many({})
+    report = {"converted": result.modified_count, "rounded": fractional, "ledgers": {}}
+    for ledger_id in await list_ledger_ids():
+        totals = await reconcile_totals(ledger_id)
+        rollups = await rebuild_rollups(ledger_id)
+        report["ledgers"][ledger_id] = {"totals": totals["totals"], "rollups": rollups}
+    return report
+
+async def reconcile_all_ledgers() -> dict:
+    drift = {}
+    for ledger_id in await list_ledger_ids():
+        result = await reconcile_totals(ledger_id)
+        await take_snapshot(ledger_id)
+        if result["drift"]:
+            drift[ledger_id] = result["drift"]
+    return {"drift": drift}
+
+# --- Audit log & snapshots ---
+def event_view(doc: dict) -> dict:
+    return {field: doc.get(field) for field in ("id", "tanggal", "keterangan", "jenis", "jumlah")}
+
+async def record_events(ledger_id: str, events: list):
+    # Append-only: event tidak pernah diubah atau dihapus; seq berurutan per ledger
+    await get_metadata().append_events(ledger_id, events)
+
+def make_event(event_type: str, actor: Optional[str], before: Optional[dict] = None, after: Optional[dict] = None) -> dict:
+    current = after if after is not None else before
+    event = {
+        "type": event_type,
+        "transaction_id": current["id"],
+        "actor": actor,
+        "transaction": event_view(current),
+        "delta": ledger_delta(before, after),
+    }
+    if event_type == "edit":
+        event["before"] = event_view(before)
+    return event
+
+async def ensure_genesis_snapshot(ledger_id: str):
+    # Titik awal untuk ledger yang sudah berisi data sebelum ada log event
+    if await get_metadata().latest_snapshot(ledger_id) is not None:
+        return
+    totals = await get_storage().aggregate_totals(ledger_id)
+    await get_metadata().insert_snapshot({
+        "ledger_id": ledger_id,
+        "seq": await get_metadata().current_event_seq(ledger_id),
+        "at": datetime.utcnow(),
+        "genesis": True,
+        **{key: Int64(value) for key, value in totals.items()},
+    })
+
+async def contiguous_event_seq(ledger_id: str, after_seq: int) -> int:
+    # Seq dipesan sebelum event disimpan, jadi celah bisa berarti event yang masih
+    # ditulis; berhenti di celah pertama kecuali celahnya sudah melewati masa tenggang
+    grace_start = datetime.utcnow() - timedelta(seconds=SNAPSHOT_GAP_GRACE_SECONDS)
+    horizon = after_seq
+    for seq, at in await get_metadata().event_seqs(ledger_id, after_seq):
+        if seq != horizon + 1 and at > grace_start:
+            break
+        horizon = seq
+    return horizon
+
+async def take_snapshot(ledger_id: str) -> Optional[dict]:
+    last = await get_metadata().latest_snapshot(ledger_id)
+    if last is None:
+        await ensure_genesis_snapshot(ledger_id)
+        return None
+    tail = await get_metadata().sum_event_deltas(ledger_id, last["seq"])
+    if tail is None:
+        return None
+    if tail["events"] != tail["seq"] - last["seq"]:
+        # Snapshot tidak boleh melompati event yang belum tersimpan: totalnya akan hilang selamanya
+        horizon = await contiguous_event_seq(ledger_id, last["seq"])
+        tail = await get_metadata().sum_event_deltas(ledger_id, last["seq"], up_to_seq=horizon)
+        if tail is None:
+            return None
+    snapshot = {
+        "ledger_id": ledger_id,
+        "seq": tail["seq"],
+        "at": tail["at"],
+        **{key: Int64(last[key] + tail[key]) for key in TOTAL_KEYS},
+    }
+    await get_metadata().insert_snapshot(snapshot)
+    return snapshot
+
+async def totals_as_of(ledger_id: str, as_of: datetime) -> dict:
+    snapshot = await get_metadata().snapshot_as_of(ledger_id, as_of)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Belum ada data ledger pada waktu tersebut")
+    totals = {key: snapshot[key] for key in TOTAL_KEYS}
+    # Hanya ekor event setelah snapshot yang dijumlahkan, bukan seluruh riwayat
+    tail = await get_metadata().sum_event_deltas(ledger_id, snapshot["seq"], as_of)
+    if tail is not None:
+        for key in totals:
+            totals[key] += tail[key]
+    return totals
+
+# --- Migrations ---
+async def migrate_soft_delete() -> dict:
+    result = await get_db().transactions.update_many({"deleted": {"$exists": False}}, {"$set": {"deleted": False}})
+    return {"marked_live": result.modified_count}
+
+async def migrate_ledger_tenancy() -> dict:
+    # Data lama milik satu komunitas: pindahkan ke ledger bawaan
+    report = {}
+    for collection_name in ("transactions", "ledger_events", "ledger_snapshots"):
+        result = await get_db()[collection_name].update_many(
+            {"ledger_id": {"$exists": False}}, {"$set": {"ledger_id": DEFAULT_LEDGER}}
+        )
+        report[collection_name] = result.modified_count
+    legacy_counter = await get_db().counters.find_one_and_delete({"_id": EVENT_SEQ_ID})
+    if legacy_counter is not None:
+        await get_db().counters.update_one(
+            {"_id": event_seq_id(DEFAULT_LEDGER)}, {"$max": {"seq": legacy_counter["seq"]}}, upsert=True
+        )
+    await get_db().ledger_totals.delete_one({"_id": "global"})
+    await get_db().ledger_rollups.delete_many({"ledger_id": {"$exists": False}})
+    report["rollups"] = await rebuild_rollups(DEFAULT_LEDGER)
+    await ensure_genesis_snapshot(DEFAULT_LEDGER)
+    return report
+
+MIGRATIONS = [
+    ("soft_delete", migrate_soft_delete),
+    ("ledger_tenancy", migrate_ledger_tenancy),
+    ("money_int64", migrate_money_to_int64),
+]
+
+async def run_migrations():
+    if STORAGE_BACKEND != "mongo":
+        # Migrasi di atas mengubah data lama di Mongo; database SQLite selalu dibuat
+        # dengan skema terbaru dan hanya butuh titik awal snapshot
+        await ensure_genesis_snapshot(DEFAULT_LEDGER)
+        return
+    for name, migrate in MIGRATIONS:
+        if await get_metadata().migration_applied(name):
+            continue
+        result = await migrate()
+        await get_metadata().record_migration(name, result)
+        logger.info("Migrasi %s dijalankan: %s", name, result)
+
+# --- Rollups ---
+async def rebuild_rollups(ledger_id: str) -> dict:
+    rebuilt = await get_storage().rebuild_rollups(ledger_id)
+    logger.info("Rollup ledger %s dibangun ulang: %s", ledger_id, rebuilt)
+    await ledger_changed(ledger_id)
+    return rebuilt
+
+async def rebuild_all_ledgers() -> dict:
+    # Rollup dibangun ulang dari transaksi dan snapshot ditutup di titik yang sama
+    rebuilt = {}
+    for ledger_id in await list_ledger_ids():
+        rebuilt[ledger_id] = await rebuild_rollups(ledger_id)
+        await take_snapshot(ledger_id)
+    return {"rollups": rebuilt}
+
+# --- Monthly reports ---
+def shift_month(month: str, months: int) -> str:
+    year, index = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + months, 12)
+    return f"{year:04d}-{index + 1:02d}"
+
+async def render_monthly_report(ledger_id: str, month: str) -> dict:
+    rows = await get_storage().period_totals(ledger_id, "month", month, month)
+    row = rows[0] if rows else {"pemasukan": 0, "pengeluaran": 0, "count": 0}
+    saldo_awal = await get_storage().balance_before(ledger_id, "month", month)
+    report = MonthlyReport(
+        month=month,
+        saldo_awal=saldo_awal,
+        pemasukan=row["pemasukan"],
+        pengeluaran=row["pengeluaran"],
+        saldo_akhir=saldo_awal + row["pemasukan"] - row["pengeluaran"],
+        count=row["count"],
+        generated_at=datetime.utcnow(),
+    ).dict()
+    await get_metadata().save_monthly_report(ledger_id, report)
+    return report
+
+async def render_recent_monthly_reports() -> dict:
+    # Bulan lalu (bisa saja masih dikoreksi) dan bulan berjalan
+    current = datetime.utcnow().strftime("%Y-%m")
+    months = [shift_month(current, -1), current]
+    rendered = {}
+    for ledger_id in await list_ledger_ids():
+        for month in months:
+            await render_monthly_report(ledger_id, month)
+            await resolve_statement(ledger_id, month)
+        rendered[ledger_id] = months
+    return {"rendered": rendered}
+
+# --- Statements ---
+STATEMENT_MEDIA_TYPES = {"json": "application/json", "csv": "text/csv; charset=utf-8"}
+
+def month_start(month: str) -> datetime:
+    return datetime(int(month[:4]), int(month[5:7]), 1)
+
+def statement_fingerprint(state: dict, month: str) -> str:
+    # Statement bulan M bergantung pada transaksi bulan M dan saldo awalnya,
+    # yaitu semua bulan sebelum M; tulisan ke bulan sesudahnya tidak berpengaruh
+    months = sorted((key, value) for key, value in state.get("months", {}).items() if key <= month)
+    return hashlib.sha1(orjson.dumps([state.get("epoch", 0), months])).hexdigest()
+
+async def build_statement(ledger_id: str, month: str) -> dict:
+    ledger = await get_ledger(ledger_id)
+    filters = {"date_from": month_start(month), "date_to": month_start(shift_month(month, 1))}
+    saldo_awal = await get_storage().balance_before(ledger_id, "month", month)
+    # Satu range query lewat index (ledger_id, tanggal, id); urutan jurnal terbaru dulu
+    transactions = [t async for t in get_storage().iterate(ledger_id, filters, EXPORT_BATCH_SIZE)]
+    totals = {"pemasukan": 0, "pengeluaran": 0}
+    saldo = saldo_awal
+    entries = []
+    for t in reversed(transactions):
+        if t["jenis"] in totals:
+            totals[t["jenis"]] += t["jumlah"]
+            saldo += t["jumlah"] if t["jenis"] == "pemasukan" else -t["jumlah"]
+        entries.append(StatementEntry(
+            id=t["id"],
+            tanggal=t["tanggal"].date().isoformat(),
+            keterangan=t["keterangan"],
+            jenis=t["jenis"],
+            jumlah=t["jumlah"],
+            saldo=saldo,
+        ))
+    return Statement(
+        ledger_id=ledger_id,
+        ledger_name=ledger["name"],
+        month=month,
+        saldo_awal=saldo_awal,
+        total_pemasukan=totals["pemasukan"],
+        total_pengeluaran=totals["pengeluaran"],
+        saldo_akhir=saldo,
+        count=len(entries),
+        entries=entries,
+    ).dict()
+
+def render_statement(statement: dict, format: str) -> bytes:
+    if format == "json":
+        return orjson.dumps(statement)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["tanggal", "keterangan", "pemasukan", "pengeluaran", "saldo"])
+    writer.writerow([f"{statement['month']}-01", "Saldo awal", "", "", statement["saldo_awal"]])
+    for entry in statement["entries"]:
+        pemasukan = entry["jumlah"] if entry["jenis"] == "pemasukan" else ""
+        pengeluaran = entry["jumlah"] if entry["jenis"] == "pengeluaran" else ""
+        writer.writerow([entry["tanggal"], entry["keterangan"], pemasukan, pengeluaran, entry["saldo"]])
+    writer.writerow(["", "Saldo akhir", statement["total_pemasukan"], statement["total_pengeluaran"], statement["saldo_akhir"]])
+    return buffer.getvalue().encode()
+
+async def resolve_statement(ledger_id: str, month: str, force: bool = False) -> str:
+    """Digest statement terkini; dirender ulang hanya jika bulan itu atau sebelumnya berubah."""
+    # Sidik jari dibaca sebelum membangun: tulisan di tengah jalan membuat pointer langsung basi
+    fingerprint = statement_fingerprint(await ledger_state(ledger_id), month)
+    pointer_id = f"{ledger_id}:{month}"
+    pointer = None if force else await get_metadata().get_statement_pointer(pointer_id)
+    if pointer is not None and pointer["fingerprint"] == fingerprint:
+        return pointer["digest"]
+    statement = await build_statement(ledger_id, month)
+    digest = hashlib.sha256(orjson.dumps(statement, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    for format in STATEMENT_MEDIA_TYPES:
+        # Isi yang sama (misal edit lalu dikembalikan) memakai ulang artefak yang sudah ada
+        await get_metadata().put_statement_artifact(f"{digest}.{format}", render_statement(statement, format))
+    await get_metadata().save_statement_pointer(pointer_id, fingerprint, digest)
+    return digest
+
+async def build_period_report(ledger_id: str, granularity: str, period_from: Optional[str], period_to: Optional[str]) -> list:
+    rollups = await get_storage().period_totals(ledger_id, granularity, period_from, period_to)
+    return [
+        PeriodRollup(
+            period=r["period"],
+            pemasukan=r["pemasukan"],
+            pengeluaran=r["pengeluaran"],
+            saldo=r["pemasukan"] - r["pengeluaran"],
+            count=r["count"],
+        ).dict()
+        for r in rollups
+    ]
+
+async def build_balance_series(ledger_id: str, granularity: str, period_from: Optional[str], period_to: Optional[str]) -> list:
+    saldo = await get_storage().balance_before(ledger_id, granularity, period_from) if period_from else 0
+    series = []
+    for r in await get_storage().period_totals(ledger_id, granularity, period_from, period_to):
+        saldo += r["pemasukan"] - r["pengeluaran"]
+        series.append(BalancePoint(
+            period=r["period"],
+            pemasukan=r["pemasukan"],
+            pengeluaran=r["pengeluaran"],
+            saldo_berjalan=saldo,
+        ).dict())
+    return series
+
+async def build_summary(ledger_id: str, filters: dict) -> dict:
+    totals = await get_storage().totals(ledger_id, filters)
+    total_pemasukan = totals["total_pemasukan"]
+    total_pengeluaran = totals["total_pengeluaran"]
     saldo = total_pemasukan - total_pengeluaran
     return Summary(
         total_pemasukan=total_pemasukan,
         total_pengeluaran=total_pengeluaran,
         saldo=saldo
-    )
+    ).dict()
+
+async def build_summary_as_of(ledger_id: str, as_of: datetime) -> dict:
+    totals = await totals_as_of(ledger_id, as_of)
+    return Summary(
+        total_pemasukan=totals["total_pemasukan"],
+        total_pengeluaran=totals["total_pengeluaran"],
+        saldo=totals["total_pemasukan"] - totals["total_pengeluaran"]
+    ).dict()
+
+@ledger_router.get("/summary", response_model=Summary, dependencies=[Depends(guard_public_read)])
+async def get_summary(
+    request: Request,
+    filters: dict = Depends(transaction_filters),
+    as_of: Optional[datetime] = None,
+    ledger_id: str = Depends(current_ledger),
+):
+    if as_of is not None:
+        if filters:
+            raise HTTPException(status_code=400, detail="as_of tidak bisa digabung dengan filter lain")
+        return await cached_response(request, ledger_id, lambda: build_summary_as_of(ledger_id, as_of))
+    return await cached_response(request, ledger_id, lambda: build_summary(ledger_id, filters))
+
+# --- Writes ---
+async def persist_transactions(docs: list):
+    failed = await get_storage().insert_many(docs)
+    inserted = [doc for index, doc in enumerate(docs) if index not in failed]
+    # Batch gabungan bisa berisi beberapa ledger: event dicatat per ledger
+    for ledger_id, ledger_docs in group_by_ledger(inserted).items():
+        await record_events(ledger_id, [make_event("create", doc.get("created_by"), after=doc) for doc in ledger_docs])
+        await ledger_changed(ledger_id, (month_key(doc["tanggal"]) for doc in ledger_docs))
+    return inserted, failed
+
+async def flush_transactions(docs: list) -> list:
+    inserted, failed = await persist_transactions(docs)
+    if inserted and ledger_broker.local_publish:
+        for ledger_id, ledger_docs in group_by_ledger(inserted).items():
+            if not ledger_broker.subscriber_count(ledger_id):
+                continue
+            totals = await build_summary(ledger_id, {})
+            for doc in ledger_docs:
+                await publish_ledger_event(ledger_id, {"type": "insert", "transaction": serialize_transaction(doc)}, totals)
+    return [
+        HTTPException(status_code=500, detail=failed[index]) if index in failed else doc
+        for index, doc in enumerate(docs)
+    ]
+
+write_coalescer = WriteCoalescer(
+    flush_transactions,
+    window_seconds=WRITE_COALESCE_MS / 1000,
+    max_batch=WRITE_COALESCE_MAX_BATCH,
+)
+
+async def save_transaction(doc: dict) -> dict:
+    if WRITE_COALESCE_MS > 0:
+        return await write_coalescer.submit(doc)
+    result = (await flush_transactions([doc]))[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def request_fingerprint(transaction: TransactionCreate) -> str:
+    return hashlib.sha256(orjson.dumps(transaction.dict(), option=orjson.OPT_SORT_KEYS)).hexdigest()
 
-@api_router.post("/transactions", response_model=Transaction)
-async def create_transaction(transaction: TransactionCreate, token: str = Depends(verify_admin)):
-    transaction_dict = transaction.dict()
-    transaction_obj = Transaction(**transaction_dict)
-    await db.transactions.insert_one(transaction_obj.dict())
+async def claim_idempotency_key(key: str, fingerprint: str) -> Optional[dict]:
+    # None: kunci baru milik request ini. Selain itu dokumen kunci: berisi respons
+    # tersimpan, atau klaim kedaluwarsa yang diambil alih beserta transaksi yang dicatat
+    if await get_metadata().insert_idempotency_key(key, fingerprint):
+        return None
+    existing = await get_metadata().get_idempotency_key(key)
+    if existing is None:
+        # Kedaluwarsa di antara insert dan find: anggap kunci baru
+        return await claim_idempotency_key(key, fingerprint)
+    if existing["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key sudah dipakai untuk data yang berbeda")
+    if existing["response"] is not None:
+        return existing
+    stale_before = datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+    reclaimed = await get_metadata().reclaim_idempotency_key(key, stale_before)
+    if reclaimed is None:
+        raise HTTPException(status_code=409, detail="Permintaan dengan Idempotency-Key ini sedang diproses")
+    return reclaimed
+
+@ledger_router.post("/transactions", response_model=Transaction)
+async def create_transaction(
+    transaction: TransactionCreate,
+    token: dict = Depends(verify_admin),
+    ledger_id: str = Depends(current_ledger),
+    idempotency_key: Optional[str] = Header(None, max_length=200),
+):
+    key = f"{ledger_id}:{token['sub']}:{idempotency_key}" if idempotency_key else None
+    claim = await claim_idempotency_key(key, request_fingerprint(transaction)) if key else None
+    if claim is not None and claim["response"] is not None:
+        return claim["response"]
+    if claim is not None and claim.get("transaction") is not None:
+        # Pemegang klaim sebelumnya mati di tengah jalan: pakai ulang transaksinya (id yang
+        # sama) agar tidak tercatat dua kali bila ternyata sudah sempat tersimpan
+        transaction_obj = Transaction(**claim["transaction"])
+        if await get_storage().exists(ledger_id, transaction_obj.id):
+            await get_metadata().set_idempotency_response(key, transaction_obj.dict())
+            return transaction_obj
+    else:
+        transaction_obj = Transaction(**transaction.dict())
+        if key:
+            await get_metadata().record_idempotency_transaction(key, transaction_obj.dict())
+    try:
+        await enforce_ledger_quota(ledger_id, 1)
+        await save_transaction({**transaction_obj.dict(), "ledger_id": ledger_id, "created_by": token["sub"]})
+    except Exception:
+        if key:
+            await get_metadata().delete_idempotency_key(key)
+        raise
+    if key:
+        await get_metadata().set_idempotency_response(key, transaction_obj.dict())
     return transaction_obj
 
-@api_router.delete("/transactions/{transaction_id}")
-async def delete_transaction(transaction_id: str, token: str = Depends(verify_admin)):
-    result = await db.transactions.delete_one({"id": transaction_id})
-    if result.deleted_count == 1:
+# --- Live feed (SSE) ---
+async def publish_ledger_event(ledger_id: Optional[str], event: dict, totals: Optional[dict] = None):
+    if not ledger_broker.subscriber_count(ledger_id):
+        return
+    if ledger_id is not None:
+        event["totals"] = totals if totals is not None else await build_summary(ledger_id, {})
+    ledger_broker.publish(ledger_id, event)
+
+def change_to_event(change: dict) -> dict:
+    operation = change["operationType"]
+    document = change.get("fullDocument")
+    if operation == "insert":
+        return {"type": "insert", "transaction": serialize_transaction(document)}
+    if operation == "update" and document:
+        # Hapus lunak adalah update dengan deleted=True
+        if document.get("deleted"):
+            return {"type": "delete", "id": document["id"]}
+        return {"type": "update", "transaction": serialize_transaction(document)}
+    # Operasi lain tidak bisa diterapkan sebagai delta: minta klien ambil ulang
+    return {"type": "resync"}
+
+async def watch_ledger_changes():
+    # Change stream butuh replica set; jika tidak tersedia, handler mem-publish sendiri
+    if get_storage().name != "mongo":
+        return
+    failures = 0
+    while True:
+        try:
+            async with get_db().transactions.watch(full_document="updateLookup") as stream:
+                ledger_broker.local_publish = False
+                logger.info("Feed ledger memakai change stream MongoDB")
+                if failures:
+                    # Perubahan selama stream terputus tidak terlihat: ambil ulang semuanya
+                    response_caches.invalidate()
+                    await publish_ledger_event(None, {"type": "resync"})
+                    failures = 0
+                async for change in stream:
+                    # Tulisan dari proses lain juga harus membatalkan cache lokal ledger tersebut
+                    ledger_id = (change.get("fullDocument") or {}).get("ledger_id")
+                    response_caches.invalidate(ledger_id)
+                    await publish_ledger_event(ledger_id, change_to_event(change))
+            # Stream berakhir (misal event invalidate): buka ulang dan minta klien resync
+            failures += 1
+        except NotImplementedError as e:
+            logger.info("Change stream tidak tersedia (%s), memakai pub/sub in-process", e)
+            return
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAM_UNSUPPORTED:
+                logger.info("Change stream tidak tersedia (%s), memakai pub/sub in-process", e)
+                return
+            failures += 1
+            logger.warning("Change stream terputus (%s), dicoba lagi", e)
+        except PyMongoError as e:
+            failures += 1
+            logger.warning("Change stream terputus (%s), dicoba lagi", e)
+        finally:
+            ledger_broker.local_publish = True
+        # Selama menunggu, handler mem-publish sendiri agar feed proses ini tetap jalan
+        await asyncio.sleep(min(WATCH_RETRY_SECONDS * 2 ** (failures - 1), WATCH_RETRY_MAX_SECONDS))
+
+def format_sse(event: dict) -> bytes:
+    return b"event: " + event["type"].encode() + b"\ndata: " + orjson.dumps(event) + b"\n\n"
+
+@ledger_router.get("/transactions/stream")
+async def stream_transactions(ledger_id: str = Depends(current_ledger)):
+    async def event_source():
+        # Subscribe di dalam generator: jika respons tidak pernah dimulai, tidak ada antrean yatim
+        queue = ledger_broker.subscribe(ledger_id)
+        try:
+            yield format_sse({"type": "snapshot", "totals": await build_summary(ledger_id, {})})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            ledger_broker.unsubscribe(ledger_id, queue)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- Bulk import ---
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+async def read_bulk_rows(request: Request) -> list:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="File CSV tidak ditemukan pada field 'file'")
+        text = (await upload.read()).decode("utf-8-sig")
+        return list(csv.DictReader(io.StringIO(text)))
+    if content_type.startswith("text/csv"):
+        text = (await request.body()).decode("utf-8-sig")
+        return list(csv.DictReader(io.StringIO(text)))
+    try:
+        rows = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body harus berupa array JSON atau file CSV")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body harus berupa array JSON atau file CSV")
+    return rows
+
+async def insert_chunk(ledger_id: str, chunk: list, results: list):
+    inserted, failed = await persist_transactions([doc for _, doc in chunk])
+    for index, (row_number, doc) in enumerate(chunk):
+        if index in failed:
+            results.append(BulkRowResult(row=row_number, error=failed[index]))
+        else:
+            results.append(BulkRowResult(row=row_number, id=doc["id"]))
+    if inserted and ledger_broker.local_publish:
+        await publish_ledger_event(ledger_id, {"type": "bulk_insert", "count": len(inserted)})
+    return len(inserted)
+
+@ledger_router.post("/transactions/bulk", response_model=BulkImportResult)
+async def bulk_create_transactions(
+    request: Request,
+    token: dict = Depends(verify_admin),
+    ledger_id: str = Depends(current_ledger),
+):
+    rows = await read_bulk_rows(request)
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Maksimal {BULK_MAX_ROWS} baris per impor")
+    results = []
+    valid = []
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            if not isinstance(row, dict):
+                raise TypeError("Baris harus berupa objek")
+            transaction = TransactionCreate(**row)
+        except ValidationError as e:
+            results.append(BulkRowResult(row=row_number, error=format_validation_error(e)))
+            continue
+        except TypeError as e:
+            results.append(BulkRowResult(row=row_number, error=str(e)))
+            continue
+        valid.append((row_number, {**Transaction(**transaction.dict()).dict(), "ledger_id": ledger_id, "created_by": token["sub"]}))
+    # Kuota hanya dihitung dari baris yang lolos validasi: baris gagal tidak pernah disimpan
+    await enforce_ledger_quota(ledger_id, len(valid))
+    inserted = 0
+    for start in range(0, len(valid), BULK_CHUNK_SIZE):
+        inserted += await insert_chunk(ledger_id, valid[start:start + BULK_CHUNK_SIZE], results)
+    results.sort(key=lambda r: r.row)
+    return BulkImportResult(inserted=inserted, failed=len(results) - inserted, results=results)
+
+@ledger_router.put("/transactions/{transaction_id}", response_model=Transaction)
+async def update_transaction(
+    transaction_id: str,
+    transaction: TransactionCreate,
+    token: dict = Depends(verify_admin),
+    ledger_id: str = Depends(current_ledger),
+):
+    changes = {**transaction.dict(), "updated_at": datetime.utcnow(), "updated_by": token["sub"]}
+    before = await get_storage().update(ledger_id, transaction_id, changes)
+    if before is None:
+        raise HTTPException(status_code=404, detail="Transaksi tidak ditemukan")
+    after = {**before, **changes}
+    await record_events(ledger_id, [make_event("edit", token["sub"], before=before, after=after)])
+    await ledger_changed(ledger_id, (month_key(before["tanggal"]), month_key(after["tanggal"])))
+    if ledger_broker.local_publish:
+        await publish_ledger_event(ledger_id, {"type": "update", "transaction": serialize_transaction(after)})
+    return Transaction(**after)
+
+@ledger_router.delete("/transactions/{transaction_id}")
+async def delete_transaction(
+    transaction_id: str,
+    token: dict = Depends(verify_admin),
+    ledger_id: str = Depends(current_ledger),
+):
+    # Hapus lunak: dokumen tetap ada untuk audit, query hidup melewatinya lewat partial index
+    deleted = await get_storage().soft_delete(
+        ledger_id, transaction_id, {"deleted_at": datetime.utcnow(), "deleted_by": token["sub"]}
+    )
+    if deleted is not None:
+        await record_events(ledger_id, [make_event("delete", token["sub"], before=deleted)])
+        await ledger_changed(ledger_id, (month_key(deleted["tanggal"]),))
+        if ledger_broker.local_publish:
+            await publish_ledger_event(ledger_id, {"type": "delete", "id": deleted["id"]})
         return {"message": "Transaksi berhasil dihapus"}
     else:
         raise HTTPException(status_code=404, detail="Transaksi tidak ditemukan")
 
+async def build_event_page(ledger_id: str, limit: int, before: Optional[int], transaction_id: Optional[str]) -> dict:
+    events = await get_metadata().event_page(ledger_id, limit + 1, before, transaction_id)
+    next_before = events[limit - 1]["seq"] if len(events) > limit else None
+    return {"items": events[:limit], "next_before": next_before}
+
+@ledger_router.get("/events", response_model=EventPage, dependencies=[Depends(guard_public_read)])
+async def get_events(
+    request: Request,
+    limit: int = Query(DEFAULT_EVENT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[int] = Query(None, ge=1),
+    transaction_id: Optional[str] = None,
+    ledger_id: str = Depends(current_ledger),
+):
+    return await cached_response(request, ledger_id, lambda: build_event_page(ledger_id, limit, before, transaction_id))
+
+@ledger_router.post("/admin/snapshots")
+async def create_snapshot(token: dict = Depends(verify_admin), ledger_id: str = Depends(current_ledger)):
+    return {"snapshot": await take_snapshot(ledger_id)}
+
+@ledger_router.post("/admin/reconcile")
+async def reconcile(token: dict = Depends(verify_admin), ledger_id: str = Depends(current_ledger)):
+    return await reconcile_totals(ledger_id)
+
+@ledger_router.post("/admin/rollups/rebuild")
+async def rollups_rebuild(token: dict = Depends(verify_admin), ledger_id: str = Depends(current_ledger)):
+    return await rebuild_rollups(ledger_id)
+
+@ledger_router.get("/reports/periods", response_model=List[PeriodRollup], dependencies=[Depends(guard_public_read)])
+async def get_period_report(
+    request: Request,
+    granularity: str = Query("month", pattern=ROLLUP_GRANULARITY_PATTERN),
+    period_from: Optional[str] = Query(None, alias="from"),
+    period_to: Optional[str] = Query(None, alias="to"),
+    ledger_id: str = Depends(current_ledger),
+):
+    return await cached_response(
+        request, ledger_id, lambda: build_period_report(ledger_id, granularity, period_from, period_to)
+    )
+
+@ledger_router.get("/reports/monthly", response_model=List[MonthlyReport], dependencies=[Depends(guard_public_read)])
+async def get_monthly_reports(
+    month_from: Optional[str] = Query(None, alias="from", pattern=MONTH_PATTERN),
+    month_to: Optional[str] = Query(None, alias="to", pattern=MONTH_PATTERN),
+    ledger_id: str = Depends(current_ledger),
+):
+    # Laporan hasil pra-render job monthly_reports; tidak dihitung saat request
+    return await get_metadata().list_monthly_reports(ledger_id, month_from, month_to)
+
+@ledger_router.get("/reports/statement", response_model=Statement, dependencies=[Depends(guard_public_read)])
+async def get_statement(
+    request: Request,
+    month: str = Query(..., pattern=MONTH_PATTERN),
+    format: str = Query("json", pattern="^(json|csv)$"),
+    ledger_id: str = Depends(current_ledger),
+):
+    digest = await resolve_statement(ledger_id, month)
+    etag = f'W/"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+    if format == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="laporan-{ledger_id}-{month}.csv"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    key = (digest, format)
+    entry = statement_cache.get(key)
+    if entry is None:
+        artifact = await get_metadata().get_statement_artifact(f"{digest}.{format}")
+        if artifact is None:
+            # Artefak sudah dibuang oleh TTL index: render ulang dari transaksi
+            digest = await resolve_statement(ledger_id, month, force=True)
+            key = (digest, format)
+            artifact = await get_metadata().get_statement_artifact(f"{digest}.{format}")
+            headers["ETag"] = f'W/"{digest}"'
+        entry = statement_cache.set(key, artifact, headers["ETag"], statement_cache.version)
+    return encoded_response(request, entry, headers, STATEMENT_MEDIA_TYPES[format])
+
+@ledger_router.get("/reports/balance-series", response_model=List[BalancePoint], dependencies=[Depends(guard_public_read)])
+async def get_balance_series(
+    request: Request,
+    granularity: str = Query("month", pattern=ROLLUP_GRANULARITY_PATTERN),
+    period_from: Optional[str] = Query(None, alias="from"),
+    period_to: Optional[str] = Query(None, alias="to"),
+    ledger_id: str = Depends(current_ledger),
+):
+    return await cached_response(
+        request, ledger_id, lambda: build_balance_series(ledger_id, granularity, period_from, period_to)
+    )
+
+# --- Indexes ---
+async def ensure_indexes() -> dict:
+    report = {}
+    for collection_name, indexes in COLLECTION_INDEXES.items():
+        collection = get_db()[collection_name]
+        existing = set(await collection.index_information())
+        for name in OBSOLETE_INDEXES.get(collection_name, []):
+            if name in existing:
+                await collection.drop_index(name)
+                existing.discard(name)
+                logger.info("Index lama %s.%s dihapus", collection_name, name)
+        built, failed = [], {}
+        for index in indexes:
+            name = index.document["name"]
+            if name in existing:
+                continue
+            try:
+                await collection.create_indexes([index])
+                built.append(name)
+            except OperationFailure as e:
+                # Misal data lama berisi id ganda: jangan gagalkan startup, cukup laporkan
+                failed[name] = str(e)
+                logger.error("Gagal membuat index %s.%s: %s", collection_name, name, e)
+        if built:
+            logger.info("Index %s dibuat: %s", collection_name, ", ".join(built))
+        else:
+            logger.info("Semua index %s sudah tersedia", collection_name)
+        report[collection_name] = {"built": built, "failed": failed, "existing": sorted(existing)}
+    return report
+
+@ledger_router.get("/admin/explain")
+async def explain_queries(token: dict = Depends(verify_admin), ledger_id: str = Depends(current_ledger)):
+    return {**await get_storage().explain(ledger_id), **await get_metadata().explain_events(ledger_id)}
+
+# --- Background jobs ---
+job_scheduler = jobs.JobScheduler(get_metadata, workers=JOB_WORKERS)
+job_scheduler.register("reconcile", reconcile_all_ledgers, jobs.Interval(RECONCILE_INTERVAL_SECONDS))
+job_scheduler.register(
+    "rebuild_rollups", rebuild_all_ledgers, jobs.Daily(NIGHTLY_JOB_HOUR_UTC), timeout_seconds=3600,
+)
+job_scheduler.register(
+    "monthly_reports", render_recent_monthly_reports, jobs.Daily(NIGHTLY_JOB_HOUR_UTC, 30), timeout_seconds=3600,
+)
+
+@api_router.get("/admin/jobs")
+async def get_jobs(runs: int = Query(20, ge=0, le=MAX_PAGE_SIZE), token: dict = Depends(verify_admin)):
+    return await job_scheduler.status(runs)
+
+@api_router.post("/admin/jobs/{name}/run", status_code=202)
+async def run_job(name: str, token: dict = Depends(verify_admin)):
+    if name not in job_scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job tidak ditemukan")
+    if not JOBS_ENABLED:
+        raise HTTPException(status_code=409, detail="Penjadwal job tidak aktif di proses ini")
+    return {"name": name, "queued": job_scheduler.trigger(name)}
+
 @api_router.get("/")
 async def root():
     return {"message": "TVRI Berkeringat Badminton API"}
 
 # --- Finalisasi (Tetap sama) ---
+api_router.include_router(ledger_router)
+api_router.include_router(ledger_router, prefix="/ledgers/{ledger_id}")
 app.include_router(api_router)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
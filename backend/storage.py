@@ -0,0 +1,757 @@
+"""Penyimpanan transaksi ledger di balik satu antarmuka repository.
+
+``MongoTransactionRepository`` adalah implementasi produksi (total berjalan dan
+rollup dimaterialisasi). ``SQLiteTransactionRepository`` menyimpan transaksi di
+satu file SQLite mode WAL untuk test dan deployment kecil tanpa server Mongo.
+Pilih lewat env ``STORAGE_BACKEND`` (``mongo``/``sqlite``).
+"""
+import asyncio
+import logging
+import re
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from bson.int64 import Int64
+from pymongo import ASCENDING, DESCENDING, DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Urutan jurnal: terbaru dulu, id sebagai pemecah seri untuk tanggal yang sama
+TRANSACTION_SORT = [("tanggal", DESCENDING), ("id", DESCENDING)]
+# Transaksi dihapus secara lunak; semua query "hidup" wajib menyertakan filter ini
+# agar bisa memakai partial index
+LIVE_FILTER = {"deleted": False}
+JENIS_VALUES = ("pemasukan", "pengeluaran")
+TOTAL_KEYS = ("total_pemasukan", "total_pengeluaran", "count")
+# Rollup per periode: format kunci periode untuk setiap granularitas
+ROLLUP_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+ROLLUP_KEYS = ("pemasukan", "pengeluaran", "count")
+EXPORT_FIELDS = ["id", "tanggal", "keterangan", "jenis", "jumlah", "created_at"]
+# Hanya field yang dibutuhkan tabel jurnal yang diambil dari Mongo
+LISTING_PROJECTION = {"_id": 0, "id": 1, "tanggal": 1, "keterangan": 1, "jenis": 1, "jumlah": 1}
+
+
+def empty_totals() -> dict:
+    return {key: 0 for key in TOTAL_KEYS}
+
+
+def ledger_delta(before: Optional[dict], after: Optional[dict]) -> dict:
+    delta = empty_totals()
+    for doc, sign in ((before, -1), (after, 1)):
+        if doc is None:
+            continue
+        if doc["jenis"] in JENIS_VALUES:
+            delta[f"total_{doc['jenis']}"] += sign * doc["jumlah"]
+        delta["count"] += sign
+    return {key: Int64(value) for key, value in delta.items()}
+
+
+def group_by_ledger(docs: list) -> dict:
+    groups = {}
+    for doc in docs:
+        groups.setdefault(doc["ledger_id"], []).append(doc)
+    return groups
+
+
+class TransactionRepository:
+    """Operasi transaksi yang dipakai route, terlepas dari mesin penyimpanannya.
+
+    ``filters`` berbentuk netral (``date_from``, ``date_to`` eksklusif, ``jenis``,
+    ``q``) dan ``after`` adalah posisi keyset ``(tanggal, id)``; setiap
+    implementasi menerjemahkannya ke query native yang memakai index.
+    """
+
+    name = ""
+
+    async def setup(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def insert_many(self, docs: list) -> Dict[int, str]:
+        """Simpan dokumen; kembalikan {indeks: pesan} untuk baris yang gagal."""
+        raise NotImplementedError
+
+    async def page(self, ledger_id: str, filters: dict, limit: int, after: Optional[Tuple[datetime, str]] = None) -> List[dict]:
+        raise NotImplementedError
+
+    def iterate(self, ledger_id: str, filters: dict, batch_size: int = 1000) -> AsyncIterator[dict]:
+        raise NotImplementedError
+
+    async def update(self, ledger_id: str, transaction_id: str, changes: dict) -> Optional[dict]:
+        """Ubah transaksi hidup; kembalikan dokumen sebelum diubah atau None."""
+        raise NotImplementedError
+
+    async def soft_delete(self, ledger_id: str, transaction_id: str, changes: dict) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def exists(self, ledger_id: str, transaction_id: str) -> bool:
+        """True jika transaksi pernah disimpan, termasuk yang sudah dihapus."""
+        raise NotImplementedError
+
+    async def totals(self, ledger_id: str, filters: Optional[dict] = None) -> dict:
+        """Total untuk ringkasan; boleh memakai data yang dimaterialisasi."""
+        return await self.aggregate_totals(ledger_id, filters)
+
+    async def aggregate_totals(self, ledger_id: str, filters: Optional[dict] = None) -> dict:
+        """Total yang dihitung langsung dari transaksi."""
+        raise NotImplementedError
+
+    async def reconcile(self, ledger_id: str) -> dict:
+        # Tanpa data materialized tidak ada yang bisa melenceng
+        return {"drift": {}, "totals": await self.aggregate_totals(ledger_id)}
+
+    async def rebuild_rollups(self, ledger_id: str) -> dict:
+        return {}
+
+    async def period_totals(self, ledger_id: str, granularity: str, period_from: Optional[str], period_to: Optional[str]) -> List[dict]:
+        raise NotImplementedError
+
+    async def balance_before(self, ledger_id: str, granularity: str, period: str) -> int:
+        raise NotImplementedError
+
+    async def explain(self, ledger_id: str) -> dict:
+        return {}
+
+
+# --- MongoDB ---
+def mongo_query(ledger_id: str, filters: Optional[dict] = None, after: Optional[Tuple[datetime, str]] = None) -> dict:
+    query = {"ledger_id": ledger_id, **LIVE_FILTER}
+    filters = filters or {}
+    if filters.get("date_from") or filters.get("date_to"):
+        query["tanggal"] = {}
+        if filters.get("date_from"):
+            query["tanggal"]["$gte"] = filters["date_from"]
+        if filters.get("date_to"):
+            query["tanggal"]["$lt"] = filters["date_to"]
+    if filters.get("jenis"):
+        query["jenis"] = filters["jenis"]
+    if filters.get("q"):
+        query["$text"] = {"$search": filters["q"]}
+    if after is not None:
+        tanggal, transaction_id = after
+        query["$or"] = [
+            {"tanggal": {"$lt": tanggal}},
+            {"tanggal": tanggal, "id": {"$lt": transaction_id}},
+        ]
+    return query
+
+
+def rollup_id(ledger_id: str, granularity: str, period: str) -> str:
+    return f"{ledger_id}:{granularity}:{period}"
+
+
+def rollup_delta(actual: Optional[tuple], stored: Optional[tuple]) -> tuple:
+    return tuple(a - b for a, b in zip(actual or (0,) * len(ROLLUP_KEYS), stored or (0,) * len(ROLLUP_KEYS)))
+
+
+def period_filter(ledger_id: str, granularity: str, period_from: Optional[str], period_to: Optional[str]) -> dict:
+    query = {"ledger_id": ledger_id, "granularity": granularity}
+    if period_from or period_to:
+        query["period"] = {}
+        if period_from:
+            query["period"]["$gte"] = period_from
+        if period_to:
+            query["period"]["$lte"] = period_to
+    return query
+
+
+def plan_stages(plan: dict) -> list:
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return [stage for stage in stages if stage]
+
+
+def summarize_plan(explain: dict) -> dict:
+    planner = explain.get("queryPlanner", {})
+    stages = plan_stages(planner.get("winningPlan", {}))
+    return {
+        "stages": stages,
+        "uses_index": any(stage in ("IXSCAN", "IDHACK", "EXPRESS_IXSCAN") for stage in stages),
+        "collection_scan": "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages,
+        "covered": "FETCH" not in stages and "COLLSCAN" not in stages,
+    }
+
+
+class MongoTransactionRepository(TransactionRepository):
+    """Transaksi di koleksi ``transactions`` dengan total berjalan (``ledger_totals``)
+    dan rollup per periode (``ledger_rollups``) yang diperbarui setiap kali menulis.
+
+    Index dibuat oleh ``ensure_indexes`` di server.
+    """
+
+    name = "mongo"
+    # Jeda sebelum selisih dibaca ulang: $inc penulis yang sedang berjalan sempat masuk
+    reconcile_confirm_seconds = 1.0
+
+    def __init__(self, get_db: Callable):
+        self.get_db = get_db
+
+    async def insert_many(self, docs: list) -> Dict[int, str]:
+        failed = {}
+        for doc in docs:
+            doc["jumlah"] = Int64(doc["jumlah"])
+            doc["deleted"] = False
+        try:
+            await self.get_db().transactions.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed[err["index"]] = err.get("errmsg", "Gagal menyimpan")
+        inserted = [doc for index, doc in enumerate(docs) if index not in failed]
+        for ledger_id, ledger_docs in group_by_ledger(inserted).items():
+            delta = empty_totals()
+            for doc in ledger_docs:
+                for key, value in ledger_delta(None, doc).items():
+                    delta[key] += value
+            await self._apply_totals_delta(ledger_id, delta)
+            await self._apply_rollup_delta(ledger_id, ledger_docs, 1)
+        return failed
+
+    async def page(self, ledger_id, filters, limit, after=None):
+        query = mongo_query(ledger_id, filters, after)
+        return await self.get_db().transactions.find(query, LISTING_PROJECTION).sort(TRANSACTION_SORT).limit(limit).to_list(limit)
+
+    def iterate(self, ledger_id, filters, batch_size=1000):
+        projection = {field: 1 for field in EXPORT_FIELDS}
+        projection["_id"] = 0
+        return self.get_db().transactions.find(mongo_query(ledger_id, filters), projection).sort(TRANSACTION_SORT).batch_size(batch_size)
+
+    async def update(self, ledger_id, transaction_id, changes):
+        changes = {**changes, "jumlah": Int64(changes["jumlah"])} if "jumlah" in changes else changes
+        before = await self.get_db().transactions.find_one_and_update(
+            {"id": transaction_id, "ledger_id": ledger_id, **LIVE_FILTER}, {"$set": changes}
+        )
+        if before is not None:
+            after = {**before, **changes}
+            await self._apply_totals_delta(ledger_id, ledger_delta(before, after))
+            await self._apply_rollup_delta(ledger_id, [before], -1)
+            await self._apply_rollup_delta(ledger_id, [after], 1)
+        return before
+
+    async def soft_delete(self, ledger_id, transaction_id, changes):
+        before = await self.get_db().transactions.find_one_and_update(
+            {"id": transaction_id, "ledger_id": ledger_id, **LIVE_FILTER}, {"$set": {**changes, "deleted": True}}
+        )
+        if before is not None:
+            await self._apply_totals_delta(ledger_id, ledger_delta(before, None))
+            await self._apply_rollup_delta(ledger_id, [before], -1)
+        return before
+
+    async def exists(self, ledger_id, transaction_id):
+        return await self.get_db().transactions.find_one({"id": transaction_id, "ledger_id": ledger_id}, {"_id": 1}) is not None
+
+    async def aggregate_totals(self, ledger_id, filters=None):
+        pipeline = [
+            {"$match": mongo_query(ledger_id, filters)},
+            {"$group": {"_id": "$jenis", "total": {"$sum": "$jumlah"}, "count": {"$sum": 1}}},
+        ]
+        totals = empty_totals()
+        async for row in self.get_db().transactions.aggregate(pipeline):
+            if row["_id"] in JENIS_VALUES:
+                totals[f"total_{row['_id']}"] = row["total"]
+            totals["count"] += row["count"]
+        return totals
+
+    async def totals(self, ledger_id, filters=None):
+        # Tanpa filter cukup baca dokumen total; dengan filter agregasi dijalankan di Mongo
+        if filters:
+            return await self.aggregate_totals(ledger_id, filters)
+        totals = await self.get_db().ledger_totals.find_one({"_id": ledger_id})
+        if totals is None:
+            # Belum ada dokumen total: hitung di Mongo lalu simpan sebagai titik awal
+            totals = await self.aggregate_totals(ledger_id)
+            await self.get_db().ledger_totals.update_one(
+                {"_id": ledger_id}, {"$setOnInsert": totals}, upsert=True
+            )
+        return {key: totals.get(key, 0) for key in TOTAL_KEYS}
+
+    async def _apply_totals_delta(self, ledger_id: str, delta: dict):
+        inc = {key: Int64(value) for key, value in delta.items()}
+        # Tanpa upsert: jika dokumen belum ada, totals() akan menghitungnya dari awal
+        await self.get_db().ledger_totals.update_one({"_id": ledger_id}, {"$inc": inc})
+
+    async def _totals_drift(self, ledger_id: str) -> Tuple[dict, dict, dict]:
+        stored = await self.get_db().ledger_totals.find_one({"_id": ledger_id}) or {}
+        actual = await self.aggregate_totals(ledger_id)
+        drift = {
+            key: actual[key] - stored.get(key, 0)
+            for key in actual
+            if actual[key] != stored.get(key, 0)
+        }
+        return stored, actual, drift
+
+    async def reconcile(self, ledger_id):
+        # Transaksi yang sudah tersimpan tapi $inc-nya belum masuk terlihat sebagai
+        # selisih sesaat; men-$set-nya membuat $inc itu terhitung dua kali
+        stored, actual, drift = await self._totals_drift(ledger_id)
+        if not stored:
+            # Belum ada dokumen total: $inc tanpa upsert tidak mungkin sedang tertunda
+            await self.get_db().ledger_totals.update_one({"_id": ledger_id}, {"$set": actual}, upsert=True)
+            return {"drift": drift, "totals": actual}
+        if not drift:
+            return {"drift": drift, "totals": actual}
+        await asyncio.sleep(self.reconcile_confirm_seconds)
+        stored, actual, confirmed = await self._totals_drift(ledger_id)
+        if not stored or confirmed != drift:
+            return {"drift": {}, "totals": actual}
+        # Hanya ditimpa bila tidak ada penulis yang mengubah total sejak dibaca ulang
+        result = await self.get_db().ledger_totals.update_one(
+            {"_id": ledger_id, **{key: stored[key] for key in actual if key in stored}}, {"$set": actual}
+        )
+        return {"drift": drift if result.modified_count else {}, "totals": actual}
+
+    async def _apply_rollup_delta(self, ledger_id: str, transactions: list, sign: int):
+        incs = {}
+        for transaction in transactions:
+            if transaction["jenis"] not in JENIS_VALUES:
+                continue
+            for granularity, fmt in ROLLUP_FORMATS.items():
+                period = transaction["tanggal"].strftime(fmt)
+                inc = incs.setdefault((granularity, period), {"pemasukan": 0, "pengeluaran": 0, "count": 0})
+                inc[transaction["jenis"]] += sign * transaction["jumlah"]
+                inc["count"] += sign
+        if not incs:
+            return
+        await self.get_db().ledger_rollups.bulk_write([
+            UpdateOne(
+                {"_id": rollup_id(ledger_id, granularity, period)},
+                {
+                    "$inc": {"pemasukan": Int64(inc["pemasukan"]), "pengeluaran": Int64(inc["pengeluaran"]), "count": inc["count"]},
+                    "$setOnInsert": {"ledger_id": ledger_id, "granularity": granularity, "period": period},
+                },
+                upsert=True,
+            )
+            for (granularity, period), inc in incs.items()
+        ], ordered=False)
+
+    async def _rollup_drift(self, ledger_id: str, granularity: str) -> Dict[str, tuple]:
+        """Periode yang rollup-nya berbeda dari agregat transaksi: {_id: (aktual, tersimpan)}."""
+        pipeline = [
+            {"$match": {**mongo_query(ledger_id), "jenis": {"$in": list(JENIS_VALUES)}}},
+            {"$group": {
+                "_id": {"$dateToString": {"format": ROLLUP_FORMATS[granularity], "date": "$tanggal"}},
+                "pemasukan": {"$sum": {"$cond": [{"$eq": ["$jenis", "pemasukan"]}, "$jumlah", 0]}},
+                "pengeluaran": {"$sum": {"$cond": [{"$eq": ["$jenis", "pengeluaran"]}, "$jumlah", 0]}},
+                "count": {"$sum": 1},
+            }},
+        ]
+        actual = {
+            rollup_id(ledger_id, granularity, row["_id"]): tuple(row[key] for key in ROLLUP_KEYS)
+            async for row in self.get_db().transactions.aggregate(pipeline)
+        }
+        stored = {
+            doc["_id"]: tuple(doc.get(key, 0) for key in ROLLUP_KEYS)
+            async for doc in self.get_db().ledger_rollups.find({"ledger_id": ledger_id, "granularity": granularity})
+        }
+        return {
+            period_id: (actual.get(period_id), stored.get(period_id))
+            for period_id in actual.keys() | stored.keys()
+            if actual.get(period_id) != stored.get(period_id)
+        }
+
+    async def rebuild_rollups(self, ledger_id):
+        # Seperti reconcile: rollup yang $inc-nya belum masuk terlihat berbeda sesaat, jadi
+        # hanya selisih yang tetap sama pada bacaan kedua yang diperbaiki, dan setiap
+        # perbaikan bersyarat nilai yang dibaca (compare-and-set) agar $inc baru tidak tertimpa
+        rebuilt = {}
+        for granularity in ROLLUP_FORMATS:
+            operations = []
+            drift = await self._rollup_drift(ledger_id, granularity)
+            if drift:
+                await asyncio.sleep(self.reconcile_confirm_seconds)
+                confirmed = await self._rollup_drift(ledger_id, granularity)
+                operations = [
+                    self._rollup_correction(ledger_id, granularity, period_id, actual, stored)
+                    for period_id, (actual, stored) in confirmed.items()
+                    if rollup_delta(actual, stored) == rollup_delta(*drift.get(period_id, (None, None)))
+                ]
+                if operations:
+                    try:
+                        await self.get_db().ledger_rollups.bulk_write(operations, ordered=False)
+                    except BulkWriteError as e:
+                        # Upsert penulis lain lebih dulu membuat periodenya: dicek ulang di rebuild berikutnya
+                        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                            raise
+            rebuilt[granularity] = len(operations)
+        return rebuilt
+
+    @staticmethod
+    def _rollup_correction(ledger_id: str, granularity: str, period_id: str, actual: Optional[tuple], stored: Optional[tuple]):
+        if stored is None:
+            return InsertOne({
+                "_id": period_id, "ledger_id": ledger_id, "granularity": granularity,
+                "period": period_id.rsplit(":", 1)[1], **dict(zip(ROLLUP_KEYS, actual)),
+            })
+        current = {"_id": period_id, **dict(zip(ROLLUP_KEYS, stored))}
+        if actual is None:
+            return DeleteOne(current)
+        return UpdateOne(current, {"$set": dict(zip(ROLLUP_KEYS, actual))})
+
+    async def period_totals(self, ledger_id, granularity, period_from, period_to):
+        rollups = self.get_db().ledger_rollups.find(period_filter(ledger_id, granularity, period_from, period_to)).sort("period", ASCENDING)
+        return [
+            {key: r[key] for key in ("period", "pemasukan", "pengeluaran", "count")}
+            async for r in rollups
+            if r["count"] > 0
+        ]
+
+    async def balance_before(self, ledger_id, granularity, period):
+        # Saldo awal = jumlah semua rollup sebelum periode pertama
+        pipeline = [
+            {"$match": {"ledger_id": ledger_id, "granularity": granularity, "period": {"$lt": period}}},
+            {"$group": {"_id": None, "pemasukan": {"$sum": "$pemasukan"}, "pengeluaran": {"$sum": "$pengeluaran"}}},
+        ]
+        async for row in self.get_db().ledger_rollups.aggregate(pipeline):
+            return row["pemasukan"] - row["pengeluaran"]
+        return 0
+
+    async def explain(self, ledger_id):
+        transactions = self.get_db().transactions
+        page = lambda query: transactions.find(query, LISTING_PROJECTION).sort(TRANSACTION_SORT).limit(51)
+        queries = {
+            "GET /api/transactions": page(mongo_query(ledger_id)),
+            "GET /api/transactions?cursor": page(mongo_query(ledger_id, after=(datetime.utcnow(), ""))),
+            "GET /api/transactions?jenis": page(mongo_query(ledger_id, {"jenis": "pemasukan"})),
+            "GET /api/transactions?q": page(mongo_query(ledger_id, {"q": "iuran"})),
+            "GET /api/transactions/export": transactions.find(mongo_query(ledger_id), {field: 1 for field in EXPORT_FIELDS}).sort(TRANSACTION_SORT),
+            "GET /api/summary": self.get_db().ledger_totals.find({"_id": ledger_id}),
+            "DELETE /api/transactions/{id}": transactions.find({"id": "", **mongo_query(ledger_id)}),
+        }
+        return {endpoint: summarize_plan(await cursor.explain()) for endpoint, cursor in queries.items()}
+
+
+# --- SQLite ---
+SQLITE_COLUMNS = (
+    "id", "ledger_id", "tanggal", "keterangan", "jenis", "jumlah", "created_at", "created_by",
+    "deleted", "deleted_at", "deleted_by", "updated_at", "updated_by",
+)
+SQLITE_TIME_COLUMNS = ("tanggal", "created_at", "deleted_at", "updated_at")
+SQLITE_LISTING_COLUMNS = ("id", "tanggal", "keterangan", "jenis", "jumlah")
+# Panjang prefiks tanggal ISO untuk setiap granularitas rollup
+SQLITE_PERIOD_LENGTHS = {"day": 10, "month": 7, "year": 4}
+SQLITE_IN_CHUNK = 500
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    ledger_id TEXT NOT NULL,
+    tanggal TEXT NOT NULL,
+    keterangan TEXT NOT NULL,
+    jenis TEXT NOT NULL,
+    jumlah INTEGER NOT NULL,
+    created_at TEXT,
+    created_by TEXT,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    deleted_at TEXT,
+    deleted_by TEXT,
+    updated_at TEXT,
+    updated_by TEXT
+);
+-- Urutan jurnal dan keyset pagination per ledger
+CREATE INDEX IF NOT EXISTS ledger_tanggal_id_live
+    ON transactions (ledger_id, tanggal DESC, id DESC) WHERE deleted = 0;
+-- Tampilan yang difilter per jenis
+CREATE INDEX IF NOT EXISTS ledger_jenis_tanggal_live
+    ON transactions (ledger_id, jenis, tanggal DESC, id DESC) WHERE deleted = 0;
+-- Index covering untuk ringkasan dan laporan periode: SUM tanpa membaca tabel.
+-- Kolom deleted ikut disertakan karena planner SQLite tidak menganggap kolom
+-- di WHERE partial index sebagai tercakup
+CREATE INDEX IF NOT EXISTS ledger_jenis_jumlah_tanggal_live
+    ON transactions (ledger_id, jenis, jumlah, tanggal, deleted) WHERE deleted = 0;
+-- Pencarian keterangan; unicode61 tidak peka huruf besar/diakritik seperti $text Mongo
+CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+    keterangan, content='transactions', content_rowid='seq', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+    INSERT INTO transactions_fts (rowid, keterangan) VALUES (new.seq, new.keterangan);
+END;
+CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+    INSERT INTO transactions_fts (transactions_fts, rowid, keterangan) VALUES ('delete', old.seq, old.keterangan);
+END;
+CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF keterangan ON transactions BEGIN
+    INSERT INTO transactions_fts (transactions_fts, rowid, keterangan) VALUES ('delete', old.seq, old.keterangan);
+    INSERT INTO transactions_fts (rowid, keterangan) VALUES (new.seq, new.keterangan);
+END;
+"""
+
+
+def encode_time(value: Optional[datetime]) -> Optional[str]:
+    # Lebar tetap agar urutan teks sama dengan urutan waktu; presisi milidetik seperti BSON
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+async def connect_sqlite(path: str, readonly: bool):
+    import aiosqlite
+
+    connection = await aiosqlite.connect(path, isolation_level=None)
+    await connection.execute("PRAGMA busy_timeout = 5000")
+    if readonly:
+        await connection.execute("PRAGMA query_only = 1")
+    else:
+        await connection.execute("PRAGMA journal_mode = WAL")
+        await connection.execute("PRAGMA synchronous = NORMAL")
+    return connection
+
+
+def decode_row(columns: tuple, row: tuple) -> dict:
+    doc = dict(zip(columns, row))
+    for column in SQLITE_TIME_COLUMNS:
+        if doc.get(column) is not None:
+            doc[column] = datetime.fromisoformat(doc[column])
+    if "deleted" in doc:
+        doc["deleted"] = bool(doc["deleted"])
+    return doc
+
+
+def summarize_sqlite_plan(details: list, table: str) -> dict:
+    # Bentuknya sama dengan summarize_plan agar /api/admin/explain seragam antar backend
+    return {
+        "stages": details,
+        "uses_index": any("INDEX" in detail for detail in details),
+        "collection_scan": any(detail.startswith(f"SCAN {table}") and "INDEX" not in detail for detail in details),
+        "in_memory_sort": any("TEMP B-TREE" in detail for detail in details),
+        "covered": any("COVERING INDEX" in detail for detail in details),
+    }
+
+
+def fts_query(q: str) -> Optional[str]:
+    # Seperti $text: kata-kata digabung OR, setiap kata dikutip agar aman dari sintaks FTS
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def sqlite_where(ledger_id: str, filters: Optional[dict] = None, after: Optional[Tuple[datetime, str]] = None) -> Tuple[str, list]:
+    # "deleted = 0" harus literal agar planner SQLite bisa memakai partial index
+    clauses, params = ["ledger_id = ?", "deleted = 0"], [ledger_id]
+    filters = filters or {}
+    if filters.get("date_from"):
+        clauses.append("tanggal >= ?")
+        params.append(encode_time(filters["date_from"]))
+    if filters.get("date_to"):
+        clauses.append("tanggal < ?")
+        params.append(encode_time(filters["date_to"]))
+    if filters.get("jenis"):
+        clauses.append("jenis = ?")
+        params.append(filters["jenis"])
+    if filters.get("q"):
+        match = fts_query(filters["q"])
+        if match is None:
+            clauses.append("0")
+        else:
+            clauses.append("seq IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)")
+            params.append(match)
+    if after is not None:
+        tanggal, transaction_id = after
+        clauses.append("(tanggal < ? OR (tanggal = ? AND id < ?))")
+        params += [encode_time(tanggal), encode_time(tanggal), transaction_id]
+    return " AND ".join(clauses), params
+
+
+class SQLiteTransactionRepository(TransactionRepository):
+    """Transaksi di satu file SQLite lewat aiosqlite, journal mode WAL.
+
+    Penulisan memakai satu koneksi yang dijaga lock; pembacaan memakai koneksi
+    terpisah sehingga dengan WAL pembaca tidak menunggu penulis. Ringkasan dan
+    laporan periode dihitung dengan agregasi SQL di atas index parsial
+    ``deleted = 0``; tidak ada total atau rollup yang perlu dijaga sinkron.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+        self._reader = None
+        self._write_lock = asyncio.Lock()
+
+    async def setup(self):
+        if self._writer is not None:
+            return
+        self._writer = await connect_sqlite(self.path, readonly=False)
+        await self._writer.executescript(SQLITE_SCHEMA)
+        self._reader = await connect_sqlite(self.path, readonly=True)
+
+    async def close(self):
+        for connection in (self._reader, self._writer):
+            if connection is not None:
+                await connection.close()
+        self._writer = self._reader = None
+
+    async def _fetchall(self, sql: str, params: list) -> list:
+        async with self._reader.execute(sql, params) as cursor:
+            return await cursor.fetchall()
+
+    async def insert_many(self, docs):
+        columns = ", ".join(SQLITE_COLUMNS)
+        placeholders = ", ".join("?" for _ in SQLITE_COLUMNS)
+        async with self._write_lock:
+            ids = [doc["id"] for doc in docs]
+            existing = set()
+            for start in range(0, len(ids), SQLITE_IN_CHUNK):
+                chunk = ids[start:start + SQLITE_IN_CHUNK]
+                async with self._writer.execute(
+                    f"SELECT id FROM transactions WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+                ) as cursor:
+                    existing.update(row[0] for row in await cursor.fetchall())
+            failed, rows = {}, []
+            for index, doc in enumerate(docs):
+                if doc["id"] in existing:
+                    failed[index] = f"Duplikat id transaksi: {doc['id']}"
+                    continue
+                existing.add(doc["id"])
+                doc["deleted"] = False
+                rows.append(tuple(
+                    encode_time(doc.get(column)) if column in SQLITE_TIME_COLUMNS else doc.get(column)
+                    for column in SQLITE_COLUMNS
+                ))
+            if rows:
+                await self._writer.execute("BEGIN IMMEDIATE")
+                try:
+                    await self._writer.executemany(f"INSERT INTO transactions ({columns}) VALUES ({placeholders})", rows)
+                    await self._writer.execute("COMMIT")
+                except Exception:
+                    await self._writer.execute("ROLLBACK")
+                    raise
+        return failed
+
+    async def page(self, ledger_id, filters, limit, after=None):
+        where, params = sqlite_where(ledger_id, filters, after)
+        rows = await self._fetchall(
+            f"SELECT {', '.join(SQLITE_LISTING_COLUMNS)} FROM transactions WHERE {where} "
+            "ORDER BY tanggal DESC, id DESC LIMIT ?",
+            params + [limit],
+        )
+        return [decode_row(SQLITE_LISTING_COLUMNS, row) for row in rows]
+
+    async def iterate(self, ledger_id, filters, batch_size=1000):
+        where, params = sqlite_where(ledger_id, filters)
+        async with self._reader.execute(
+            f"SELECT {', '.join(EXPORT_FIELDS)} FROM transactions WHERE {where} ORDER BY tanggal DESC, id DESC", params
+        ) as cursor:
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield decode_row(EXPORT_FIELDS, row)
+
+    async def _update_live(self, ledger_id: str, transaction_id: str, changes: dict) -> Optional[dict]:
+        unknown = set(changes) - set(SQLITE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Kolom tidak dikenal: {', '.join(sorted(unknown))}")
+        async with self._write_lock:
+            await self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                async with self._writer.execute(
+                    f"SELECT {', '.join(SQLITE_COLUMNS)} FROM transactions WHERE id = ? AND ledger_id = ? AND deleted = 0",
+                    [transaction_id, ledger_id],
+                ) as cursor:
+                    row = await cursor.fetchone()
+                if row is None:
+                    await self._writer.execute("ROLLBACK")
+                    return None
+                assignments = ", ".join(f"{column} = ?" for column in changes)
+                values = [
+                    encode_time(value) if column in SQLITE_TIME_COLUMNS else value
+                    for column, value in changes.items()
+                ]
+                await self._writer.execute(f"UPDATE transactions SET {assignments} WHERE id = ?", values + [transaction_id])
+                await self._writer.execute("COMMIT")
+            except Exception:
+                await self._writer.execute("ROLLBACK")
+                raise
+        return decode_row(SQLITE_COLUMNS, row)
+
+    async def update(self, ledger_id, transaction_id, changes):
+        return await self._update_live(ledger_id, transaction_id, changes)
+
+    async def soft_delete(self, ledger_id, transaction_id, changes):
+        return await self._update_live(ledger_id, transaction_id, {**changes, "deleted": 1})
+
+    async def exists(self, ledger_id, transaction_id):
+        rows = await self._fetchall("SELECT 1 FROM transactions WHERE id = ? AND ledger_id = ?", [transaction_id, ledger_id])
+        return bool(rows)
+
+    async def aggregate_totals(self, ledger_id, filters=None):
+        where, params = sqlite_where(ledger_id, filters)
+        totals = empty_totals()
+        for jenis, total, count in await self._fetchall(
+            f"SELECT jenis, SUM(jumlah), COUNT(*) FROM transactions WHERE {where} GROUP BY jenis", params
+        ):
+            if jenis in JENIS_VALUES:
+                totals[f"total_{jenis}"] = total
+            totals["count"] += count
+        return totals
+
+    async def period_totals(self, ledger_id, granularity, period_from, period_to):
+        having, params = [], [SQLITE_PERIOD_LENGTHS[granularity], ledger_id]
+        if period_from:
+            having.append("period >= ?")
+            params.append(period_from)
+        if period_to:
+            having.append("period <= ?")
+            params.append(period_to)
+        rows = await self._fetchall(
+            "SELECT substr(tanggal, 1, ?) AS period, "
+            "SUM(CASE WHEN jenis = 'pemasukan' THEN jumlah ELSE 0 END), "
+            "SUM(CASE WHEN jenis = 'pengeluaran' THEN jumlah ELSE 0 END), COUNT(*) "
+            "FROM transactions WHERE ledger_id = ? AND deleted = 0 AND jenis IN ('pemasukan', 'pengeluaran') "
+            f"GROUP BY period {'HAVING ' + ' AND '.join(having) if having else ''} ORDER BY period",
+            params,
+        )
+        return [
+            {"period": period, "pemasukan": pemasukan, "pengeluaran": pengeluaran, "count": count}
+            for period, pemasukan, pengeluaran, count in rows
+        ]
+
+    async def balance_before(self, ledger_id, granularity, period):
+        rows = await self._fetchall(
+            "SELECT COALESCE(SUM(CASE WHEN jenis = 'pemasukan' THEN jumlah ELSE -jumlah END), 0) "
+            "FROM transactions WHERE ledger_id = ? AND deleted = 0 AND jenis IN ('pemasukan', 'pengeluaran') "
+            "AND substr(tanggal, 1, ?) < ?",
+            [ledger_id, SQLITE_PERIOD_LENGTHS[granularity], period],
+        )
+        return rows[0][0]
+
+    async def explain(self, ledger_id):
+        listing = f"SELECT {', '.join(SQLITE_LISTING_COLUMNS)} FROM transactions WHERE {{}} ORDER BY tanggal DESC, id DESC LIMIT 51"
+        queries = {
+            "GET /api/transactions": sqlite_where(ledger_id),
+            "GET /api/transactions?cursor": sqlite_where(ledger_id, after=(datetime.utcnow(), "")),
+            "GET /api/transactions?jenis": sqlite_where(ledger_id, {"jenis": "pemasukan"}),
+            "GET /api/transactions?q": sqlite_where(ledger_id, {"q": "iuran"}),
+        }
+        report = {}
+        for endpoint, (where, params) in queries.items():
+            report[endpoint] = await self._explain(listing.format(where), params)
+        where, params = sqlite_where(ledger_id)
+        report["GET /api/summary"] = await self._explain(
+            f"SELECT jenis, SUM(jumlah), COUNT(*) FROM transactions WHERE {where} GROUP BY jenis", params
+        )
+        return report
+
+    async def _explain(self, sql: str, params: list) -> dict:
+        details = [row[-1] for row in await self._fetchall(f"EXPLAIN QUERY PLAN {sql}", params)]
+        return summarize_sqlite_plan(details, "transactions")
+
+
+def create_repository(backend: str, get_db: Callable, sqlite_path: str) -> TransactionRepository:
+    if backend == "mongo":
+        return MongoTransactionRepository(get_db)
+    if backend == "sqlite":
+        return SQLiteTransactionRepository(sqlite_path)
+    raise ValueError(f"STORAGE_BACKEND tidak dikenal: {backend}")
@@ -14,6 +14,8 @@ except locale.Error:
 # Get the backend URL from frontend/.env
 BACKEND_URL = "https://a639fdcf-b672-498a-aebb-44ec6a64c1f6.preview.emergentagent.com"
 API_URL = f"{BACKEND_URL}/api"
+# Ledger tetap untuk uji isolasi, agar setiap run tidak meninggalkan ledger baru
+ISOLATION_LEDGER_ID = "test-isolation"
 
 class BackendTester:
     def __init__(self):
@@ -45,7 +47,7 @@ class BackendTester:
         
         if response.status_code == 200:
             response_data = response.json()
-            if "token" in response_data and response_data["token"] == "admin_session_token":
+            if response_data.get("token"):
                 self.admin_token = response_data["token"]
                 self.log_test("Admin Login Success", True, "Successfully logged in as admin")
                 return True
@@ -76,7 +78,7 @@ class BackendTester:
         response = requests.get(url)
         
         if response.status_code == 200:
-            transactions = response.json()
+            transactions = response.json()["items"]
             if isinstance(transactions, list):
                 self.log_test("Get Transactions (Empty)", True, f"Successfully retrieved transactions: {len(transactions)} found")
                 return True
@@ -157,7 +159,7 @@ class BackendTester:
         response = requests.get(url)
         
         if response.status_code == 200:
-            transactions = response.json()
+            transactions = response.json()["items"]
             if isinstance(transactions, list) and len(transactions) >= 3:
                 # Check date formatting - accept either English or Indonesian month names
                 date_format_correct = True
@@ -200,6 +202,68 @@ class BackendTester:
         
         return False
 
+    def test_get_transactions_pagination(self):
+        """Test keyset pagination with limit and cursor"""
+        url = f"{API_URL}/transactions"
+        response = requests.get(url, params={"limit": 1})
+        
+        if response.status_code != 200:
+            self.log_test("Get Transactions (Pagination)", False, f"Status code: {response.status_code}, Response: {response.text}")
+            return False
+        
+        first_page = response.json()
+        if len(first_page["items"]) != 1 or not first_page["next_cursor"]:
+            self.log_test("Get Transactions (Pagination)", False, f"Unexpected first page: {first_page}")
+            return False
+        
+        response = requests.get(url, params={"limit": 1, "cursor": first_page["next_cursor"]})
+        if response.status_code != 200:
+            self.log_test("Get Transactions (Pagination)", False, f"Status code: {response.status_code}, Response: {response.text}")
+            return False
+        
+        second_page = response.json()
+        if second_page["items"] and second_page["items"][0]["id"] != first_page["items"][0]["id"]:
+            self.log_test("Get Transactions (Pagination)", True, "Cursor returned the next page without overlap")
+            return True
+        
+        self.log_test("Get Transactions (Pagination)", False, f"Unexpected second page: {second_page}")
+        return False
+
+    def test_ledger_isolation(self):
+        """Test that transactions in one ledger do not leak into another"""
+        headers = {"Authorization": f"Bearer {self.admin_token}"}
+        # Satu ledger tetap dipakai ulang; 409 berarti sudah dibuat oleh run sebelumnya
+        ledger_id = ISOLATION_LEDGER_ID
+        response = requests.post(f"{API_URL}/ledgers", json={"id": ledger_id, "name": "Test Ledger"}, headers=headers)
+        if response.status_code not in (200, 409):
+            self.log_test("Ledger Isolation", False, f"Status code: {response.status_code}, Response: {response.text}")
+            return False
+        
+        before = requests.get(f"{API_URL}/ledgers/{ledger_id}/summary").json()
+        data = {
+            "tanggal": datetime.now().isoformat(),
+            "keterangan": "Ledger isolation test",
+            "jenis": "pemasukan",
+            "jumlah": 12345
+        }
+        response = requests.post(f"{API_URL}/ledgers/{ledger_id}/transactions", json=data, headers=headers)
+        if response.status_code != 200:
+            self.log_test("Ledger Isolation", False, f"Status code: {response.status_code}, Response: {response.text}")
+            return False
+        transaction_id = response.json()["id"]
+        
+        ledger_summary = requests.get(f"{API_URL}/ledgers/{ledger_id}/summary").json()
+        default_ids = [t["id"] for t in requests.get(f"{API_URL}/transactions", params={"limit": 500}).json()["items"]]
+        # Transaksi uji dihapus lagi agar ledger tetap kosong untuk run berikutnya
+        requests.delete(f"{API_URL}/ledgers/{ledger_id}/transactions/{transaction_id}", headers=headers)
+        added = ledger_summary["total_pemasukan"] - before["total_pemasukan"]
+        if added == 12345 and transaction_id not in default_ids:
+            self.log_test("Ledger Isolation", True, "Transaction is only visible in its own ledger")
+            return True
+        
+        self.log_test("Ledger Isolation", False, f"Ledger summary: {ledger_summary}, leaked: {transaction_id in default_ids}")
+        return False
+
     def test_get_summary(self):
         """Test getting financial summary"""
         url = f"{API_URL}/summary"
@@ -255,12 +319,12 @@ class BackendTester:
         url = f"{API_URL}/transactions"
         response = requests.get(url)
         
-        if response.status_code != 200 or not response.json():
+        if response.status_code != 200 or not response.json()["items"]:
             self.log_test("Delete Transaction Success", False, "No transactions available to delete")
             return False
             
         # Get the first transaction ID
-        transaction_id = response.json()[0]["id"]
+        transaction_id = response.json()["items"][0]["id"]
         
         # Now delete the transaction
         delete_url = f"{API_URL}/transactions/{transaction_id}"
@@ -286,12 +350,12 @@ class BackendTester:
         url = f"{API_URL}/transactions"
         response = requests.get(url)
         
-        if response.status_code != 200 or not response.json():
+        if response.status_code != 200 or not response.json()["items"]:
             self.log_test("Delete Transaction Unauthorized", False, "No transactions available to test with")
             return False
             
         # Get the first transaction ID
-        transaction_id = response.json()[0]["id"]
+        transaction_id = response.json()["items"][0]["id"]
         
         # Try to delete without authentication
         delete_url = f"{API_URL}/transactions/{transaction_id}"
@@ -334,7 +398,7 @@ class BackendTester:
             return False
             
         # First, get all transactions and the current summary
-        transactions_url = f"{API_URL}/transactions"
+        transactions_url = f"{API_URL}/transactions?limit=500"
         summary_url = f"{API_URL}/summary"
         
         transactions_response = requests.get(transactions_url)
@@ -344,7 +408,7 @@ class BackendTester:
             self.log_test("Data Consistency After Deletion", False, "Failed to get initial transactions or summary")
             return False
             
-        initial_transactions = transactions_response.json()
+        initial_transactions = transactions_response.json()["items"]
         initial_summary = summary_response.json()
         
         if not initial_transactions:
@@ -384,7 +448,7 @@ class BackendTester:
             self.log_test("Data Consistency After Deletion", False, "Failed to get updated transactions or summary")
             return False
             
-        updated_transactions = updated_transactions_response.json()
+        updated_transactions = updated_transactions_response.json()["items"]
         updated_summary = updated_summary_response.json()
         
         # Verify transaction count decreased by 1
@@ -426,6 +490,8 @@ class BackendTester:
         self.test_get_transactions_empty()
         self.test_create_transaction()
         self.test_get_transactions_with_data()
+        self.test_get_transactions_pagination()
+        self.test_ledger_isolation()
         self.test_get_summary()
         
         # Test authentication protection
@@ -62,6 +62,46 @@ const HomePage = () => {
     checkAdminStatus();
   }, []);
 
+  // Feed langsung: terapkan event insert/update/delete dari server tanpa fetch ulang
+  useEffect(() => {
+    const source = new EventSource(`${API}/transactions/stream`);
+    source.addEventListener('insert', (e) => {
+      const { transaction, totals } = JSON.parse(e.data);
+      setTransactions(prev => prev.some(t => t.id === transaction.id)
+        ? prev
+        : [{ ...transaction, tanggal: formatIndonesianDate(transaction.tanggal) }, ...prev]);
+      setSummary(totals);
+    });
+    source.addEventListener('delete', (e) => {
+      const { id, totals } = JSON.parse(e.data);
+      setTransactions(prev => prev.filter(t => t.id !== id));
+      setSummary(totals);
+    });
+    source.addEventListener('update', (e) => {
+      const { transaction, totals } = JSON.parse(e.data);
+      setTransactions(prev => prev.map(t => t.id === transaction.id
+        ? { ...transaction, tanggal: formatIndonesianDate(transaction.tanggal) }
+        : t));
+      setSummary(totals);
+    });
+    source.addEventListener('bulk_insert', () => fetchData());
+    source.addEventListener('resync', () => fetchData());
+    return () => source.close();
+  }, []);
+
+  const applyDelete = async (transactionId) => {
+    // Idempoten: event SSE 'delete' bisa sudah menghapus baris ini lebih dulu
+    setTransactions(prev => prev.filter(t => t.id !== transactionId));
+    // Total tidak dihitung lokal (bisa terpotong dua kali setelah event SSE);
+    // ambil nilai resmi dari server bila feed langsung tidak tersambung
+    try {
+      const { data } = await axios.get(`${API}/summary`);
+      setSummary(data);
+    } catch (error) {
+      console.error('Error fetching summary:', error);
+    }
+  };
+
   const checkAdminStatus = () => {
     const token = localStorage.getItem('adminToken');
     setIsAdmin(!!token);
@@ -113,8 +153,8 @@ const HomePage = () => {
         }
       });
       
-      // Refresh data after deletion
-      fetchData();
+      // Hapus baris secara lokal, tidak perlu mengambil ulang seluruh jurnal
+      await applyDelete(transactionId);
       alert('Transaksi berhasil dihapus');
     } catch (error) {
       alert('Gagal menghapus transaksi');
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from metadata import MongoMetadataStore, SQLiteMetadataStore  # noqa: E402
+from storage import MongoTransactionRepository, SQLiteTransactionRepository  # noqa: E402
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: test performa penyimpanan (lebih lambat, jalankan dengan -m perf)")
+
+
+def pytest_collection_modifyitems(config, items):
+    # Test perf hanya jalan bila diminta lewat -m
+    if config.getoption("markexpr"):
+        return
+    skip_perf = pytest.mark.skip(reason="test performa, jalankan dengan -m perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip_perf)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(params=["mongo", "sqlite"])
+async def repository(request, tmp_path):
+    if request.param == "mongo":
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        db = mongomock_motor.AsyncMongoMockClient()["jurnalkas_test"]
+        # Sama seperti ensure_indexes: id transaksi unik
+        await db.transactions.create_index("id", unique=True)
+        repo = MongoTransactionRepository(lambda: db)
+        repo.reconcile_confirm_seconds = 0
+    else:
+        pytest.importorskip("aiosqlite")
+        repo = SQLiteTransactionRepository(str(tmp_path / "jurnalkas.db"))
+    await repo.setup()
+    try:
+        yield repo
+    finally:
+        await repo.close()
+
+
+@pytest.fixture(params=["mongo", "sqlite"])
+async def metadata_store(request, tmp_path):
+    if request.param == "mongo":
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        db = mongomock_motor.AsyncMongoMockClient()["jurnalkas_test"]
+        await db.admin_users.create_index("username", unique=True)
+        store = MongoMetadataStore(lambda: db)
+    else:
+        pytest.importorskip("aiosqlite")
+        store = SQLiteMetadataStore(str(tmp_path / "jurnalkas.db"), idempotency_ttl_seconds=3600, artifact_ttl_seconds=3600)
+    await store.setup()
+    try:
+        yield store
+    finally:
+        await store.close()
@@ -0,0 +1,97 @@
+"""Token bertanda, daftar pencabutan, pembatas login, dan hash password."""
+import pytest
+
+import auth
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(auth, "time", clock)
+    return clock
+
+
+def test_token_round_trip(clock):
+    signer = auth.TokenSigner(b"rahasia", ttl_seconds=60)
+    issued = signer.issue("admin")
+    claims = signer.verify(issued["token"])
+    assert claims == issued["claims"]
+    assert (claims["sub"], claims["exp"] - claims["iat"]) == ("admin", 60)
+
+
+FORGED_PAYLOAD = auth.b64encode(b'{"sub":"root","exp":9999999999}')
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda payload, signature: f"{payload}.{signature[:-1]}{'B' if signature.endswith('A') else 'A'}",
+    lambda payload, signature: f"{FORGED_PAYLOAD}.{signature}",
+    lambda payload, signature: payload,
+])
+def test_forged_token_is_rejected(clock, tamper):
+    token = auth.TokenSigner(b"rahasia").issue("admin")["token"]
+    with pytest.raises(auth.InvalidToken):
+        auth.TokenSigner(b"rahasia").verify(tamper(*token.split(".")))
+
+
+def test_token_signed_with_other_secret_is_rejected(clock):
+    token = auth.TokenSigner(b"lain").issue("admin")["token"]
+    with pytest.raises(auth.InvalidToken):
+        auth.TokenSigner(b"rahasia").verify(token)
+
+
+def test_expired_token_is_rejected_even_when_cached(clock):
+    signer = auth.TokenSigner(b"rahasia", ttl_seconds=60)
+    token = signer.issue("admin")["token"]
+    signer.verify(token)
+    clock.now += 60
+    with pytest.raises(auth.InvalidToken, match="kedaluwarsa"):
+        signer.verify(token)
+
+
+def test_revocation_lasts_until_expiry(clock):
+    revoked = auth.RevocationList(max_entries=2)
+    revoked.revoke("a", clock.now + 10)
+    assert revoked.is_revoked("a") and not revoked.is_revoked("b")
+    clock.now += 10
+    assert not revoked.is_revoked("a")
+
+    for jti in ("x", "y", "z"):
+        revoked.revoke(jti, clock.now + 10)
+    assert [revoked.is_revoked(jti) for jti in ("x", "y", "z")] == [False, True, True]
+
+
+def test_login_limiter_window(clock):
+    limiter = auth.LoginRateLimiter(max_attempts=2, window_seconds=30)
+    assert limiter.retry_after("ip") is None
+    limiter.record_failure("ip")
+    clock.now += 10
+    limiter.record_failure("ip")
+    assert limiter.retry_after("ip") == pytest.approx(20)
+    assert limiter.retry_after("ip-lain") is None
+    clock.now += 20
+    assert limiter.retry_after("ip") is None
+
+    limiter.record_failure("ip")
+    limiter.reset("ip")
+    assert limiter.retry_after("ip") is None
+
+
+def test_scrypt_round_trip():
+    password_hash = auth.hash_password("kas-rt05")
+    assert password_hash.startswith("scrypt$")
+    assert auth.verify_password("kas-rt05", password_hash)
+    assert not auth.verify_password("kas-rt06", password_hash)
+    assert password_hash != auth.hash_password("kas-rt05")
+    assert not auth.verify_password("kas-rt05", "md5$abc")
+    assert not auth.verify_password("kas-rt05", "bukan-hash")
@@ -0,0 +1,42 @@
+"""Impor massal: kuota ledger hanya dihitung dari baris yang valid."""
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+
+    monkeypatch.setattr(server, "database", mongomock_motor.AsyncMongoMockClient()["jurnalkas_test"])
+    monkeypatch.setattr(server, "LEDGER_MAX_TRANSACTIONS", 2)
+    server.response_caches.invalidate()
+    await server.ensure_admin_user()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/api/login", json={"username": "admin", "password": "admin"})
+        client.headers["Authorization"] = f"Bearer {login.json()['token']}"
+        yield client
+
+
+def row(jumlah) -> dict:
+    return {"tanggal": "2024-01-10T08:00:00", "keterangan": "Iuran", "jenis": "pemasukan", "jumlah": jumlah}
+
+
+async def test_invalid_rows_do_not_count_against_quota(client):
+    response = await client.post("/api/transactions/bulk", json=[row(500), row(0), "bukan objek", row(-1), row(700)])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["inserted"], body["failed"]) == (2, 3)
+    assert [bool(result["error"]) for result in body["results"]] == [False, True, True, True, False]
+
+    # Ledger sudah penuh: baris valid berikutnya ditolak, baris gagal saja tetap dilaporkan
+    rejected = await client.post("/api/transactions/bulk", json=[row(0), row(100)])
+    assert rejected.status_code == 403
+    only_invalid = await client.post("/api/transactions/bulk", json=[row(0)])
+    assert only_invalid.status_code == 200
+    assert (only_invalid.json()["inserted"], only_invalid.json()["failed"]) == (0, 1)
+    summary = (await client.get("/api/summary")).json()
+    assert summary["total_pemasukan"] == 1200
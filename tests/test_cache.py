@@ -0,0 +1,126 @@
+"""Cache respons per ledger dan revalidasi ETag/304."""
+import httpx
+import pytest
+
+import cache
+from cache import ResponseCache, TenantCaches
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    responses = ResponseCache(ttl_seconds=30)
+    responses.set("a", b"isi", '"v0"', responses.version)
+    clock.now += 29
+    assert responses.get("a").body == b"isi"
+    clock.now += 1
+    assert responses.get("a") is None
+    assert len(responses) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    responses = ResponseCache(max_entries=2)
+    for key in ("a", "b"):
+        responses.set(key, key.encode(), '"v0"', 0)
+    responses.get("a")
+    responses.set("c", b"c", '"v0"', 0)
+    assert [key for key in "abc" if responses.get(key)] == ["a", "c"]
+
+
+def test_invalidate_drops_entries_and_late_results(clock):
+    responses = ResponseCache()
+    responses.set("a", b"lama", '"v0"', responses.version)
+    responses.set_validator({"version": 1}, responses.version)
+    version_before_build = responses.version
+    responses.invalidate()
+    assert responses.get("a") is None
+    assert responses.get_validator() is None
+
+    # Hasil yang dibangun sebelum invalidasi dikembalikan tapi tidak disimpan
+    entry = responses.set("a", b"basi", '"v0"', version_before_build)
+    assert entry.body == b"basi" and responses.get("a") is None
+    responses.set_validator({"version": 1}, version_before_build)
+    assert responses.get_validator() is None
+
+
+def test_validator_expires_with_ttl(clock):
+    responses = ResponseCache(ttl_seconds=5)
+    responses.set_validator({"version": 3}, responses.version)
+    assert responses.get_validator() == {"version": 3}
+    clock.now += 5
+    assert responses.get_validator() is None
+
+
+def test_tenants_are_isolated_and_capped(clock):
+    caches = TenantCaches(max_entries_per_tenant=1, max_tenants=2)
+    caches.for_tenant("rt01").set("a", b"1", '"v0"', 0)
+    caches.for_tenant("rt02").set("a", b"2", '"v0"', 0)
+    caches.invalidate("rt01")
+    assert caches.for_tenant("rt01").get("a") is None
+    assert caches.for_tenant("rt02").get("a").body == b"2"
+
+    # Kuota per ledger bisa diperbesar; tenant ketiga mengusir yang paling lama tidak dipakai
+    big = caches.for_tenant("rt02", max_entries=5)
+    big.set("b", b"3", '"v0"', 0)
+    assert len(big) == 2
+    caches.for_tenant("rt03")
+    assert caches.for_tenant("rt01") is not None and len(caches) == 0
+
+    caches.for_tenant("rt03").set("a", b"4", '"v0"', 0)
+    caches.invalidate()
+    assert len(caches) == 0
+
+
+@pytest.fixture
+async def client():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+
+    server.database = mongomock_motor.AsyncMongoMockClient()["jurnalkas_test"]
+    server.response_caches.invalidate()
+    await server.ensure_admin_user()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/api/login", json={"username": "admin", "password": "admin"})
+        client.headers["Authorization"] = f"Bearer {login.json()['token']}"
+        yield client
+    server.database = None
+
+
+async def create(client, jumlah: int):
+    response = await client.post("/api/transactions", json={
+        "tanggal": "2024-01-10T08:00:00", "keterangan": "Iuran", "jenis": "pemasukan", "jumlah": jumlah,
+    })
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.anyio
+async def test_etag_revalidation(client):
+    await create(client, 500)
+    first = await client.get("/api/summary")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('W/"default-')
+
+    for if_none_match in (etag, etag.removeprefix("W/"), '"lain", ' + etag, "*"):
+        revalidated = await client.get("/api/summary", headers={"If-None-Match": if_none_match})
+        assert (revalidated.status_code, revalidated.content) == (304, b"")
+    since = {"If-Modified-Since": first.headers["last-modified"]}
+    assert (await client.get("/api/summary", headers=since)).status_code == 304
+
+    await create(client, 1000)
+    changed = await client.get("/api/summary", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["total_pemasukan"] == 1500
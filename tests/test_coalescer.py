@@ -0,0 +1,49 @@
+"""Penggabungan penulisan konkuren menjadi satu batch."""
+import asyncio
+
+import pytest
+
+from coalescer import WriteCoalescer
+
+pytestmark = pytest.mark.anyio
+
+
+class Recorder:
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def __call__(self, items: list) -> list:
+        self.batches.append(list(items))
+        if self.fail:
+            raise RuntimeError("batch gagal")
+        return [ValueError(item) if item < 0 else item * 10 for item in items]
+
+
+async def test_concurrent_writes_share_one_flush():
+    flush = Recorder()
+    coalescer = WriteCoalescer(flush, window_seconds=0.01)
+    results = await asyncio.gather(*(coalescer.submit(item) for item in (1, 2, 3)), return_exceptions=True)
+    assert results == [10, 20, 30]
+    assert flush.batches == [[1, 2, 3]]
+
+
+async def test_per_item_errors_only_reach_their_caller():
+    coalescer = WriteCoalescer(Recorder(), window_seconds=0.01)
+    results = await asyncio.gather(coalescer.submit(1), coalescer.submit(-1), return_exceptions=True)
+    assert results[0] == 10
+    assert isinstance(results[1], ValueError)
+
+
+async def test_flush_failure_reaches_every_caller():
+    coalescer = WriteCoalescer(Recorder(fail=True), window_seconds=0.01)
+    results = await asyncio.gather(coalescer.submit(1), coalescer.submit(2), return_exceptions=True)
+    assert [str(result) for result in results] == ["batch gagal", "batch gagal"]
+
+
+async def test_full_batch_flushes_without_waiting():
+    flush = Recorder()
+    coalescer = WriteCoalescer(flush, window_seconds=60, max_batch=2)
+    results = await asyncio.wait_for(asyncio.gather(*(coalescer.submit(item) for item in (1, 2))), timeout=1)
+    assert results == [10, 20]
+    assert flush.batches == [[1, 2]]
@@ -0,0 +1,80 @@
+"""Negosiasi encoding dan middleware kompresi respons."""
+import gzip
+
+import httpx
+import pytest
+
+import compression
+
+pytestmark = pytest.mark.anyio
+
+BIG = b"iuran kas " * 500
+
+
+def test_negotiate():
+    preferred = compression.ENCODINGS[0]
+    assert compression.negotiate(None) is None
+    assert compression.negotiate("identity") is None
+    assert compression.negotiate("gzip;q=0, deflate") is None
+    assert compression.negotiate("gzip, deflate") == "gzip"
+    assert compression.negotiate("*") == preferred
+    assert compression.negotiate("br, GZIP") == preferred
+
+
+def test_compress_round_trip():
+    assert gzip.decompress(compression.compress(BIG, "gzip")) == BIG
+    if compression.brotli is not None:
+        assert compression.brotli.decompress(compression.compress(BIG, "br")) == BIG
+
+
+def test_weak_etag():
+    assert compression.weak_etag('"abc"') == 'W/"abc"'
+    assert compression.weak_etag('W/"abc"') == 'W/"abc"'
+
+
+def app_sending(*chunks: bytes, media_type: str = "application/json", headers=()):
+    async def app(scope, receive, send):
+        raw = [(b"content-type", media_type.encode()), *headers]
+        if len(chunks) == 1:
+            raw.append((b"content-length", str(len(chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": raw})
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+
+    return compression.CompressionMiddleware(app, minimum_size=1024)
+
+
+async def fetch(app, accept_encoding: str = "gzip") -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get("/", headers={"Accept-Encoding": accept_encoding})
+
+
+async def test_large_body_is_gzipped():
+    response = await fetch(app_sending(BIG, headers=[(b"etag", b'"v1"')]))
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < len(BIG)
+    assert response.content == BIG
+
+
+async def test_streamed_body_is_gzipped_without_length():
+    response = await fetch(app_sending(BIG[:600], BIG[600:]))
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == BIG
+
+
+@pytest.mark.parametrize("app, accept_encoding, encoding", [
+    (app_sending(b"kecil" * 10), "gzip", None),
+    (app_sending(BIG), "identity", None),
+    (app_sending(BIG, media_type="text/event-stream"), "gzip", None),
+    # Sudah dikompres (misal dari cache respons): tidak dikompres dua kali
+    (app_sending(gzip.compress(BIG), headers=[(b"content-encoding", b"gzip")]), "gzip", "gzip"),
+])
+async def test_passthrough(app, accept_encoding, encoding):
+    response = await fetch(app, accept_encoding)
+    assert response.headers.get("content-encoding") == encoding
+    assert "vary" not in response.headers
+    assert response.content in (b"kecil" * 10, BIG)
@@ -0,0 +1,117 @@
+"""Feed ledger SSE: broker pub/sub, siklus hidup subscriber, dan change stream yang putus."""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+import server
+from events import LedgerBroker
+
+pytestmark = pytest.mark.anyio
+
+
+def test_publish_reaches_only_the_ledger_subscribers():
+    broker = LedgerBroker()
+    first, second, other = broker.subscribe("L1"), broker.subscribe("L1"), broker.subscribe("L2")
+    broker.publish("L1", {"type": "insert"})
+    assert [first.get_nowait(), second.get_nowait()] == [{"type": "insert"}] * 2
+    assert other.empty()
+
+    broker.publish(None, {"type": "resync"})
+    assert [queue.get_nowait() for queue in (first, second, other)] == [{"type": "resync"}] * 3
+
+
+def test_unsubscribe_drops_empty_ledgers():
+    broker = LedgerBroker()
+    first, second = broker.subscribe("L1"), broker.subscribe("L1")
+    assert (broker.subscriber_count("L1"), broker.subscriber_count()) == (2, 2)
+    broker.unsubscribe("L1", first)
+    broker.unsubscribe("L1", first)
+    assert broker.subscriber_count("L1") == 1
+    broker.unsubscribe("L1", second)
+    broker.unsubscribe("L9", second)
+    assert broker.subscriber_count() == 0
+    assert broker._subscribers == {}
+
+
+def test_slow_subscriber_is_reset_to_resync():
+    broker = LedgerBroker(queue_size=2)
+    queue = broker.subscribe("L1")
+    for i in range(3):
+        broker.publish("L1", {"type": "insert", "n": i})
+    assert queue.get_nowait() == {"type": "resync"}
+    assert queue.empty()
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    async def build_summary(ledger_id, filters):
+        return {"total_pemasukan": 0}
+
+    broker = LedgerBroker()
+    monkeypatch.setattr(server, "ledger_broker", broker)
+    monkeypatch.setattr(server, "build_summary", build_summary)
+    return broker
+
+
+async def test_stream_unsubscribes_when_closed(broker):
+    response = await server.stream_transactions("L1")
+    # Respons yang tidak pernah dikirim tidak meninggalkan subscriber
+    assert broker.subscriber_count("L1") == 0
+    events = response.body_iterator
+    assert (await events.__anext__()).startswith(b"event: snapshot\n")
+    assert broker.subscriber_count("L1") == 1
+    broker.publish("L1", {"type": "resync"})
+    assert (await events.__anext__()).startswith(b"event: resync\n")
+    await events.aclose()
+    assert broker.subscriber_count("L1") == 0
+
+
+class FlakyChangeStream:
+    """Koneksi pertama putus, koneksi berikutnya mengirim satu perubahan lalu diam."""
+
+    def __init__(self, changes):
+        self.changes = changes
+        self.opened = 0
+
+    def watch(self, **options):
+        self.opened += 1
+        return self
+
+    async def __aenter__(self):
+        if self.opened == 1:
+            raise AutoReconnect("koneksi terputus")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        for change in self.changes:
+            yield change
+        await asyncio.Event().wait()
+
+
+async def test_change_stream_is_retried_with_resync(broker, monkeypatch):
+    document = {"id": "t1", "ledger_id": "L1", "tanggal": datetime(2024, 1, 1), "keterangan": "gaji",
+                "jenis": "pemasukan", "jumlah": 1000}
+    changes = FlakyChangeStream([{"operationType": "insert", "fullDocument": document}])
+    monkeypatch.setattr(server, "get_db", lambda: SimpleNamespace(transactions=changes))
+    monkeypatch.setattr(server, "get_storage", lambda: SimpleNamespace(name="mongo"))
+    monkeypatch.setattr(server, "WATCH_RETRY_SECONDS", 0.01)
+    queue = broker.subscribe("L1")
+
+    watcher = asyncio.create_task(server.watch_ledger_changes())
+    try:
+        first = await asyncio.wait_for(queue.get(), 1)
+        second = await asyncio.wait_for(queue.get(), 1)
+        assert changes.opened == 2
+        assert first == {"type": "resync"}
+        assert (second["type"], second["transaction"]["id"], second["totals"]) == ("insert", "t1", {"total_pemasukan": 0})
+        assert broker.local_publish is False
+    finally:
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+    assert broker.local_publish is True
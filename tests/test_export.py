@@ -0,0 +1,45 @@
+"""Export streaming harus memegang slot konkurensi sampai body selesai dikirim."""
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def server():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+
+    server.database = mongomock_motor.AsyncMongoMockClient()["jurnalkas_test"]
+    yield server
+    server.database = None
+
+
+async def test_export_holds_slot_while_streaming(server, monkeypatch):
+    seen = []
+
+    async def iter_export_ndjson(cursor):
+        async for _ in cursor:
+            pass
+        for line in (b"a\n", b"b\n"):
+            seen.append(server.guarded_requests.in_use)
+            yield line
+
+    monkeypatch.setattr(server, "iter_export_ndjson", iter_export_ndjson)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/transactions/export", params={"format": "ndjson"})
+    assert (response.status_code, response.text) == (200, "a\nb\n")
+    assert seen == [1, 1]
+    assert server.guarded_requests.in_use == 0
+
+
+async def test_export_rejected_when_slots_full(server, monkeypatch):
+    async def acquire():
+        return False
+
+    monkeypatch.setattr(server.guarded_requests, "acquire", acquire)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/transactions/export")
+    assert response.status_code == 503
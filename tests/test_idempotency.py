@@ -0,0 +1,54 @@
+"""Klaim Idempotency-Key yang ditinggal proses yang mati harus bisa diselesaikan ulang."""
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+PAYLOAD = {"tanggal": "2024-01-10T08:00:00", "keterangan": "Iuran", "jenis": "pemasukan", "jumlah": 1000}
+
+
+@pytest.fixture
+async def client():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+
+    server.database = mongomock_motor.AsyncMongoMockClient()["jurnalkas_test"]
+    await server.ensure_admin_user()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/api/login", json={"username": "admin", "password": "admin"})
+        client.headers["Authorization"] = f"Bearer {login.json()['token']}"
+        yield client
+    server.database = None
+
+
+async def crash_after(server, monkeypatch, step: str):
+    # Proses mati setelah langkah ``step``: respons tidak pernah tersimpan
+    async def crash(*args):
+        raise SystemExit
+
+    if step == "claim":
+        monkeypatch.setattr(server.get_metadata(), "record_idempotency_transaction", crash)
+    else:
+        monkeypatch.setattr(server.get_metadata(), "set_idempotency_response", crash)
+
+
+@pytest.mark.parametrize("step", ["claim", "save"])
+async def test_abandoned_claim_is_reclaimed_after_lease(client, monkeypatch, step):
+    import server
+
+    with monkeypatch.context() as patch:
+        await crash_after(server, patch, step)
+        with pytest.raises(SystemExit):
+            await client.post("/api/transactions", json=PAYLOAD, headers={"Idempotency-Key": "k1"})
+
+    retry = await client.post("/api/transactions", json=PAYLOAD, headers={"Idempotency-Key": "k1"})
+    assert retry.status_code == 409
+
+    monkeypatch.setattr(server, "IDEMPOTENCY_LEASE_SECONDS", -1)
+    retry = await client.post("/api/transactions", json=PAYLOAD, headers={"Idempotency-Key": "k1"})
+    assert retry.status_code == 200, retry.text
+    replay = await client.post("/api/transactions", json=PAYLOAD, headers={"Idempotency-Key": "k1"})
+    assert replay.json()["id"] == retry.json()["id"]
+    page = (await client.get("/api/transactions")).json()
+    assert [row["id"] for row in page["items"]] == [retry.json()["id"]]
@@ -0,0 +1,111 @@
+"""Penjadwal job: klaim atomik antar proses, retry dengan backoff, timeout, dan riwayat."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+
+pytestmark = pytest.mark.anyio
+
+
+def scheduler(store, **options) -> jobs.JobScheduler:
+    return jobs.JobScheduler(lambda: store, workers=1, **options)
+
+
+class Flaky:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError(f"gagal ke-{self.calls}")
+        return {"calls": self.calls}
+
+
+async def test_only_one_worker_claims_a_due_run(metadata_store):
+    now = datetime(2024, 1, 1, 12)
+    first, second = scheduler(metadata_store), scheduler(metadata_store)
+    for each in (first, second):
+        each.register("rekap", Flaky(0), jobs.Interval(60))
+    await metadata_store.init_job("rekap", "setiap 60 detik", now)
+
+    claims = await asyncio.gather(first._claim(first.jobs["rekap"], now), second._claim(second.jobs["rekap"], now))
+    assert sorted(claims) == [False, True]
+    [job] = await metadata_store.job_schedules(["rekap"])
+    assert job["next_run_at"] == now + timedelta(seconds=60)
+
+
+async def test_due_job_runs_once_across_schedulers(metadata_store):
+    flaky = Flaky(0)
+    schedulers = [scheduler(metadata_store), scheduler(metadata_store)]
+    for each in schedulers:
+        each.register("rekap", flaky, jobs.Interval(3600))
+    # Jadwal tersimpan yang sudah lewat dipertahankan saat start: langsung jatuh tempo
+    await metadata_store.init_job("rekap", "setiap 3600 detik", datetime.utcnow() - timedelta(minutes=1))
+    for each in schedulers:
+        await each.start()
+    try:
+        for _ in range(50):
+            if (await metadata_store.recent_job_runs(10)) and not any(each._active for each in schedulers):
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        for each in schedulers:
+            await each.stop()
+    runs = await metadata_store.recent_job_runs(10)
+    assert flaky.calls == 1
+    assert [(run["status"], run["trigger"]) for run in runs] == [("succeeded", "schedule")]
+
+
+async def test_retries_with_exponential_backoff(metadata_store, monkeypatch):
+    delays = []
+
+    async def record_sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(jobs.asyncio, "sleep", record_sleep)
+    runner = scheduler(metadata_store)
+    runner.register("rekap", Flaky(2), jobs.Interval(60), max_attempts=3, retry_delay_seconds=10)
+    run = await runner.run_once("rekap")
+    assert delays == [10, 20]
+    assert (run["status"], run["attempts"], run["result"]) == ("succeeded", 3, {"calls": 3})
+    assert "error" not in run
+
+
+async def test_gives_up_after_max_attempts(metadata_store, monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(jobs.asyncio, "sleep", no_sleep)
+    runner = scheduler(metadata_store)
+    runner.register("rekap", Flaky(5), jobs.Interval(60), max_attempts=2)
+    run = await runner.run_once("rekap")
+    assert (run["status"], run["attempts"], run["error"]) == ("failed", 2, "RuntimeError: gagal ke-2")
+    [job] = await metadata_store.job_schedules(["rekap"])
+    assert (job["last_run_id"], job["last_status"]) == (run["_id"], "failed")
+
+
+async def test_timeout_counts_as_failed_attempt(metadata_store):
+    async def hang() -> dict:
+        await asyncio.Event().wait()
+
+    runner = scheduler(metadata_store)
+    runner.register("rekap", hang, jobs.Interval(60), max_attempts=1, timeout_seconds=0.01)
+    run = await runner.run_once("rekap")
+    assert (run["status"], run["error"].split(":")[0]) == ("failed", "TimeoutError")
+
+
+async def test_history_is_trimmed(metadata_store):
+    runner = scheduler(metadata_store, history_limit=2)
+    runner.register("rekap", Flaky(0), jobs.Interval(60))
+    ids = []
+    for _ in range(3):
+        ids.append((await runner.run_once("rekap"))["_id"])
+        # Mongo menyimpan waktu dalam milidetik: pastikan urutan started_at tidak seri
+        await asyncio.sleep(0.002)
+    assert [run["_id"] for run in await metadata_store.recent_job_runs(10)] == ids[:0:-1]
+    status = await runner.status()
+    assert [job["state"] for job in status["jobs"]] == ["idle"]
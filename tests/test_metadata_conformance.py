@@ -0,0 +1,126 @@
+"""Perilaku yang wajib sama untuk setiap implementasi ``MetadataStore``."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import ledger_delta
+
+pytestmark = pytest.mark.anyio
+
+
+def create_event(transaction_id: str, jumlah: int) -> dict:
+    after = {"id": transaction_id, "jenis": "pemasukan", "jumlah": jumlah, "tanggal": datetime(2024, 1, 1)}
+    return {"type": "create", "transaction_id": transaction_id, "actor": "admin", "transaction": after, "delta": ledger_delta(None, after)}
+
+
+async def test_admin_users_and_ledgers(metadata_store):
+    assert not await metadata_store.has_admin_users()
+    assert await metadata_store.create_admin_user("admin", "hash-1")
+    assert not await metadata_store.create_admin_user("admin", "hash-2")
+    assert not await metadata_store.set_admin_password("admin", "hash-3")
+    assert (await metadata_store.get_admin_user("admin"))["password_hash"] == "hash-3"
+    assert await metadata_store.get_admin_user("bendahara") is None
+
+    assert await metadata_store.create_ledger({"_id": "rt05", "name": "RT 05", "max_transactions": 10})
+    assert not await metadata_store.create_ledger({"_id": "rt05", "name": "Lain"})
+    ledger = await metadata_store.get_ledger("rt05")
+    assert (ledger["_id"], ledger["name"], ledger["max_transactions"]) == ("rt05", "RT 05", 10)
+    assert [ledger["_id"] for ledger in await metadata_store.list_ledgers()] == ["rt05"]
+
+
+async def test_ledger_versions_track_months(metadata_store):
+    assert await metadata_store.get_ledger_version("default") == {}
+    await metadata_store.bump_ledger_version("default", ["2024-01", "2024-01"])
+    await metadata_store.bump_ledger_version("default", ())
+    await metadata_store.bump_ledger_version("default", None)
+    state = await metadata_store.get_ledger_version("default")
+    assert (state["version"], state["epoch"], state["months"]) == (3, 1, {"2024-01": 1})
+    assert isinstance(state["modified_at"], datetime)
+
+
+async def test_events_and_snapshots(metadata_store):
+    await metadata_store.append_events("default", [create_event("a", 100), create_event("b", 50)])
+    await metadata_store.append_events("rt05", [create_event("c", 7)])
+    await metadata_store.append_events("default", [create_event("a", 25)])
+    assert await metadata_store.current_event_seq("default") == 3
+
+    page = await metadata_store.event_page("default", 2, None, None)
+    assert [event["seq"] for event in page] == [3, 2]
+    assert "delta" not in page[0] and page[0]["transaction"]["jumlah"] == 25
+    assert [event["seq"] for event in await metadata_store.event_page("default", 10, 3, "a")] == [1]
+
+    tail = await metadata_store.sum_event_deltas("default", 1)
+    assert (tail["total_pemasukan"], tail["count"], tail["seq"]) == (75, 2, 3)
+    assert await metadata_store.sum_event_deltas("default", 3) is None
+
+    at = datetime(2024, 1, 1)
+    await metadata_store.insert_snapshot({"ledger_id": "default", "seq": 0, "at": at, "total_pemasukan": 0, "total_pengeluaran": 0, "count": 0, "genesis": True})
+    await metadata_store.insert_snapshot({"ledger_id": "default", "seq": 3, "at": at + timedelta(days=1), "total_pemasukan": 175, "total_pengeluaran": 0, "count": 3})
+    assert (await metadata_store.latest_snapshot("default"))["seq"] == 3
+    assert (await metadata_store.snapshot_as_of("default", at + timedelta(hours=1)))["seq"] == 0
+    assert await metadata_store.snapshot_as_of("default", at - timedelta(days=1)) is None
+    assert await metadata_store.latest_snapshot("rt05") is None
+
+
+async def test_idempotency_keys(metadata_store):
+    assert await metadata_store.insert_idempotency_key("k", "fp")
+    assert not await metadata_store.insert_idempotency_key("k", "fp")
+    assert (await metadata_store.get_idempotency_key("k"))["response"] is None
+    await metadata_store.set_idempotency_response("k", {"id": "t1", "jumlah": 5})
+    stored = await metadata_store.get_idempotency_key("k")
+    assert (stored["fingerprint"], stored["response"]) == ("fp", {"id": "t1", "jumlah": 5})
+    await metadata_store.delete_idempotency_key("k")
+    assert await metadata_store.get_idempotency_key("k") is None
+
+
+async def test_idempotency_claim_lease(metadata_store):
+    await metadata_store.insert_idempotency_key("k", "fp")
+    await metadata_store.record_idempotency_transaction("k", {"id": "t1", "jumlah": 5})
+    claimed_at = (await metadata_store.get_idempotency_key("k"))["created_at"]
+    assert await metadata_store.reclaim_idempotency_key("k", claimed_at) is None
+
+    reclaimed = await metadata_store.reclaim_idempotency_key("k", claimed_at + timedelta(seconds=1))
+    assert (reclaimed["fingerprint"], reclaimed["response"], reclaimed["transaction"]) == ("fp", None, {"id": "t1", "jumlah": 5})
+    assert reclaimed["created_at"] >= claimed_at
+    # Hanya satu pengambil alih yang menang
+    assert await metadata_store.reclaim_idempotency_key("k", reclaimed["created_at"]) is None
+
+    await metadata_store.set_idempotency_response("k", {"id": "t1"})
+    assert await metadata_store.reclaim_idempotency_key("k", datetime.utcnow() + timedelta(seconds=1)) is None
+
+
+async def test_reports_and_statements(metadata_store):
+    for month in ("2024-01", "2024-02", "2024-03"):
+        await metadata_store.save_monthly_report("default", {"month": month, "saldo_akhir": 1})
+    await metadata_store.save_monthly_report("default", {"month": "2024-02", "saldo_akhir": 2})
+    reports = await metadata_store.list_monthly_reports("default", "2024-02", None)
+    assert [(r["month"], r["saldo_akhir"]) for r in reports] == [("2024-03", 1), ("2024-02", 2)]
+
+    await metadata_store.put_statement_artifact("d.csv", b"pertama")
+    await metadata_store.put_statement_artifact("d.csv", b"kedua")
+    assert await metadata_store.get_statement_artifact("d.csv") == b"pertama"
+    assert await metadata_store.get_statement_artifact("lain.csv") is None
+    await metadata_store.save_statement_pointer("default:2024-01", "f1", "d")
+    await metadata_store.save_statement_pointer("default:2024-01", "f2", "e")
+    pointer = await metadata_store.get_statement_pointer("default:2024-01")
+    assert (pointer["fingerprint"], pointer["digest"]) == ("f2", "e")
+
+
+async def test_job_claims_and_history(metadata_store):
+    now = datetime(2024, 1, 1, 12)
+    await metadata_store.init_job("rekap", "harian", now)
+    await metadata_store.init_job("rekap", "harian 02:00", now + timedelta(days=7))
+    [job] = await metadata_store.job_schedules(["rekap"])
+    assert (job["name"], job["schedule"], job["next_run_at"]) == ("rekap", "harian 02:00", now)
+    assert await metadata_store.claim_job("rekap", now, now + timedelta(days=1), "a")
+    assert not await metadata_store.claim_job("rekap", now, now + timedelta(days=1), "b")
+
+    for index in range(3):
+        run = {"_id": f"r{index}", "job": "rekap", "status": "running", "started_at": now + timedelta(minutes=index)}
+        await metadata_store.insert_job_run(run)
+        await metadata_store.update_job_run(run["_id"], {"attempts": 1})
+        run.update({"status": "succeeded", "finished_at": now, "duration_ms": 1.0})
+        await metadata_store.finish_job_run(run, history_limit=2)
+    assert [run["_id"] for run in await metadata_store.recent_job_runs(10)] == ["r2", "r1"]
+    [job] = await metadata_store.job_schedules(["rekap"])
+    assert (job["last_run_id"], job["last_status"]) == ("r2", "succeeded")
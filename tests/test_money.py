@@ -0,0 +1,28 @@
+"""Batas jumlah rupiah per transaksi."""
+import pytest
+from pydantic import ValidationError
+
+import server
+
+
+@pytest.mark.parametrize("value", [1, "1", 10 ** 15, "1000000000000000", 50000.0])
+def test_accepts_amounts_up_to_the_cap(value):
+    assert server.parse_rupiah(value) == int(value)
+
+
+@pytest.mark.parametrize("value", [0, -1, 10 ** 15 + 1, 2 ** 62, 2 ** 63, "1.5", "nan", True])
+def test_rejects_amounts_outside_the_cap(value):
+    with pytest.raises(ValueError):
+        server.parse_rupiah(value)
+
+
+def test_ledger_sums_stay_within_int64():
+    # Ribuan transaksi sebesar batas tetap tidak meluap di $inc Int64 atau SUM() SQLite
+    assert 9000 * server.MAX_JUMLAH < 2 ** 63 - 1
+
+
+def test_transaction_model_rejects_amount_over_cap():
+    payload = {"tanggal": "2024-01-01T00:00:00", "keterangan": "Iuran", "jenis": "pemasukan"}
+    assert server.TransactionCreate(**payload, jumlah=10 ** 15).jumlah == 10 ** 15
+    with pytest.raises(ValidationError, match="jumlah harus antara 1 dan"):
+        server.TransactionCreate(**payload, jumlah=10 ** 15 + 1)
@@ -0,0 +1,85 @@
+"""Rekonsiliasi total Mongo tidak boleh menghitung dua kali $inc yang belum masuk."""
+from datetime import datetime
+
+import pytest
+from bson import Int64
+
+import storage
+from storage import MongoTransactionRepository, ledger_delta
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def repository():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["jurnalkas_test"]
+    repo = MongoTransactionRepository(lambda: db)
+    repo.reconcile_confirm_seconds = 0
+    await repo.insert_many([make_transaction("a", 100)])
+    await repo.reconcile("default")
+    return repo
+
+
+def make_transaction(transaction_id: str, jumlah: int) -> dict:
+    return {"id": transaction_id, "ledger_id": "default", "tanggal": datetime(2024, 1, 1), "keterangan": "Iuran",
+            "jenis": "pemasukan", "jumlah": Int64(jumlah), "deleted": False}
+
+
+async def test_pending_increment_is_not_double_counted(repository, monkeypatch):
+    # Insert sudah tersimpan, $inc total dari penulis yang sama baru masuk saat reconcile menunggu
+    pending = make_transaction("b", 50)
+    await repository.get_db().transactions.insert_one(pending)
+
+    async def writer_catches_up(seconds):
+        await repository._apply_totals_delta("default", ledger_delta(None, pending))
+
+    monkeypatch.setattr(storage.asyncio, "sleep", writer_catches_up)
+    result = await repository.reconcile("default")
+    assert result["drift"] == {}
+    assert await repository.totals("default") == {"total_pemasukan": 150, "total_pengeluaran": 0, "count": 2}
+
+
+async def test_persistent_drift_is_corrected(repository, monkeypatch):
+    await repository.get_db().ledger_totals.update_one({"_id": "default"}, {"$inc": {"total_pemasukan": Int64(7)}})
+
+    async def no_wait(seconds):
+        pass
+
+    monkeypatch.setattr(storage.asyncio, "sleep", no_wait)
+    result = await repository.reconcile("default")
+    assert result["drift"] == {"total_pemasukan": -7}
+    assert (await repository.totals("default"))["total_pemasukan"] == 100
+
+
+async def rollups(repository, granularity: str = "month") -> dict:
+    docs = repository.get_db().ledger_rollups.find({"ledger_id": "default", "granularity": granularity})
+    return {doc["period"]: (doc["pemasukan"], doc["pengeluaran"], doc["count"]) async for doc in docs}
+
+
+async def test_rebuild_keeps_pending_rollup_increment(repository, monkeypatch):
+    pending = make_transaction("b", 50)
+    await repository.get_db().transactions.insert_one(pending)
+    caught_up = []
+
+    async def writer_catches_up(seconds):
+        if not caught_up:
+            caught_up.append(True)
+            await repository._apply_rollup_delta("default", [pending], 1)
+
+    monkeypatch.setattr(storage.asyncio, "sleep", writer_catches_up)
+    assert await repository.rebuild_rollups("default") == {"day": 0, "month": 0, "year": 0}
+    assert await rollups(repository) == {"2024-01": (150, 0, 2)}
+
+
+async def test_rebuild_corrects_persistent_rollup_drift(repository):
+    collection = repository.get_db().ledger_rollups
+    await collection.update_one({"_id": "default:month:2024-01"}, {"$inc": {"pemasukan": Int64(7)}})
+    await collection.delete_one({"_id": "default:year:2024"})
+    await collection.insert_one({"_id": "default:month:1999-01", "ledger_id": "default", "granularity": "month",
+                                 "period": "1999-01", "pemasukan": 5, "pengeluaran": 0, "count": 1})
+
+    assert await repository.rebuild_rollups("default") == {"day": 0, "month": 2, "year": 1}
+    assert await rollups(repository) == {"2024-01": (100, 0, 1)}
+    assert await rollups(repository, "year") == {"2024": (100, 0, 1)}
+    assert await repository.rebuild_rollups("default") == {"day": 0, "month": 0, "year": 0}
@@ -0,0 +1,52 @@
+"""Snapshot total tidak boleh melompati seq yang sudah dipesan tapi belum tersimpan."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def server():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+
+    server.database = mongomock_motor.AsyncMongoMockClient()["jurnalkas_test"]
+    await server.take_snapshot("default")
+    yield server
+    server.database = None
+
+
+def income(server, transaction_id: str, jumlah: int) -> dict:
+    return server.make_event("create", "admin", after={"id": transaction_id, "jenis": "pemasukan", "jumlah": jumlah})
+
+
+async def reserve_seq(server) -> int:
+    # Penulis lain sudah memesan seq tapi belum sempat insert_many
+    counter = await server.get_db().counters.find_one_and_update(
+        {"_id": server.event_seq_id("default")}, {"$inc": {"seq": 1}}, upsert=True, return_document=True
+    )
+    return counter["seq"]
+
+
+async def test_snapshot_stops_at_pending_seq(server):
+    await server.record_events("default", [income(server, "a", 100)])
+    pending = await reserve_seq(server)
+    await server.record_events("default", [income(server, "c", 25)])
+
+    snapshot = await server.take_snapshot("default")
+    assert (snapshot["seq"], snapshot["total_pemasukan"]) == (1, 100)
+
+    late = income(server, "b", 50)
+    late.update({"ledger_id": "default", "seq": pending, "at": snapshot["at"]})
+    await server.get_db().ledger_events.insert_one(late)
+    snapshot = await server.take_snapshot("default")
+    assert (snapshot["seq"], snapshot["total_pemasukan"], snapshot["count"]) == (3, 175, 3)
+
+
+async def test_snapshot_skips_abandoned_seq(server, monkeypatch):
+    await reserve_seq(server)
+    await server.record_events("default", [income(server, "a", 100)])
+    assert await server.take_snapshot("default") is None
+
+    monkeypatch.setattr(server, "SNAPSHOT_GAP_GRACE_SECONDS", 0)
+    snapshot = await server.take_snapshot("default")
+    assert (snapshot["seq"], snapshot["total_pemasukan"]) == (2, 100)
@@ -0,0 +1,42 @@
+"""Laporan bulanan harus ikut berubah saat transaksi di bulannya berubah."""
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+
+    server.database = mongomock_motor.AsyncMongoMockClient()["jurnalkas_test"]
+    await server.ensure_admin_user()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        login = await client.post("/api/login", json={"username": "admin", "password": "admin"})
+        client.headers["Authorization"] = f"Bearer {login.json()['token']}"
+        yield client
+    server.database = None
+
+
+async def create(client, tanggal: str, jumlah: int):
+    response = await client.post(
+        "/api/transactions",
+        json={"tanggal": tanggal, "keterangan": "Iuran", "jenis": "pemasukan", "jumlah": jumlah},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_offset_date_invalidates_utc_month(client):
+    await create(client, "2024-01-10T08:00:00", 1000)
+    january = (await client.get("/api/reports/statement", params={"month": "2024-01"})).json()
+    assert (january["count"], january["saldo_akhir"]) == (1, 1000)
+
+    # 1 Februari pukul 05:00 WIB tersimpan sebagai 31 Januari 22:00 UTC
+    await create(client, "2024-02-01T05:00:00+07:00", 500)
+    january = (await client.get("/api/reports/statement", params={"month": "2024-01"})).json()
+    assert (january["count"], january["saldo_akhir"]) == (2, 1500)
+    february = (await client.get("/api/reports/statement", params={"month": "2024-02"})).json()
+    assert (february["count"], february["saldo_awal"]) == (0, 1500)
@@ -0,0 +1,142 @@
+"""Perilaku yang wajib sama untuk setiap implementasi ``TransactionRepository``."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 1)
+
+
+def make_transaction(day: int, jenis: str, jumlah: int, keterangan: str = "Transaksi", ledger_id: str = "default", **extra) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "ledger_id": ledger_id,
+        "tanggal": START + timedelta(days=day),
+        "keterangan": keterangan,
+        "jenis": jenis,
+        "jumlah": jumlah,
+        "created_at": START,
+        "created_by": "admin",
+        **extra,
+    }
+
+
+def sample_transactions(ledger_id: str = "default") -> list:
+    return [
+        make_transaction(0, "pemasukan", 100000, "Iuran warga", ledger_id),
+        make_transaction(0, "pengeluaran", 25000, "Beli sapu", ledger_id),
+        make_transaction(1, "pemasukan", 50000, "Iuran kebersihan", ledger_id),
+        make_transaction(31, "pengeluaran", 40000, "Listrik pos ronda", ledger_id),
+        make_transaction(32, "pemasukan", 75000, "Donasi", ledger_id),
+    ]
+
+
+async def test_insert_reports_duplicates_by_index(repository):
+    docs = sample_transactions()
+    assert await repository.insert_many([dict(doc) for doc in docs]) == {}
+    duplicate = dict(docs[1])
+    failed = await repository.insert_many([make_transaction(2, "pemasukan", 1), duplicate])
+    assert list(failed) == [1]
+    assert (await repository.aggregate_totals("default"))["count"] == 6
+
+
+async def test_page_follows_journal_order_without_overlap(repository):
+    docs = sample_transactions()
+    await repository.insert_many([dict(doc) for doc in docs])
+    expected = [doc["id"] for doc in sorted(docs, key=lambda d: (d["tanggal"], d["id"]), reverse=True)]
+
+    seen, after = [], None
+    while True:
+        page = await repository.page("default", {}, 2, after)
+        seen += [row["id"] for row in page]
+        if len(page) < 2:
+            break
+        after = (page[-1]["tanggal"], page[-1]["id"])
+    assert seen == expected
+    first = await repository.page("default", {}, 1)
+    assert isinstance(first[0]["tanggal"], datetime)
+    assert first[0]["jumlah"] == 75000
+
+
+async def test_filters(repository):
+    await repository.insert_many(sample_transactions())
+    january = {"date_from": START, "date_to": START + timedelta(days=31)}
+    assert len(await repository.page("default", january, 50)) == 3
+    pemasukan = await repository.page("default", {"jenis": "pemasukan"}, 50)
+    assert {row["jenis"] for row in pemasukan} == {"pemasukan"} and len(pemasukan) == 3
+    totals = await repository.aggregate_totals("default", {"jenis": "pengeluaran"})
+    assert totals == {"total_pemasukan": 0, "total_pengeluaran": 65000, "count": 2}
+
+
+async def test_search_keterangan(repository):
+    if repository.name == "mongo":
+        pytest.skip("mongomock tidak mendukung $text")
+    await repository.insert_many(sample_transactions())
+    rows = await repository.page("default", {"q": "IURAN"}, 50)
+    assert sorted(row["keterangan"] for row in rows) == ["Iuran kebersihan", "Iuran warga"]
+
+
+async def test_iterate_exports_everything_in_order(repository):
+    await repository.insert_many(sample_transactions())
+    rows = [row async for row in repository.iterate("default", {}, batch_size=2)]
+    assert len(rows) == 5
+    assert [row["tanggal"] for row in rows] == sorted((row["tanggal"] for row in rows), reverse=True)
+
+
+async def test_update_and_soft_delete_keep_totals_consistent(repository):
+    docs = sample_transactions()
+    await repository.insert_many([dict(doc) for doc in docs])
+    assert await repository.totals("default") == {"total_pemasukan": 225000, "total_pengeluaran": 65000, "count": 5}
+
+    before = await repository.update("default", docs[0]["id"], {"jumlah": 90000, "updated_by": "admin"})
+    assert before["jumlah"] == 100000
+    deleted = await repository.soft_delete("default", docs[1]["id"], {"deleted_at": START, "deleted_by": "admin"})
+    assert deleted["id"] == docs[1]["id"]
+    assert await repository.soft_delete("default", docs[1]["id"], {"deleted_at": START, "deleted_by": "admin"}) is None
+    assert await repository.update("lain", docs[0]["id"], {"jumlah": 1}) is None
+    assert await repository.exists("default", docs[1]["id"])
+    assert not await repository.exists("lain", docs[1]["id"])
+
+    expected = {"total_pemasukan": 215000, "total_pengeluaran": 40000, "count": 4}
+    assert await repository.totals("default") == expected
+    assert await repository.aggregate_totals("default") == expected
+    assert (await repository.reconcile("default"))["drift"] == {}
+    assert docs[1]["id"] not in [row["id"] for row in await repository.page("default", {}, 50)]
+
+
+async def test_period_totals_and_opening_balance(repository):
+    await repository.insert_many(sample_transactions())
+    months = await repository.period_totals("default", "month", None, None)
+    assert months == [
+        {"period": "2024-01", "pemasukan": 150000, "pengeluaran": 25000, "count": 3},
+        {"period": "2024-02", "pemasukan": 75000, "pengeluaran": 40000, "count": 2},
+    ]
+    days = await repository.period_totals("default", "day", "2024-01-02", "2024-02-01")
+    assert [row["period"] for row in days] == ["2024-01-02", "2024-02-01"]
+    assert await repository.balance_before("default", "month", "2024-02") == 125000
+    assert await repository.balance_before("default", "day", "2024-01-01") == 0
+
+
+async def test_ledgers_are_isolated(repository):
+    await repository.insert_many(sample_transactions("default") + sample_transactions("rt05"))
+    docs = await repository.page("rt05", {}, 50)
+    await repository.soft_delete("rt05", docs[0]["id"], {"deleted_at": START, "deleted_by": "admin"})
+    assert (await repository.totals("default"))["count"] == 5
+    assert (await repository.totals("rt05"))["count"] == 4
+    assert await repository.soft_delete("default", docs[1]["id"], {"deleted_at": START, "deleted_by": "admin"}) is None
+
+
+async def test_rebuild_rollups_matches_incremental_totals(repository):
+    docs = sample_transactions()
+    await repository.insert_many([dict(doc) for doc in docs])
+    for doc in docs[3:]:
+        await repository.soft_delete("default", doc["id"], {"deleted_at": START, "deleted_by": "admin"})
+    expected = await repository.period_totals("default", "month", None, None)
+
+    await repository.rebuild_rollups("default")
+    await repository.rebuild_rollups("default")
+    assert await repository.period_totals("default", "month", None, None) == expected
+    assert [row["period"] for row in expected] == ["2024-01"]
+    assert await repository.balance_before("default", "month", "2024-03") == 125000
@@ -0,0 +1,100 @@
+"""Uji performa kasar kedua backend penyimpanan.
+
+Batasnya longgar (mesin CI bisa lambat); tujuannya menangkap regresi besar
+seperti insert per baris atau query yang jatuh ke scan penuh. mongomock tidak
+representatif untuk performa, jadi backend Mongo hanya diuji terhadap server
+sungguhan yang diberikan lewat ``TEST_MONGO_URL``.
+
+    TEST_MONGO_URL=mongodb://localhost:27017 python -m pytest -q tests -m perf
+"""
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import MongoTransactionRepository, SQLiteTransactionRepository
+
+pytestmark = [pytest.mark.anyio, pytest.mark.perf]
+
+ROWS = 20000
+
+
+@pytest.fixture(params=["mongo", "sqlite"])
+async def repository(request, tmp_path):
+    if request.param == "mongo":
+        url = os.environ.get("TEST_MONGO_URL")
+        if not url:
+            pytest.skip("TEST_MONGO_URL tidak diset")
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(url)
+        db = client[f"jurnalkas_perf_{uuid.uuid4().hex[:8]}"]
+        await db.transactions.create_index("id", unique=True)
+        await db.transactions.create_index(
+            [("ledger_id", 1), ("tanggal", -1), ("id", -1)], partialFilterExpression={"deleted": False}
+        )
+        repo = MongoTransactionRepository(lambda: db)
+    else:
+        client = None
+        repo = SQLiteTransactionRepository(str(tmp_path / "jurnalkas.db"))
+    await repo.setup()
+    try:
+        yield repo
+    finally:
+        await repo.close()
+        if client is not None:
+            await client.drop_database(db.name)
+            client.close()
+
+
+def synthetic_transactions(rows: int, ledger_id: str = "default") -> list:
+    start = datetime(2020, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "ledger_id": ledger_id,
+            "tanggal": start + timedelta(minutes=37 * i),
+            "keterangan": f"Transaksi {i}",
+            "jenis": random.choice(("pemasukan", "pengeluaran")),
+            "jumlah": random.randint(1, 500) * 1000,
+            "created_at": start,
+            "created_by": "benchmark",
+        }
+        for i in range(rows)
+    ]
+
+
+async def test_bulk_insert_and_paging(repository):
+    docs = synthetic_transactions(ROWS)
+    started = time.perf_counter()
+    assert await repository.insert_many(docs) == {}
+    assert time.perf_counter() - started < 30
+
+    started = time.perf_counter()
+    after, pages = None, 0
+    for _ in range(20):
+        page = await repository.page("default", {}, 50, after)
+        after = (page[-1]["tanggal"], page[-1]["id"])
+        pages += 1
+    # Keyset pagination: halaman ke-20 semurah halaman pertama
+    assert (time.perf_counter() - started) / pages < 0.5
+
+    started = time.perf_counter()
+    totals = await repository.totals("default")
+    assert totals["count"] == ROWS
+    assert time.perf_counter() - started < 2
+
+
+async def test_sqlite_plans_use_indexes(repository):
+    if repository.name != "sqlite":
+        pytest.skip("rencana query Mongo diperiksa lewat /api/admin/explain")
+    await repository.insert_many(synthetic_transactions(1000))
+    plans = await repository.explain("default")
+    for endpoint, plan in plans.items():
+        assert plan["uses_index"], endpoint
+        assert not plan["collection_scan"], endpoint
+        assert not plan["in_memory_sort"], endpoint
+    assert plans["GET /api/summary"]["covered"]